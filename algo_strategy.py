@@ -2,40 +2,136 @@ import threading
 import logging
 import sys
 import time
-import redis
 import json
+import queue
 from pprint import pprint
 from datetime import datetime, timedelta
 from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from kite_bms import KiteTrader
 from utils.redis_config import RedisConfigReader
-from utils.redis_utils import update_strategy_status, update_trading_status , update_strategy_action
+from utils.redis_utils import update_strategy_status, update_trading_status , update_strategy_action, for_instance, instance_thread_name
+from utils.order_journal import OrderJournal, JournalReader, journal_path
+from position_reconciler import PositionReconciler
+from utils.checkpoint import StrategyCheckpointer, encode_history, decode_history
+from underlying_registry import get_underlying
+from utils.clock import get_clock
+from utils.redis_client import get_redis
+from utils.logger import THROTTLE
+from bar_aggregator import BarAggregator
 
 logger = logging.getLogger("root")
-r = redis.Redis(host='localhost', port=6379, db=0)
-class StraddleVWAPUpdater:
+r = get_redis()
+
+STRIKE_BAND = 5         # strikes on each side of ATM streamed in tick mode
+QUIET_CLOSE_SECS = 2    # wall-clock fallback for closing minutes when no ticks arrive
+LTP_POLL_SECS = 2.0     # shortest interval between intrabar ltp() checks when no ticks stream
+
+# Inputs a running strategy picks up at the next bar; anything else needs a restart.
+# config key -> (attribute, parse, check)
+HOT_PARAMS = {
+    'TargetPnl': ('target_pnl', float, lambda v: v > 0),
+    'ExitPnl': ('exit_pnl', float, lambda v: v < 0),
+    'RollingValue': ('rolling_value', float, lambda v: v >= 0),
+    'ShiftThresholdPts': ('shift_threshold', int, lambda v: v > 0),
+    'OrderBufferPct': ('order_buffer_pct', lambda v: float(v) / 100.0, lambda v: 0 <= v <= 0.05),
+}
 
-    last_straddle_price = None
-    last_vwap_straddle  = None
-    ready_to_execute = False
-    index_history    = deque()
-    straddle_history = deque()
+class StraddleVWAPUpdater:
 
-    def __init__(self, kite_client=None, symbol=None, expiry_date=None, strike_step=None, redis_config=None):
+    def __init__(self, kite_client=None, symbol=None, expiry_date=None, strike_step=None, redis_config=None,
+                 tick_hub=None, bar_source="historical", clock=None):
         self.kite = kite_client
+        self.clock = clock or get_clock()
         self.symbol = symbol
-        self.index_token = '256265' if self.symbol == "NIFTY" else '265'
-        self.exchange_options = "NFO" if self.symbol == "NIFTY" else "BFO"
+        underlying = get_underlying(self.symbol)
+        self.index_token = underlying.index_token
+        self.index_symbol = f"{underlying.index_exchange}:{underlying.index_tradingsymbol}"
+        self.exchange_options = underlying.options_exchange
         self.expiry_str = expiry_date
         self.strike_interval = strike_step
         
         logger.info(f"[{self.symbol}] Initializing StraddleVWAPUpdater with Redis config...")
         logger.info(f"Config: Symbol={self.symbol}, Expiry={self.expiry_str}, Strike Interval={self.strike_interval}")
 
+        self.last_straddle_price = None
+        self.last_vwap_straddle  = None
+        self.ready_to_execute = False
+        self.index_history    = deque()
+        self.straddle_history = deque()
+
         self.cum_pv = 0.0
         self.cum_vol = 0.0
         self.last_ts = None
+        self.on_bar = None  # called after new bars are folded into the VWAP
+
+        # Tick mode: minute bars come from the shared tick stream instead of historical_data
+        self.tick_hub = tick_hub
+        self.bar_source = bar_source
+        self.bars = None            # BarAggregator, created when streaming starts
+        self.option_tokens = {}     # (strike, 'CE'/'PE') -> instrument_token, None if not listed
+        self.tick_event = threading.Event()   # set on every tick batch while streaming
+        self.polled_index = None    # index price of the last ltp() check in live_prices
+
+    def _bar_closed(self):
+        if self.on_bar is not None:
+            try:
+                self.on_bar()
+            except Exception as e:
+                logger.error(f"[{self.symbol}] Bar close callback failed: {e}")
+
+    def snapshot(self):
+        """Compact, JSON-safe copy of the VWAP accumulators and histories"""
+        return {
+            "cum_pv": self.cum_pv,
+            "cum_vol": self.cum_vol,
+            "last_ts": self.last_ts.strftime("%H:%M") if self.last_ts else None,
+            "last_straddle_price": self.last_straddle_price,
+            "last_vwap_straddle": self.last_vwap_straddle,
+            "index_history": encode_history(self.index_history),
+            "straddle_history": encode_history(self.straddle_history),
+        }
+
+    def restore(self, state, day):
+        """Restore a snapshot(); run_forever then only backfills bars after last_ts"""
+        self.cum_pv = state["cum_pv"]
+        self.cum_vol = state["cum_vol"]
+        if state.get("last_ts"):
+            self.last_ts = datetime.combine(day, datetime.strptime(state["last_ts"], "%H:%M").time())
+        self.last_straddle_price = state.get("last_straddle_price")
+        self.last_vwap_straddle = state.get("last_vwap_straddle")
+        self.index_history = deque(decode_history(state["index_history"], day))
+        self.straddle_history = deque(decode_history(state["straddle_history"], day))
+        self.ready_to_execute = (
+            bool(self.straddle_history) and self.last_vwap_straddle is not None
+        )
+        logger.info(f"[{self.symbol}] Restored updater from checkpoint: last_ts={self.last_ts}, "
+                    f"bars={len(self.straddle_history)}")
+
+    def _fold_straddle(self, ts, idx_close, straddle_price, straddle_volume):
+        self.cum_pv  += straddle_price * straddle_volume
+        self.cum_vol += straddle_volume
+
+        self.index_history.append((ts, idx_close))
+        self.straddle_history.append((ts, straddle_price))
+        self.last_straddle_price = straddle_price
+        self.last_ts             = ts + timedelta(minutes=1)
+
+    def _publish_vwap(self):
+        if self.cum_vol > 0:
+            vwap_straddle = self.cum_pv / self.cum_vol
+        else:
+            vwap_straddle = float('nan')
+
+        if self.last_straddle_price is not None:
+            print(
+                f"[{self.last_ts.strftime('%H:%M')}] "
+                f"StraddlePrice={self.last_straddle_price:.2f} | "
+                f"VWAP_straddle={vwap_straddle:.2f}"
+            )
+            self.last_vwap_straddle  = vwap_straddle
+            self.ready_to_execute = True
+            self._bar_closed()
 
     def _get_option_minute_data(self, ts: datetime, strike: int, opt_type: str):
             trading_symbol = f"{self.symbol}{self.expiry_str}{strike}{opt_type}"
@@ -44,15 +140,20 @@ class StraddleVWAPUpdater:
             from_dt = ts
             to_dt = ts + timedelta(minutes=1)
 
-            logger.info(f"Fetching {opt_type} minute data for {full_symbol} @ {ts}")
+            logger.info(f"Fetching {opt_type} minute data for {full_symbol} @ {ts}", extra=THROTTLE)
             try:
+                # Tokens are resolved once per strike, not with a quote call for every bar
+                self._resolve_option_tokens([(strike, opt_type)])
+                token = self.option_tokens[(strike, opt_type)]
+                if token is None:
+                    raise KeyError(f"{full_symbol} is not listed")
                 candles = self.kite.historical_data(
-                    instrument_token=self.kite.ltp(full_symbol)[full_symbol]["instrument_token"],
+                    instrument_token=token,
                     interval="minute",
                     from_date=from_dt,
                     to_date=to_dt
                 )
-                logger.info(f"Fetched {len(candles)} candles for {full_symbol}")
+                logger.info(f"Fetched {len(candles)} candles for {full_symbol}", extra=THROTTLE)
             except Exception as e:
                 logger.error(f"Could not fetch historical for {full_symbol} @ {ts}: {e}")
                 raise KeyError(f"Could not fetch historical for {full_symbol} @ {ts}: {e}")
@@ -71,25 +172,214 @@ class StraddleVWAPUpdater:
         """Round 'price' to nearest multiple of strike_interval."""
         return int(round(price / self.strike_interval) * self.strike_interval)
 
+    def _fold_historical(self, until, exclusive=False):
+        """Fold index and ATM option minute candles from last_ts up to 'until' via historical_data"""
+        try:
+            print("[DEBUG] Fetching incremental candles from", self.last_ts, "to", until)
+            new_candles = self.kite.historical_data(
+                instrument_token=self.index_token,
+                interval="minute",
+                from_date=self.last_ts,
+                to_date=until - timedelta(seconds=1) if exclusive else until
+            )
+        except Exception as e:
+            print(f"[ERROR] Could not fetch incremental candles: {e}")
+            new_candles = []
+
+        # One ltp() call for the tokens of every ATM strike the backfill needs
+        strikes = {self._round_to_atm(float(bar['close'])) for bar in new_candles}
+        try:
+            self._resolve_option_tokens([(strike, opt_type) for strike in strikes for opt_type in ("CE", "PE")])
+        except Exception as e:
+            logger.error(f"[{self.symbol}] Could not resolve option tokens for backfill: {e}")
+
+        processed = 0
+        for bar in new_candles:
+            print(f"[DEBUG] Processing new bar: {bar['date']}")
+            pprint(bar)
+            ts = bar["date"].replace(tzinfo=None, second=0, microsecond=0)
+            if exclusive and ts >= until:
+                continue
+            if self.straddle_history and ts <= self.straddle_history[-1][0]:
+                continue   # already folded
+            idx_close = float(bar['close'])
+
+            atm_strike = self._round_to_atm(idx_close)
+            try:
+                call_ltp, call_vol = self._get_option_minute_data(ts, atm_strike, 'CE')
+                put_ltp, put_vol   = self._get_option_minute_data(ts, atm_strike, 'PE')
+            except Exception:
+                continue
+
+            self._fold_straddle(ts, idx_close, call_ltp + put_ltp, call_vol + put_vol)
+            processed += 1
+        return processed
+
+    def _resolve_option_tokens(self, keys):
+        """
+        Cache the instrument tokens of (strike, 'CE'/'PE') keys not resolved yet, with
+        one ltp() call for all of them; returns the tokens newly found
+        """
+        missing = {
+            key: f"{self.exchange_options}:{self.symbol}{self.expiry_str}{key[0]}{key[1]}"
+            for key in keys if key not in self.option_tokens
+        }
+        if not missing:
+            return []
+        quotes = self.kite.ltp(list(missing.values()))
+
+        tokens = []
+        for key, full_symbol in missing.items():
+            quote = quotes.get(full_symbol)
+            self.option_tokens[key] = quote["instrument_token"] if quote else None
+            if quote:
+                tokens.append(quote["instrument_token"])
+        return tokens
+
+    def _subscribe_strikes(self, index_price):
+        """Stream CE/PE ticks for STRIKE_BAND strikes around ATM; only strikes not yet resolved cost an ltp() call"""
+        atm = self._round_to_atm(index_price)
+        wanted = [
+            (atm + i * self.strike_interval, opt_type)
+            for i in range(-STRIKE_BAND, STRIKE_BAND + 1)
+            for opt_type in ("CE", "PE")
+        ]
+        try:
+            tokens = self._resolve_option_tokens(wanted)
+        except Exception as e:
+            logger.error(f"[{self.symbol}] Could not resolve option tokens for strikes around {atm}: {e}")
+            return
+        if tokens:
+            self.tick_hub.subscribe(tokens, self.bars.on_ticks)
+            logger.info(f"[{self.symbol}] Streaming {len(tokens)} option legs around ATM {atm}")
+
+    def _stream_bars(self, stop_event):
+        """
+        Tick mode: fold minute bars built by a BarAggregator from the shared tick
+        stream. Minutes the stream cannot supply (before it started, or legs
+        without ticks yet) are backfilled from historical_data.
+        """
+        self.bars = BarAggregator()
+        self.bars.start_after(self.last_ts)
+        closed = queue.Queue()
+        bar_ready = threading.Event()
+
+        def _closed(minute, bars):
+            closed.put((minute, bars))
+            bar_ready.set()
+        self.bars.on_minute(_closed)
+        self.bars.on_tick(lambda ticks: self.tick_event.set())
+        self.tick_hub.subscribe([self.index_token], self.bars.on_ticks)
+        if self.index_history:
+            self._subscribe_strikes(self.index_history[-1][1])
+        logger.info(f"[{self.symbol}] Building minute bars from ticks from {self.last_ts:%H:%M}")
+
+        try:
+            while not stop_event.is_set():
+                try:
+                    minute, bars = closed.get_nowait()
+                except queue.Empty:
+                    if not self.clock.wait(bar_ready, 0.5):
+                        self.bars.advance(self.clock.now() - timedelta(seconds=QUIET_CLOSE_SECS))
+                    bar_ready.clear()
+                    continue
+                self._on_minute_bars(minute, bars)
+        finally:
+            self.tick_hub.unsubscribe(self.bars.on_ticks)
+
+    def _on_minute_bars(self, minute, bars):
+        idx_bar = bars.get(self.index_token)
+        if idx_bar is None:
+            return
+        if self.straddle_history and minute <= self.straddle_history[-1][0]:
+            return
+        if minute > self.last_ts:
+            self._fold_historical(minute, exclusive=True)
+
+        idx_close = idx_bar["close"]
+        atm_strike = self._round_to_atm(idx_close)
+        call_bar = bars.get(self.option_tokens.get((atm_strike, "CE")))
+        put_bar = bars.get(self.option_tokens.get((atm_strike, "PE")))
+        # A leg's first streamed bar (e.g. right after an ATM shift) misses the volume
+        # traded before its subscription; VWAP takes that minute from historical data
+        if call_bar is not None and call_bar.get("partial"):
+            call_bar = None
+        if put_bar is not None and put_bar.get("partial"):
+            put_bar = None
+        try:
+            if call_bar is not None:
+                call_ltp, call_vol = call_bar["close"], call_bar["volume"]
+            else:
+                call_ltp, call_vol = self._get_option_minute_data(minute, atm_strike, 'CE')
+            if put_bar is not None:
+                put_ltp, put_vol = put_bar["close"], put_bar["volume"]
+            else:
+                put_ltp, put_vol = self._get_option_minute_data(minute, atm_strike, 'PE')
+        except Exception:
+            logger.error(f"Could not build straddle for {minute} at strike {atm_strike}")
+            self._subscribe_strikes(idx_close)
+            return
+
+        self._fold_straddle(minute, idx_close, call_ltp + put_ltp, call_vol + put_vol)
+        self._publish_vwap()
+        self._subscribe_strikes(idx_close)
+
+    def live_prices(self):
+        """
+        (straddle, index) at this instant for the ATM of the live index: from the
+        latest ticks while streaming, else from one batched ltp() call for the index
+        and the legs at the last known ATM. None if unavailable.
+        """
+        if self.bars is not None:
+            index_price = self.bars.last_price(self.index_token)
+            if index_price is None:
+                return None
+            atm_strike = self._round_to_atm(index_price)
+            call = self.bars.last_price(self.option_tokens.get((atm_strike, "CE")))
+            put = self.bars.last_price(self.option_tokens.get((atm_strike, "PE")))
+            if call is None or put is None:
+                return None
+            return call + put, index_price
+
+        known = self.polled_index or (self.index_history[-1][1] if self.index_history else None)
+        strike = self._round_to_atm(known) if known is not None else None
+        legs = self._atm_legs(strike) if strike is not None else []
+        quotes = self.kite.ltp([self.index_symbol] + legs)
+        index_quote = quotes.get(self.index_symbol)
+        if not index_quote:
+            return None
+        index_price = self.polled_index = float(index_quote["last_price"])
+        atm_strike = self._round_to_atm(index_price)
+        if atm_strike != strike:
+            # The index crossed to another strike since the last check (rare): price the new ATM
+            legs = self._atm_legs(atm_strike)
+            quotes = self.kite.ltp(legs)
+        if not all(leg in quotes for leg in legs):
+            return None
+        return sum(float(quotes[leg]["last_price"]) for leg in legs), index_price
+
+    def _atm_legs(self, strike):
+        return [f"{self.exchange_options}:{self.symbol}{self.expiry_str}{strike}{opt}" for opt in ("CE", "PE")]
+
     def run_forever(self, stop_event):
-        today = datetime.now().date()
+        today = self.clock.now().date()
         market_open = datetime.combine(today, datetime.min.time()).replace(hour=9, minute=15)
         while not stop_event.is_set():
-            now = datetime.now().replace(second=0, microsecond=0)
+            now = self.clock.now().replace(second=0, microsecond=0)
             if self.last_ts is None:
                 if now < market_open:
                     print(f"[{now.strftime('%H:%M')}] Market not open until 09:15. Sleeping…")
                     self.last_ts = now 
                 else:
                     try:
-                        logger.info(f"[DEBUG] Fetching historical candles from {market_open} to {now}")
+                        logger.info(f"[DEBUG] Fetching historical candles from {market_open} to {now}", extra=THROTTLE)
                         candles = self.kite.historical_data(
                             instrument_token=self.index_token,
                             interval="minute",
                             from_date=market_open,
                             to_date=now
                         )
-                        logger.info(candles)
+                        logger.info(candles, extra=THROTTLE)
                     except Exception as e:
                         logger.error(f"[ERROR] Could not fetch historical candles: {e}")
                         candles = []
@@ -99,12 +389,13 @@ class StraddleVWAPUpdater:
                             break
                         ts = bar["date"].replace(tzinfo=None, second=0, microsecond=0)
                         idx_close = float(bar['close'])
-                        logger.info(f"[DEBUG] Processing bar: {ts} Close: {idx_close}")
-                        StraddleVWAPUpdater.index_history.append((ts, idx_close))
+                        logger.info(f"[DEBUG] Processing bar: {ts} Close: {idx_close}", extra=THROTTLE)
+                        self.index_history.append((ts, idx_close))
                         atm_strike = self._round_to_atm(idx_close)
                         print('[DEBUG] Processing bar:', ts, 'Close:', idx_close, 'ATM Strike:', atm_strike)
                         try:
-                            with ThreadPoolExecutor(max_workers=2) as executor:
+                            # Workers inherit this thread's name so their logs stay with the instance
+                            with ThreadPoolExecutor(max_workers=2, thread_name_prefix=threading.current_thread().name) as executor:
                                 future_call = executor.submit(
                                     self._get_option_minute_data, ts, atm_strike, "CE"
                                 )
@@ -119,139 +410,115 @@ class StraddleVWAPUpdater:
                                     logger.error(f"Could not fetch option data for {ts} at strike {atm_strike}")
                                     continue
 
-                                logger.info(f'Call LTP: {call_ltp}, Volume: {call_vol}')
-                                logger.info(f'Put LTP: {put_ltp}, Volume: {put_vol}')
+                                logger.info(f'Call LTP: {call_ltp}, Volume: {call_vol}', extra=THROTTLE)
+                                logger.info(f'Put LTP: {put_ltp}, Volume: {put_vol}', extra=THROTTLE)
                         except Exception:
                             continue
 
                         straddle_price  = call_ltp + put_ltp
-                        StraddleVWAPUpdater.straddle_history.append((ts, straddle_price))
+                        self.straddle_history.append((ts, straddle_price))
                         straddle_volume = call_vol + put_vol
                         print('[DEBUG] Straddle Price:', straddle_price, 'Volume:', straddle_volume)
                         self.cum_pv  += straddle_price * straddle_volume
                         self.cum_vol += straddle_volume
 
-                        StraddleVWAPUpdater.last_straddle_price = straddle_price
+                        self.last_straddle_price = straddle_price
 
                     if self.cum_vol > 0:
                         vwap_straddle = self.cum_pv / self.cum_vol
                     else:
                         vwap_straddle = float('nan')
 
-                    if StraddleVWAPUpdater.last_straddle_price is not None:
+                    if self.last_straddle_price is not None:
                         print(
                             f"[{now.strftime('%H:%M')}] "
-                            f"StraddlePrice={StraddleVWAPUpdater.last_straddle_price:.2f} | "
+                            f"StraddlePrice={self.last_straddle_price:.2f} | "
                             f"VWAP_straddle={vwap_straddle:.2f}"
                         )
 
-                    StraddleVWAPUpdater.last_vwap_straddle  = vwap_straddle
+                    self.last_vwap_straddle  = vwap_straddle
                     self.last_ts = now
                     print(f"[DEBUG] Last timestamp updated to {self.last_ts}")
-                    StraddleVWAPUpdater.ready_to_execute = True
+                    self.ready_to_execute = True
+                    self._bar_closed()
 
             else:
-                logger.info(f"[DEBUG] Last TS: {self.last_ts}")
+                logger.info(f"[DEBUG] Last TS: {self.last_ts}", extra=THROTTLE)
                 if now <= self.last_ts or now <= market_open:
-                    logger.info(f"[DEBUG] Current time {now} is less than or equal to last timestamp or market open {self.last_ts}.")
+                    logger.info(f"[DEBUG] Current time {now} is less than or equal to last timestamp or market open {self.last_ts}.", extra=THROTTLE)
                     self.last_ts = now
                     pass
                 else:
-                    try:
-                        print("[DEBUG] Fetching incremental candles from", self.last_ts, "to", now)
-                        new_candles = self.kite.historical_data(
-                            instrument_token=self.index_token,
-                            interval="minute",
-                            from_date=self.last_ts,
-                            to_date=now
-                        )
-                    except Exception as e:
-                        print(f"[ERROR] Could not fetch incremental candles: {e}")
-                        new_candles = []
-
-                    for bar in new_candles:
-                        print(f"[DEBUG] Processing new bar: {bar['date']}")
-                        pprint(bar)
-                        ts = bar["date"].replace(tzinfo=None, second=0, microsecond=0)
-                        idx_close = float(bar['close'])
-
-                        atm_strike = self._round_to_atm(idx_close)
-                        try:
-                            call_ltp, call_vol = self._get_option_minute_data(ts, atm_strike, 'CE')
-                            put_ltp, put_vol   = self._get_option_minute_data(ts, atm_strike, 'PE')
-                        except Exception:
-                            continue
-
-                        straddle_price  = call_ltp + put_ltp
-                        straddle_volume = call_vol + put_vol
-
-                        self.cum_pv  += straddle_price * straddle_volume
-                        self.cum_vol += straddle_volume
+                    if self._fold_historical(now):
+                        self._publish_vwap()
 
-                        StraddleVWAPUpdater.last_straddle_price = straddle_price
-                        self.last_ts             = ts + timedelta(minutes=1)
-
-                    if self.cum_vol > 0:
-                        vwap_straddle = self.cum_pv / self.cum_vol
-                    else:
-                        vwap_straddle = float('nan')
+            if self.bar_source == "ticks" and self.tick_hub is not None and self.last_ts is not None:
+                self._stream_bars(stop_event)
+                return
 
-                    if StraddleVWAPUpdater.last_straddle_price is not None:
-                        print(
-                            f"[{self.last_ts.strftime('%H:%M')}] "
-                            f"StraddlePrice={StraddleVWAPUpdater.last_straddle_price:.2f} | "
-                            f"VWAP_straddle={vwap_straddle:.2f}"
-                        )
-                        StraddleVWAPUpdater.index_history.append((ts, idx_close))
-                        StraddleVWAPUpdater.straddle_history.append((ts, straddle_price))
-                        StraddleVWAPUpdater.last_straddle_price = StraddleVWAPUpdater.last_straddle_price
-                        StraddleVWAPUpdater.last_vwap_straddle  = vwap_straddle
-                        StraddleVWAPUpdater.ready_to_execute = True
-
-            sleep_target = (datetime.now() + timedelta(minutes=1)).replace(second=0, microsecond=0)
-            sleep_secs   = (sleep_target - datetime.now()).total_seconds()
+            sleep_target = (self.clock.now() + timedelta(minutes=1)).replace(second=0, microsecond=0)
+            sleep_secs   = (sleep_target - self.clock.now()).total_seconds()
             if sleep_secs > 0:
-                time.sleep(sleep_secs)
+                self.clock.sleep(sleep_secs)
             else:
-                time.sleep(1)
+                self.clock.sleep(1)
                 continue
 class AlgoStrategy(KiteTrader):
 
-    def __init__(self):
+    def __init__(self, redis_client=None, tick_hub=None, instance=None):
         super().__init__()
         self.day_pnl = 0.0
+        self.redis_client = redis_client or r
+        self.tick_hub = tick_hub
+        self.instance = instance
+        self.signal_lock = threading.RLock()
+        self.tv_signals = queue.Queue()   # filled by the orchestrator's control listener
+
+    def on_tv_signal(self, signal):
+        """Hand a TradingView signal to the strategy loop; executed on its next iteration"""
+        self.tv_signals.put(signal)
 
-    def start_algo_class(self,kite_client, symbol, redis_config=None):
+    def start_algo_class(self,kite_client, symbol, redis_config=None, overrides=None):
         self.exit_signal     = threading.Event()
         self.exit_in_progress = False
 
         logger.info(f"[{symbol}] Initializing AlgoStrategy...")
         self.kite = kite_client
         self.symbol = symbol
-        self.lot_size = 75 if symbol == "NIFTY" else 20
-        self.redis_config = redis_config or RedisConfigReader()
-        config = self.redis_config.get_all_config()
+        underlying = get_underlying(symbol)
+        self.lot_size = underlying.lot_size
+        self.freeze_limit = underlying.freeze_limit
+        self.instance = self.instance or symbol
+        # Status, actions and heartbeats of this instance go to strategy:<instance>:*
+        self.redis_client = for_instance(self.redis_client, self.instance)
+        self.redis_config = redis_config or RedisConfigReader(redis_client=self.redis_client)
+        self.overrides = overrides or {}
+        config = self._instance_config()
+        self.config_version = self.redis_config.version
+        self.config_generation = self.redis_config.generation
 
         self.batman_active   = False
         self.debit_spread_active = False
         self.highest_mtm     = 0
+        self.pivot_base      = None
+        self.swing_sl        = None
+        self.batman_sl       = None
         self.batman_positions = {}  # { tradingsymbol: {'quantity': int, 'avg_price': float} }
         self.batman_closed_pnls = []  # List to store closed PnLs for batman trades
         self.debit_spread_positions = {}  # { tradingsymbol: {'quantity': int, 'avg_price': float} }
         self.debit_spread_closed_pnls = []  # List to store closed PnLs for debit spread trades
 
-        self.redis_client = r
         self.last_action = "Initialized"
         self.action_count = 0
         
-        self.exchange = "NSE" if symbol == "NIFTY" else "BSE"
-        self.exchange_options = "NFO" if self.symbol == "NIFTY" else "BFO"
+        self.exchange = underlying.index_exchange
+        self.exchange_options = underlying.options_exchange
         self.expiry_date = config.get('expiry')
         self.open_range_min = int(config.get('PivotRangeMinutes', 15))
         self.shift_threshold = int(config.get('ShiftThresholdPts', 50))
         self.straddle_gap_pct = float(config.get('StraddleGapPct', 1)) / 100.0
         self.hedge_gap_pct = float(config.get('HedgeGapPct', 2.5)) / 100.0
-        self.strike_step = 50 if symbol == "NIFTY" else 100
+        self.strike_step = underlying.strike_step
         self.order_buffer_pct = float(config.get('OrderBufferPct', 0.3)) / 100.0
         self.fill_timeout_sec = int(config.get('FillTimeoutSec', 5))
         self.rms_cap = float(config.get('RmsCap', -100000))
@@ -263,14 +530,25 @@ class AlgoStrategy(KiteTrader):
         self.rolling_value = float(config.get('RollingValue', 100.0))
         self.trail_stop_loss = config.get('TrailStopLossToggle', True)
         self.product_type = config.get('ProductType', 'MIS')
+        self.bar_source = config.get('BarSource', 'ticks' if self.tick_hub is not None else 'historical')
+        self.intrabar_stops = str(config.get('IntrabarStops', False)).lower() in ('true', '1', 'yes', 'on')
+        self.stop_check_interval = float(config.get('StopCheckIntervalSec', 1.0))
 
         logger.info(f"AlgoStrategy initialized with Redis config: {config}")
         logger.info(f"Key Parameters - Quantity: {self.quantity}, QtyHedgeRatio: {self.qty_hedge_ratio}, Target PnL: {self.target_pnl}, Exit PnL: {self.exit_pnl}")
 
+        self._open_journal()
+        if getattr(self, "checkpointer", None) is None or self.checkpointer.name != self.instance:
+            self.checkpointer = StrategyCheckpointer(self.instance, self.redis_client)
+        self._restored = self.checkpointer.load(self.expiry_date)
+        self._restore_checkpoint(self._restored)
+
         update_strategy_action(self.redis_client, "Initialized AlgoStrategy", {"config": config})
         update_strategy_status(self.redis_client, "starting", "Initializing straddle VWAP updater...")
         self._generate_straddle_vwap()
         self.start_mtm_monitor()
+        self.start_reconciler()
+        self.start_intrabar_monitor()
 
         update_strategy_status(self.redis_client, "running", "Waiting for StraddleVWAPUpdater to be ready...")
         while True:
@@ -278,29 +556,115 @@ class AlgoStrategy(KiteTrader):
             self._check_tradingview_signal()
             
             logger.info(f"[{self.symbol}] Waiting for StraddleVWAPUpdater to be ready...")
-            if StraddleVWAPUpdater.ready_to_execute:
+            if self.straddle_updater.ready_to_execute:
                 break
             if self.exit_signal.is_set():
                 logger.info(f"[{self.symbol}] Exit signal received while waiting for StraddleVWAPUpdater. Exiting...")
                 return
-            time.sleep(1)
+            self.clock.sleep(1)
 
         logger.info(f"[{self.symbol}] StraddleVWAPUpdater is ready. Proceeding with strategy initialization...")
-        logger.info(f"[{self.symbol}] Straddle Price: {StraddleVWAPUpdater.last_straddle_price:.2f} | "
-                    f"VWAP: {StraddleVWAPUpdater.last_vwap_straddle:.2f}")
+        logger.info(f"[{self.symbol}] Straddle Price: {self.straddle_updater.last_straddle_price:.2f} | "
+                    f"VWAP: {self.straddle_updater.last_vwap_straddle:.2f}")
         
         update_strategy_status(self.redis_client, "running", 
-                             f"Strategy ready - Straddle: {StraddleVWAPUpdater.last_straddle_price:.2f}, VWAP: {StraddleVWAPUpdater.last_vwap_straddle:.2f}")
+                             f"Strategy ready - Straddle: {self.straddle_updater.last_straddle_price:.2f}, VWAP: {self.straddle_updater.last_vwap_straddle:.2f}")
 
         self.strategy_main() 
 
+    def _open_journal(self):
+        """Attach today's order journal and rebuild the ledger from it"""
+        path = journal_path(self.instance)
+        ledger = JournalReader(path).rebuild_ledger()
+        if self.journal is None or self.journal.path != path:
+            if self.journal is not None:
+                self.journal.close()
+            self.journal = OrderJournal(path)
+
+        self.batman_positions = ledger["BATMAN"]["positions"]
+        self.batman_closed_pnls = ledger["BATMAN"]["closed_pnls"]
+        self.debit_spread_positions = ledger["DEBIT_SPREAD"]["positions"]
+        self.debit_spread_closed_pnls = ledger["DEBIT_SPREAD"]["closed_pnls"]
+        self.day_pnl = ledger["day_pnl"]
+        # Positions carried over from the journal must not be entered a second time
+        self.batman_active = bool(self.batman_positions)
+        self.debit_spread_active = bool(self.debit_spread_positions)
+
+        if self.batman_positions or self.debit_spread_positions:
+            logger.info(f"[{self.symbol}] Restored positions from journal {path}: "
+                        f"BATMAN={self.batman_positions}, DEBIT_SPREAD={self.debit_spread_positions}, Day PnL={self.day_pnl:.2f}")
+            update_strategy_action(self.redis_client, "Restored positions from order journal",
+                                   {"batman_positions": self.batman_positions,
+                                    "debit_positions": self.debit_spread_positions,
+                                    "day_pnl": self.day_pnl})
+
+    def _checkpoint_state(self):
+        state = {
+            "date": self.clock.now().date().isoformat(),
+            "expiry": self.expiry_date,
+            "journal_seq": self.journal.last_seq if self.journal is not None else 0,
+            "strategy": {
+                "batman_active": self.batman_active,
+                "debit_spread_active": self.debit_spread_active,
+                "pivot_base": getattr(self, "pivot_base", None),
+                "swing_sl": getattr(self, "swing_sl", None),
+                "batman_sl": getattr(self, "batman_sl", None),
+                "hh_peak": getattr(self, "_hh_peak", None),
+                "highest_mtm": self.highest_mtm,
+                "day_pnl": self.day_pnl,
+            },
+        }
+        if getattr(self, "straddle_updater", None) is not None:
+            state["updater"] = self.straddle_updater.snapshot()
+        return state
+
+    def _checkpoint(self):
+        """Queue a checkpoint of strategy and updater state (bar close / after orders)"""
+        checkpointer = getattr(self, "checkpointer", None)
+        if checkpointer is None:
+            return
+        try:
+            checkpointer.save(self._checkpoint_state())
+        except Exception as e:
+            logger.error(f"[{self.symbol}] Could not checkpoint strategy state: {e}")
+
+    def _after_order(self):
+        self._checkpoint()
+
+    def _restore_checkpoint(self, state):
+        """Restore stops, pivots and flags from today's checkpoint"""
+        if not state:
+            return
+        strat = state.get("strategy", {})
+        # Active flags follow the journal's positions; the checkpoint supplies stops and pivots
+        self.pivot_base = strat.get("pivot_base")
+        self.swing_sl = strat.get("swing_sl")
+        self.batman_sl = strat.get("batman_sl")
+        if strat.get("hh_peak") is not None:
+            self._hh_peak = strat["hh_peak"]
+        self.highest_mtm = strat.get("highest_mtm", 0)
+        # Saved and compared on the strategy clock, so replays restore like live sessions
+        saved_at = datetime.fromtimestamp(state.get('saved_at', 0))
+        age = (self.clock.now() - saved_at).total_seconds()
+        logger.info(f"[{self.symbol}] Restored strategy state from checkpoint saved at "
+                    f"{saved_at:%H:%M:%S} ({age:.0f}s ago): {strat}")
+        if self.journal is not None and state.get("journal_seq", 0) > self.journal.last_seq:
+            logger.warning(f"[{self.symbol}] Checkpoint is ahead of the order journal "
+                           f"(seq {state['journal_seq']} > {self.journal.last_seq}); positions follow the journal")
+        update_strategy_action(self.redis_client, "Restored strategy checkpoint", strat)
+
     def _generate_straddle_vwap(self):
         logger.info(f"[{self.symbol}] Starting straddle VWAP generation thread...")
         update_strategy_action(self.redis_client, "Starting straddle VWAP generation", 
                              {"expiry": self.expiry_date, "strike_step": self.strike_step})
         
-        self.straddle_updater = StraddleVWAPUpdater(self.kite, self.symbol, self.expiry_date,self.strike_step,self.redis_config)
-        t = threading.Thread(target=self.straddle_updater.run_forever, args=(self.exit_signal,), daemon=True )
+        self.straddle_updater = StraddleVWAPUpdater(self.kite, self.symbol, self.expiry_date,self.strike_step,self.redis_config,
+                                                    tick_hub=self.tick_hub, bar_source=self.bar_source, clock=self.clock)
+        if self._restored and self._restored.get("updater"):
+            self.straddle_updater.restore(self._restored["updater"], self.clock.now().date())
+        self.straddle_updater.on_bar = self._checkpoint
+        t = self.clock.register(threading.Thread(target=self.straddle_updater.run_forever, args=(self.exit_signal,),
+                                             name=instance_thread_name(self.instance, "vwap"), daemon=True))
         t.start()
         
         logger.info(f"[{self.symbol}] Straddle VWAP thread started successfully")
@@ -313,183 +677,245 @@ class AlgoStrategy(KiteTrader):
         logger.info(f"[{self.symbol}] Starting main strategy loop (rolling OR={self.open_range_min}m)...")
         update_strategy_action(self.redis_client, "Starting main strategy loop")
 
-        self.pivot_base = None
         # now = datetime.now()
         # time.sleep(60 - now.second)
 
         while not self.exit_signal.is_set():
             self._check_tradingview_signal()
-            now = datetime.now()
+            now = self.clock.now()
             if now.second != 0:
-                time.sleep(1)
+                self.clock.sleep(1)
                 continue
-            time.sleep(2)
-            now = datetime.now().replace(second=0, microsecond=0)
+            self.clock.sleep(2)
+            now = self.clock.now().replace(second=0, microsecond=0)
 
-            hist = StraddleVWAPUpdater.straddle_history
-            logger.info(f"[{now:%H:%M}] Checking straddle history (len={len(hist)})...")
+            with self.signal_lock:   # intrabar stop checks run on another thread
+                self._reload_params()
+                hist = self.straddle_updater.straddle_history
+                logger.info(f"[{now:%H:%M}] Checking straddle history (len={len(hist)})...", extra=THROTTLE)
             
-            if len(hist) < self.open_range_min:
-                logger.info(f"Need {self.open_range_min} straddle data points (have {len(hist)})")
-                update_strategy_action(self.redis_client, f"Waiting for data - have {len(hist)}/{self.open_range_min} points")
-            else:
-                last_straddle = hist[-1][1]
-                last_vwap     = StraddleVWAPUpdater.last_vwap_straddle
-                last_idx      = StraddleVWAPUpdater.index_history[-1][1]
+                if len(hist) < self.open_range_min:
+                    logger.info(f"Need {self.open_range_min} straddle data points (have {len(hist)})", extra=THROTTLE)
+                    update_strategy_action(self.redis_client, f"Waiting for data - have {len(hist)}/{self.open_range_min} points")
+                else:
+                    last_straddle = hist[-1][1]
+                    last_vwap     = self.straddle_updater.last_vwap_straddle
+                    last_idx      = self.straddle_updater.index_history[-1][1]
 
-                logger.info(
-                    f"[{now:%H:%M}] Straddle={last_straddle:.2f} | VWAP={last_vwap:.2f} | Index={last_idx:.2f}"
-                )
+                    logger.info(
+                        f"[{now:%H:%M}] Straddle={last_straddle:.2f} | VWAP={last_vwap:.2f} | Index={last_idx:.2f}"
+                    )
                 
-                update_trading_status(self.redis_client, self.symbol, straddle_price=last_straddle, vwap=last_vwap)
-                update_strategy_action(self.redis_client, f"Monitoring: Straddle={last_straddle:.2f}, VWAP={last_vwap:.2f}")
+                    update_trading_status(self.redis_client, self.symbol, straddle_price=last_straddle, vwap=last_vwap)
+                    update_strategy_action(self.redis_client, f"Monitoring: Straddle={last_straddle:.2f}, VWAP={last_vwap:.2f}")
 
-                hist_list = list(hist)
-                open_range_straddles = [s[1] for s in hist_list[-self.open_range_min:]]
-                hh = max(open_range_straddles)
-                ll = min(open_range_straddles)
+                    hist_list = list(hist)
+                    open_range_straddles = [s[1] for s in hist_list[-self.open_range_min:]]
+                    hh = max(open_range_straddles)
+                    ll = min(open_range_straddles)
 
-                update_strategy_action(self.redis_client, f"Range analysis: High={hh:.2f}, Low={ll:.2f}")
+                    update_strategy_action(self.redis_client, f"Range analysis: High={hh:.2f}, Low={ll:.2f}")
 
-                logger.info(f"Straddle Range High={hh:.2f} | Low={ll:.2f}")
+                    logger.info(f"Straddle Range High={hh:.2f} | Low={ll:.2f}")
 
-                if ((last_straddle > last_vwap ) and (not self.debit_spread_active) and (not self.batman_active) and (not self.exit_in_progress)): 
-                    update_strategy_action(self.redis_client, f"Straddle > Vwap")
-                    logger.info(" Straddle > VWAP → checking for OR break")
-                    cutoff = now - timedelta(minutes=self.open_range_min)
-                    logger.info(
-                        f" Rolling OR cutoff: {cutoff:%H:%M} (last {self.open_range_min}m)"
-                    )
-                    
-                    recent_index = [
-                            price for ts, price in StraddleVWAPUpdater.index_history
-                            if ts >= cutoff
-                        ]
-               
-                    if len(recent_index) < 2:
+                    if ((last_straddle > last_vwap ) and (not self.debit_spread_active) and (not self.batman_active) and (not self.exit_in_progress)): 
+                        update_strategy_action(self.redis_client, f"Straddle > Vwap")
+                        logger.info(" Straddle > VWAP → checking for OR break")
+                        cutoff = now - timedelta(minutes=self.open_range_min)
                         logger.info(
-                            f" Not enough index data points in the last {self.open_range_min}m"
+                            f" Rolling OR cutoff: {cutoff:%H:%M} (last {self.open_range_min}m)"
                         )
-                        continue
-                    indexHH = max(recent_index)
-                    indexLL = min(recent_index)
-                    logger.info(
-                        f" RollingOR( last {self.open_range_min}m ) → HH={indexHH:.2f}, LL={indexLL:.2f}"
-                    )
-                    update_strategy_action(self.redis_client, f"Rolling Index : HH={indexHH:.2f}, LL={indexLL:.2f}")
-
-                    # Debit CE if index breaks above high of index
-                    if last_idx >= indexHH :
-                        logger.info(" OR break above & Straddle>VWAP → CE debit")
-                        update_strategy_action(self.redis_client, "OR Break Above & Straddle > VWAP → CE Debit")
-                        self._execute_debit_spread("LONG")
-                        self.debit_spread_active = True
-                        self.swing_sl = ll    #Straddle Lower Low
-                        logger.info(f" Swing SL set to {self.swing_sl:.2f} (Straddle LL)")
-                        update_strategy_action(self.redis_client, "Debit Spread Active", 
-                                             {"side": "LONG", "swing_sl": self.swing_sl, "straddle": last_straddle, "index": last_idx})
-
-                    # Debit PE if index breaks below low of index
-                    elif last_idx <= indexLL:
-                        logger.info(" OR break below & Straddle>VWAP → PE debit")
-                        update_strategy_action(self.redis_client, "OR Break Below & Straddle > VWAP → PE Debit")
-                        self._execute_debit_spread("SHORT")
-                        self.debit_spread_active = True
-                        self.swing_sl = ll   #Straddle Lower Low
-                        logger.info(f" Swing SL set to {self.swing_sl:.2f} (Straddle LL)")
-                        update_strategy_action(self.redis_client, "Debit Spread Active", 
-                                             {"side": "SHORT", "swing_sl": self.swing_sl, "straddle": last_straddle, "index": last_idx})
-
-                # # 4) Stop-loss for Debit Spread
-                if (self.debit_spread_active and (self.swing_sl is not None) and (not self.exit_in_progress)):
-                    logger.info(
-                        f" Checking Debit Spread SL: {self.swing_sl:.2f} (last straddle: {last_straddle:.2f})"
-                    )
-                    update_strategy_action(self.redis_client, "Checking Debit Spread SL", 
-                                         {"swing_sl": self.swing_sl, "last_straddle": last_straddle})
-                    if last_straddle <= self.swing_sl:
-                        logger.info(
-                            f" Straddle {last_straddle:.2f} ≤ swing_sl {self.swing_sl:.2f} → exiting debit"
-                        )
-                        update_strategy_status(self.redis_client, "running", 
-                                             f"DEBIT SPREAD STOP LOSS HIT: Straddle {last_straddle:.2f} ≤ SL {self.swing_sl:.2f}")
-                        self._exit_debit_spread_positions()
-                        self.debit_spread_active = False
-
-                # # 5) Trailing SL on new HH in straddle
-                if self.debit_spread_active:
-                    if not hasattr(self, "_hh_peak"):
-                        self._hh_peak = last_straddle
-                    if last_straddle > self._hh_peak:
-                        self._hh_peak = last_straddle
-                        old_sl = self.swing_sl
-                        self.swing_sl = self._hh_peak * (1 - self.sl_buffer_pct)
-                        logger.info(
-                            f" New HH {self._hh_peak:.2f} → trailed SL {old_sl:.2f}→{self.swing_sl:.2f}"
-                        )
-                        update_strategy_action(self.redis_client, "Debit spread Trailing SL Updated", 
-                                             {"old_sl": old_sl, "new_sl": self.swing_sl, "hh_peak": self._hh_peak})
-
-                # 6) Batman Spread entry/shift
-                if ((last_straddle <= ll) and (not self.batman_active) and (not self.debit_spread_active) and (not self.exit_in_progress)):
-                    logger.info(" Straddle<LL → entering Batman Spread")
-                    update_strategy_status(self.redis_client, "running", 
-                                         f"BATMAN ENTRY: Straddle {last_straddle:.2f} <= LL {ll:.2f}")
-                    update_strategy_action(self.redis_client, "Executing Batman Spread Entry", 
-                                         {"straddle": last_straddle, "lower_limit": ll, "index": last_idx})
-                    
-                    self._execute_batman_spread()
-                    self.batman_active = True
-                    self.pivot_base = last_idx
-                    self.batman_sl = hh
                     
-                    update_strategy_status(self.redis_client, "running", 
-                                         f"BATMAN ACTIVE: Pivot={self.pivot_base:.2f}, SL={self.batman_sl:.2f}")
-
-                # If Batman active, check for SL
-                if self.batman_active and self.batman_sl is not None and (not self.exit_in_progress):
-                    logger.info(
-                        f" Checking Batman SL: {self.batman_sl:.2f} (last straddle: {last_straddle:.2f})"
-                    )
-                    if last_straddle >= self.batman_sl:
-                        logger.warning(
-                            f" Straddle {last_straddle:.2f} ≥ SL {self.batman_sl:.2f} → exiting Batman"
-                        )
-                        update_strategy_status(self.redis_client, "running", 
-                                             f"BATMAN STOP LOSS: Straddle {last_straddle:.2f} >= SL {self.batman_sl:.2f}")
-                        update_strategy_action(self.redis_client, "Batman Stop Loss Triggered", 
-                                             {"straddle": last_straddle, "stop_loss": self.batman_sl})
-                        
-                        self._exit_batman_positions()
-                        self.batman_active = False
-                        self.pivot_base = None
-                        
-                        update_strategy_status(self.redis_client, "running", "Batman positions exited due to stop loss")
-
-                # Shift existing Batman if index moves N pts away from pivot_base
-                if self.batman_active and self.pivot_base is not None and (not self.exit_in_progress):
-                    index_move = abs(last_idx - self.pivot_base)
-                    if index_move >= self.shift_threshold :
+                        recent_index = [
+                                price for ts, price in self.straddle_updater.index_history
+                                if ts >= cutoff
+                            ]
+               
+                        if len(recent_index) < 2:
+                            logger.info(
+                                f" Not enough index data points in the last {self.open_range_min}m"
+                            )
+                            continue
+                        indexHH = max(recent_index)
+                        indexLL = min(recent_index)
                         logger.info(
-                            f" Index moved {last_idx-self.pivot_base:.0f} pts ≥ "
-                            f"{self.shift_threshold} → shifting Batman legs"
+                            f" RollingOR( last {self.open_range_min}m ) → HH={indexHH:.2f}, LL={indexLL:.2f}"
                         )
+                        update_strategy_action(self.redis_client, f"Rolling Index : HH={indexHH:.2f}, LL={indexLL:.2f}")
+
+                        # Debit CE if index breaks above high of index
+                        if last_idx >= indexHH :
+                            logger.info(" OR break above & Straddle>VWAP → CE debit")
+                            update_strategy_action(self.redis_client, "OR Break Above & Straddle > VWAP → CE Debit")
+                            self._execute_debit_spread("LONG")
+                            self.debit_spread_active = True
+                            self.swing_sl = ll    #Straddle Lower Low
+                            logger.info(f" Swing SL set to {self.swing_sl:.2f} (Straddle LL)")
+                            update_strategy_action(self.redis_client, "Debit Spread Active", 
+                                                 {"side": "LONG", "swing_sl": self.swing_sl, "straddle": last_straddle, "index": last_idx})
+
+                        # Debit PE if index breaks below low of index
+                        elif last_idx <= indexLL:
+                            logger.info(" OR break below & Straddle>VWAP → PE debit")
+                            update_strategy_action(self.redis_client, "OR Break Below & Straddle > VWAP → PE Debit")
+                            self._execute_debit_spread("SHORT")
+                            self.debit_spread_active = True
+                            self.swing_sl = ll   #Straddle Lower Low
+                            logger.info(f" Swing SL set to {self.swing_sl:.2f} (Straddle LL)")
+                            update_strategy_action(self.redis_client, "Debit Spread Active", 
+                                                 {"side": "SHORT", "swing_sl": self.swing_sl, "straddle": last_straddle, "index": last_idx})
+
+                    # # 4) Stop-loss for Debit Spread
+                    self._check_debit_spread_sl(last_straddle)
+
+                    # # 5) Trailing SL on new HH in straddle
+                    if self.debit_spread_active:
+                        if not hasattr(self, "_hh_peak"):
+                            self._hh_peak = last_straddle
+                        if last_straddle > self._hh_peak:
+                            self._hh_peak = last_straddle
+                            old_sl = self.swing_sl
+                            self.swing_sl = self._hh_peak * (1 - self.sl_buffer_pct)
+                            logger.info(
+                                f" New HH {self._hh_peak:.2f} → trailed SL {old_sl:.2f}→{self.swing_sl:.2f}"
+                            )
+                            update_strategy_action(self.redis_client, "Debit spread Trailing SL Updated", 
+                                                 {"old_sl": old_sl, "new_sl": self.swing_sl, "hh_peak": self._hh_peak})
+
+                    # 6) Batman Spread entry/shift
+                    if ((last_straddle <= ll) and (not self.batman_active) and (not self.debit_spread_active) and (not self.exit_in_progress)):
+                        logger.info(" Straddle<LL → entering Batman Spread")
                         update_strategy_status(self.redis_client, "running", 
-                                             f"BATMAN SHIFT: Index moved {index_move:.0f} pts from pivot {self.pivot_base:.2f}")
-                        update_strategy_action(self.redis_client, "Shifting Batman Positions", 
-                                             {"index_move": index_move, "old_pivot": self.pivot_base, "new_pivot": last_idx})
-                        
-                        self._exit_batman_positions()
+                                             f"BATMAN ENTRY: Straddle {last_straddle:.2f} <= LL {ll:.2f}")
+                        update_strategy_action(self.redis_client, "Executing Batman Spread Entry", 
+                                             {"straddle": last_straddle, "lower_limit": ll, "index": last_idx})
+                    
                         self._execute_batman_spread()
+                        self.batman_active = True
                         self.pivot_base = last_idx
-                        
+                        self.batman_sl = hh
+                    
                         update_strategy_status(self.redis_client, "running", 
-                                             f"Batman positions shifted to new pivot: {self.pivot_base:.2f}")
+                                             f"BATMAN ACTIVE: Pivot={self.pivot_base:.2f}, SL={self.batman_sl:.2f}")
+
+                    # If Batman active, check for SL
+                    self._check_batman_sl(last_straddle)
+
+                    # Shift existing Batman if index moves N pts away from pivot_base
+                    self._check_batman_shift(last_idx)
+
+                    self._checkpoint()
+
+            self.clock.sleep(1)
+
+    def _check_debit_spread_sl(self, last_straddle, source="bar"):
+        """Exit the debit spread once the straddle falls to the swing SL"""
+        if not (self.debit_spread_active and (self.swing_sl is not None) and (not self.exit_in_progress)):
+            return
+        if source == "bar":
+            logger.info(
+                f" Checking Debit Spread SL: {self.swing_sl:.2f} (last straddle: {last_straddle:.2f})"
+            )
+            update_strategy_action(self.redis_client, "Checking Debit Spread SL", 
+                                 {"swing_sl": self.swing_sl, "last_straddle": last_straddle})
+        if last_straddle <= self.swing_sl:
+            logger.info(
+                f" Straddle {last_straddle:.2f} ≤ swing_sl {self.swing_sl:.2f} → exiting debit ({source})"
+            )
+            update_strategy_status(self.redis_client, "running", 
+                                 f"DEBIT SPREAD STOP LOSS HIT: Straddle {last_straddle:.2f} ≤ SL {self.swing_sl:.2f}")
+            self._exit_debit_spread_positions()
+            self.debit_spread_active = False
+
+    def _check_batman_sl(self, last_straddle, source="bar"):
+        """Exit Batman once the straddle rises to its SL"""
+        if not (self.batman_active and self.batman_sl is not None and (not self.exit_in_progress)):
+            return
+        if source == "bar":
+            logger.info(
+                f" Checking Batman SL: {self.batman_sl:.2f} (last straddle: {last_straddle:.2f})"
+            )
+        if last_straddle >= self.batman_sl:
+            logger.warning(
+                f" Straddle {last_straddle:.2f} ≥ SL {self.batman_sl:.2f} → exiting Batman ({source})"
+            )
+            update_strategy_status(self.redis_client, "running", 
+                                 f"BATMAN STOP LOSS: Straddle {last_straddle:.2f} >= SL {self.batman_sl:.2f}")
+            update_strategy_action(self.redis_client, "Batman Stop Loss Triggered", 
+                                 {"straddle": last_straddle, "stop_loss": self.batman_sl, "source": source})
+            
+            self._exit_batman_positions()
+            self.batman_active = False
+            self.pivot_base = None
+            
+            update_strategy_status(self.redis_client, "running", "Batman positions exited due to stop loss")
 
-            time.sleep(1)
+    def _check_batman_shift(self, last_idx, source="bar"):
+        """Re-centre Batman legs once the index is shift_threshold points away from pivot_base"""
+        if not (self.batman_active and self.pivot_base is not None and (not self.exit_in_progress)):
+            return
+        index_move = abs(last_idx - self.pivot_base)
+        if index_move >= self.shift_threshold :
+            logger.info(
+                f" Index moved {last_idx-self.pivot_base:.0f} pts ≥ "
+                f"{self.shift_threshold} → shifting Batman legs ({source})"
+            )
+            update_strategy_status(self.redis_client, "running", 
+                                 f"BATMAN SHIFT: Index moved {index_move:.0f} pts from pivot {self.pivot_base:.2f}")
+            update_strategy_action(self.redis_client, "Shifting Batman Positions", 
+                                 {"index_move": index_move, "old_pivot": self.pivot_base, "new_pivot": last_idx, "source": source})
+            
+            self._exit_batman_positions()
+            self._execute_batman_spread(underlying=last_idx)
+            self.pivot_base = last_idx
+            
+            update_strategy_status(self.redis_client, "running", 
+                                 f"Batman positions shifted to new pivot: {self.pivot_base:.2f}")
+
+    def start_intrabar_monitor(self):
+        """Evaluate stop-loss and shift rules between bar closes (opt-in via IntrabarStops)"""
+        if not self.intrabar_stops:
+            return
+        self.intrabar_thread = self.clock.register(threading.Thread(target=self._intrabar_loop,
+                                                                    name=instance_thread_name(self.instance, "intrabar"), daemon=True))
+        self.intrabar_thread.start()
+        update_strategy_action(self.redis_client, "Starting Intrabar Stop Monitor",
+                             {"interval_sec": self.stop_check_interval})
+
+    def _intrabar_loop(self):
+        """
+        Runs the SL and shift checks on live prices: on every tick batch while the
+        updater streams ticks, else every StopCheckIntervalSec (at least LTP_POLL_SECS)
+        from ltp(). Entries, the opening range and the trailing SL stay on bar close
+        in strategy_main.
+        """
+        logger.info(f"[{self.symbol}] Intrabar stop monitor started (interval {self.stop_check_interval}s)")
+        updater = self.straddle_updater
+        while not self.exit_signal.is_set():
+            if updater.bars is not None:
+                if not self.clock.wait(updater.tick_event, self.stop_check_interval):
+                    continue
+                updater.tick_event.clear()
+            elif self.clock.wait(self.exit_signal, max(self.stop_check_interval, LTP_POLL_SECS)):
+                break   # each check is an ltp() call against the shared quote rate limit
+
+            if not updater.ready_to_execute or not (self.debit_spread_active or self.batman_active):
+                continue
+            try:
+                prices = updater.live_prices()
+            except Exception as e:
+                logger.error(f"[{self.symbol}] Intrabar price fetch failed: {e}")
+                continue
+            if prices is None:
+                continue
+            straddle, index_price = prices
+            with self.signal_lock:
+                self._check_debit_spread_sl(straddle, source="intrabar")
+                self._check_batman_sl(straddle, source="intrabar")
+                self._check_batman_shift(index_price, source="intrabar")
 
     def _execute_debit_spread(self, side):
-        underlying = StraddleVWAPUpdater.index_history[-1][1]  # Last index price
+        underlying = self.straddle_updater.index_history[-1][1]  # Last index price
         atm_strike = self._round_to_atm(underlying)
         q = self.quantity
 
@@ -554,21 +980,24 @@ class AlgoStrategy(KiteTrader):
 
         current_mtm = self._calculate_current_mtm()
         self.day_pnl = self.day_pnl + current_mtm         
-        self.debit_spread_positions.clear()
-        self.debit_spread_closed_pnls.clear()
+        with self.ledger_lock:
+            self.debit_spread_positions.clear()
+            self.debit_spread_closed_pnls.clear()
+            self._journal("ledger_reset", strategy="DEBIT_SPREAD", day_pnl=self.day_pnl)
         self.highest_mtm = 0     
         logger.info(f"[{self.symbol}] All Debit Spread positions exited successfully.")
         update_strategy_status(self.redis_client, "running", f"Debit Spread positions exited: {exit_count}/{positions_to_exit} orders placed")
 
 
-    def _execute_batman_spread(self):
+    def _execute_batman_spread(self, underlying=None):
         """
         1. Sell CE & PE at ±StraddleGapPct
         2. Buy hedge‐legs at ±HedgeGapPct
         3. Record all legs in self.positions
         4. Set initial SL = previous swing high (± buffer if trailing)
         """
-        underlying = StraddleVWAPUpdater.index_history[-1][1]  # Last index price
+        if underlying is None:
+            underlying = self.straddle_updater.index_history[-1][1]  # Last index price
         ce_strike = round(underlying * (1 + self.straddle_gap_pct) / self.strike_step) * self.strike_step
         pe_strike = round(underlying * (1 - self.straddle_gap_pct) / self.strike_step) * self.strike_step
         ce_hedge  = round(underlying * (1 + self.hedge_gap_pct) / self.strike_step) * self.strike_step
@@ -662,8 +1091,10 @@ class AlgoStrategy(KiteTrader):
 
         current_mtm = self._calculate_current_mtm()
         self.day_pnl = self.day_pnl + current_mtm     
-        self.batman_positions.clear()
-        self.batman_closed_pnls.clear()
+        with self.ledger_lock:
+            self.batman_positions.clear()
+            self.batman_closed_pnls.clear()
+            self._journal("ledger_reset", strategy="BATMAN", day_pnl=self.day_pnl)
         self.highest_mtm = 0
         logger.info(f"[{self.symbol}] All Batman positions exited successfully.")
         update_strategy_status(self.redis_client, "running", f"Batman positions exited: {exit_count}/{positions_to_exit} orders placed")
@@ -673,10 +1104,20 @@ class AlgoStrategy(KiteTrader):
         logger.info(f"[{self.symbol}] Starting MTM monitor...")
         update_strategy_action(self.redis_client, "Starting MTM Monitor")
         
-        self.mtm_thread = threading.Thread(target=self._mtm_monitor_loop, daemon=True)
+        self.mtm_thread = self.clock.register(threading.Thread(target=self._mtm_monitor_loop,
+                                                               name=instance_thread_name(self.instance, "mtm"), daemon=True))
         self.mtm_thread.start()
         logger.info(f"[{self.symbol}] MTM monitor started")
     
+    def start_reconciler(self):
+        """Start broker position reconciliation in a separate thread"""
+        if self.sandbox_mode:
+            logger.info(f"[{self.symbol}] Sandbox mode - position reconciler disabled")
+            return
+        self.reconciler = PositionReconciler(self, interval=self.reconcile_interval)
+        self.reconciler.start(self.exit_signal)
+        update_strategy_action(self.redis_client, "Starting Position Reconciler", {"interval_sec": self.reconcile_interval})
+
     def _mtm_monitor_loop(self):
         """Background thread to monitor MTM and update status"""
         logger.info(f"[{self.symbol}] Starting MTM monitor loop...")
@@ -685,36 +1126,38 @@ class AlgoStrategy(KiteTrader):
         while not self.exit_signal.is_set():
             try:
                 if is_in_exit_process:
-                    time.sleep(5)
+                    self.clock.sleep(5)
                     continue
 
                 current_mtm = self._calculate_current_mtm()
                 self.current_mtm = current_mtm
+                # Read the limits once so a reload between bars never mixes old and new values in one check
+                target_pnl, exit_pnl, rolling_value = self.target_pnl, self.exit_pnl, self.rolling_value
                 update_strategy_action(self.redis_client, f"Day PnL {self.day_pnl:.2f}")
                 if current_mtm > self.highest_mtm:
                     self.highest_mtm = current_mtm
 
                 if self.trail_stop_loss and self.highest_mtm > 0:
-                    update_trading_status(self.redis_client, self.symbol, exit_pnl=(self.highest_mtm - self.rolling_value))
+                    update_trading_status(self.redis_client, self.symbol, exit_pnl=(self.highest_mtm - rolling_value))
                 else:
-                    logger.info(f"[{self.symbol}] Current MTM: {current_mtm:.2f}, Target PnL: {self.target_pnl:.2f}, Exit PnL: {self.exit_pnl:.2f}, Highest MTM: {self.highest_mtm:.2f}")
-                    update_trading_status(self.redis_client, self.symbol, exit_pnl=self.exit_pnl)
+                    logger.info(f"[{self.symbol}] Current MTM: {current_mtm:.2f}, Target PnL: {target_pnl:.2f}, Exit PnL: {exit_pnl:.2f}, Highest MTM: {self.highest_mtm:.2f}", extra=THROTTLE)
+                    update_trading_status(self.redis_client, self.symbol, exit_pnl=exit_pnl)
 
-                if current_mtm >= self.target_pnl:
-                    logger.info(f"[{self.symbol}] Target PnL reached! MTM: {current_mtm:.2f} >= Target: {self.target_pnl:.2f}")
+                if current_mtm >= target_pnl:
+                    logger.info(f"[{self.symbol}] Target PnL reached! MTM: {current_mtm:.2f} >= Target: {target_pnl:.2f}")
                     is_in_exit_process = True
                     self.exit_all_positions()
                     self.stop()
 
-                elif current_mtm <= self.exit_pnl:
-                    logger.info(f"[{self.symbol}] Exit PnL breached! MTM: {current_mtm:.2f} <= Exit PnL: {self.exit_pnl:.2f}")
+                elif current_mtm <= exit_pnl:
+                    logger.info(f"[{self.symbol}] Exit PnL breached! MTM: {current_mtm:.2f} <= Exit PnL: {exit_pnl:.2f}")
                     is_in_exit_process = True
                     self.exit_all_positions()
                     self.stop()
 
                 elif self.trail_stop_loss and self.highest_mtm > 0:
-                    if current_mtm <= self.highest_mtm - self.rolling_value:
-                        logger.info(f"[{self.symbol}] Trailing stop triggered! MTM: {current_mtm:.2f} < Highest MTM - Rolling Value: {self.highest_mtm - self.rolling_value:.2f}")
+                    if current_mtm <= self.highest_mtm - rolling_value:
+                        logger.info(f"[{self.symbol}] Trailing stop triggered! MTM: {current_mtm:.2f} < Highest MTM - Rolling Value: {self.highest_mtm - rolling_value:.2f}")
                         is_in_exit_process = True
                         self.exit_all_positions()
                         self.stop()
@@ -729,12 +1172,12 @@ class AlgoStrategy(KiteTrader):
                     self.exit_all_positions()
                     self.stop()
 
-                time.sleep(3)
+                self.clock.sleep(3)
 
             except Exception as e:
                 logger.error(f"[{self.symbol}] MTM monitor error: {e}")
                 update_strategy_status(self.redis_client, "error", f"MTM monitor error: {str(e)}")
-                time.sleep(30)
+                self.clock.sleep(30)
     
     def _check_exit_all_signal(self):
         """Check if exit all positions signal is set in Redis"""
@@ -776,7 +1219,7 @@ class AlgoStrategy(KiteTrader):
         try:
             if self.exit_in_progress:
                 logger.info(f"[{self.symbol}] Exit already in progress, skipping...")
-                time.sleep(2)
+                self.clock.sleep(2)
                 return
             self.exit_in_progress = True
             self._exit_batman_positions()
@@ -802,7 +1245,7 @@ class AlgoStrategy(KiteTrader):
         if reason == "REQUESTED":
             update_strategy_status(self.redis_client, "stopping", "Strategy stop requested")
             update_strategy_action(self.redis_client, "Stopping strategy")
-        time.sleep(1)
+        self.clock.sleep(1)
         positions_data = {
                 "batman_positions": getattr(self, 'batman_positions', {}),
                 "debit_positions": getattr(self, 'debit_spread_positions', {})
@@ -810,22 +1253,83 @@ class AlgoStrategy(KiteTrader):
 
         update_trading_status(self.redis_client, self.symbol, positions_data=positions_data)
         self.exit_signal.set()
-        StraddleVWAPUpdater.ready_to_execute = False
+        if self.journal is not None:
+            self.journal.flush()
+        if getattr(self, "straddle_updater", None) is not None:
+            self.straddle_updater.ready_to_execute = False
         logger.info(f"[{self.symbol}] Strategy stopped")
         if reason == "REQUESTED":
             update_strategy_status(self.redis_client, "stopped", "Strategy stopped successfully")
             update_strategy_action(self.redis_client, "stopped", "Strategy stopped successfully")
 
+    def _instance_config(self):
+        """
+        Shared Redis inputs, overlaid with the orchestrator's per-instance settings
+        and then with inputs set in Redis for this instance only
+        """
+        config = self.redis_config.get_all_config()
+        config.update(self.overrides)
+        config.update(self.redis_config.get_instance_config(self.instance))
+        return config
+
+    def _reload_params(self):
+        """
+        Apply changed HOT_PARAMS from the latest config snapshot. Called at the
+        start of each bar under signal_lock, so a change lands between bars and
+        all of its values are swapped together; positions, pivots and VWAP
+        history are left alone. Invalid snapshots are rejected as a whole.
+        Inputs written without bumping the version (redis-cli, clear_redis.py)
+        still apply: the reader's generation moves whenever its inputs change.
+        """
+        generation = self.redis_config.generation
+        if generation == self.config_generation:
+            return
+        self.config_generation = generation
+        version = self.redis_config.version
+        config = self._instance_config()
+
+        changes, errors = {}, []
+        for key, (attr, parse, check) in HOT_PARAMS.items():
+            if key not in config:
+                continue
+            try:
+                value = parse(config[key])
+            except (TypeError, ValueError):
+                errors.append(f"{key}={config[key]!r} is not a number")
+                continue
+            if not check(value):
+                errors.append(f"{key}={config[key]!r} is out of range")
+            elif value != getattr(self, attr):
+                changes[attr] = (getattr(self, attr), value)
+        target_pnl = changes.get('target_pnl', (None, self.target_pnl))[1]
+        exit_pnl = changes.get('exit_pnl', (None, self.exit_pnl))[1]
+        if exit_pnl >= target_pnl:
+            errors.append(f"ExitPnl {exit_pnl} must be below TargetPnl {target_pnl}")
+
+        if errors:
+            logger.warning(f"[{self.symbol}] Config v{version} rejected: {'; '.join(errors)}")
+            update_strategy_action(self.redis_client, "Config change rejected",
+                                   {"version": version, "errors": errors})
+            return
+
+        for attr, (_, value) in changes.items():
+            setattr(self, attr, value)
+        self.config_version = version
+        if changes:
+            summary = {attr: {"from": old, "to": new} for attr, (old, new) in changes.items()}
+            logger.info(f"[{self.symbol}] Config v{version} applied: {summary}")
+            update_strategy_action(self.redis_client, "Config reloaded", {"version": version, "changes": summary})
+
     def _check_tradingview_signal(self):
         try:
-            signal_json = self.redis_client.get("strategy:tv_signal");
-            if not signal_json:
+            try:
+                signal = self.tv_signals.get_nowait()
+            except queue.Empty:
                 return
-            
-            signal = json.loads(signal_json)
 
+            # The backend stamps signals with wall-clock time; their age is real time
+            # even when the strategy runs on a simulated clock
             if time.time() - signal.get('timestamp',0) >  60:
-                self.redis_client.delete("strategy:tv_signal")
                 return
             
             decision = signal.get('decision',{})
@@ -844,8 +1348,6 @@ class AlgoStrategy(KiteTrader):
                 update_strategy_action(self.redis_client,"TV Signal : Exiting All")
                 self.exit_all_positions()
 
-            self.redis_client.delete("strategy:tv_signal")
-
         except Exception as e:
             logger.error(f"Error checking TV signal: {e}")
         
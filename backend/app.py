@@ -1,7 +1,11 @@
-from flask import Flask, request, jsonify
-import redis
+from flask import Flask, Response, request, jsonify
+import os
 import json
+import queue
+import hashlib
 import time
+import threading
+from datetime import datetime, timezone
 import logging
 from pathlib import Path
 import csv
@@ -12,13 +16,29 @@ if str(root_dir) not in sys.path:
     sys.path.append(str(root_dir))
 
 from tradingview_analyzer import TradingViewAnalyzer
+from underlying_registry import get_registry
+from utils.redis_utils import read_trading_status, instance_key, decode_hash, decode_entries, read_entries
+from utils.serializer import loads
+from utils.redis_config import write_config, input_prefix
+from utils.redis_client import get_redis, ping, pool_stats
+from utils.control_channel import publish_control, resolve_targets, registered_instances, parse_instances, INSTANCES_KEY
+from utils.update_stream import UpdateHub, RESYNC
+from utils.job_queue import JobQueue, QueueFull
+from utils.vision_queue import live_workers, submit_analysis, wait_result
 
 app = Flask(__name__, static_folder='static', static_url_path='')
-r = redis.Redis(host='localhost', port=6379, db=0)
+r = get_redis()
 
 INPUT_PREFIX = "strategy:input:"
 OUTPUT_KEY = "strategy:output"
 CONTROL_KEY = "strategy:control"
+STREAM_KEEPALIVE = 15   # seconds between SSE comments on an idle stream
+TRADING_STAMP_FIELDS = (b"timestamp", b"last_update")   # left out of the snapshot version
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "2"))
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "50"))
+WEBHOOK_PER_TICKER = int(os.getenv("WEBHOOK_PER_TICKER", "1"))
+WEBHOOK_JOB_TIMEOUT = 200   # seconds per screenshot analysis
+VIEW_CACHE_SECS = 5   # how long the registered instances and configured index are reused
 
 logging.basicConfig(level=logging.INFO)
 backend_logger = logging.getLogger("backend")
@@ -27,60 +47,132 @@ DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 EXPIRIES_CSV = DATA_DIR / "expiries.csv"
 print(EXPIRIES_CSV)
 
-tv_analyzer = TradingViewAnalyzer()
+# Webhook analyses run here, at most WEBHOOK_PER_TICKER at a time for one ticker
+webhook_jobs = JobQueue(name="webhook", workers=WEBHOOK_WORKERS,
+                        max_pending=WEBHOOK_MAX_PENDING, per_key=WEBHOOK_PER_TICKER)
+tv_analyzer = TradingViewAnalyzer(jobs=JobQueue(name="vision", workers=1, max_pending=WEBHOOK_MAX_PENDING))
+update_hub = UpdateHub(r)
 
-_exp_cache = {"mtime": 0.0, "rows": []}
+EXPIRY_WATCH_SECS = 5   # how often data/expiries.csv is checked for changes
 
-def _load_expiry_rows():
-    try:
-        mtime = EXPIRIES_CSV.stat().st_mtime
-    except FileNotFoundError:
-        return []
+_exp_index = {"stamp": None, "version": "none", "last_modified": None, "bodies": {}}
+_exp_lock = threading.Lock()
+_exp_watcher = None
 
-    if mtime != _exp_cache["mtime"]:
-        rows = []
+def _build_expiry_index(stamp):
+    """
+    Response bodies of /api/expiries for every symbol (and all symbols, key ""),
+    each date-sorted and deduplicated by token, from the current expiries file.
+    """
+    by_symbol = {}
+    if stamp is not None:
         with EXPIRIES_CSV.open("r", newline="", encoding="utf-8") as f:
             rdr = csv.DictReader(f)
             for row in rdr:
-                rows.append({
+                item = {
                     "symbol": (row.get("symbol") or "").strip(),
                     "expiry_iso": (row.get("expiry") or "").strip(),
                     "zerodha_token": (row.get("zerodha_token") or row.get("token_short") or "").strip(),
-                })
-        _exp_cache["mtime"] = mtime
-        _exp_cache["rows"] = rows
-        backend_logger.info("Loaded %d expiry rows from %s", len(rows), EXPIRIES_CSV)
-    return _exp_cache["rows"]
+                }
+                if item["zerodha_token"]:
+                    by_symbol.setdefault(item["symbol"].upper(), []).append(item)
+
+    version = f"{stamp[0]:x}-{stamp[1]:x}" if stamp else "none"
+    index = {}
+    for symbol, rows in by_symbol.items():
+        # ISO dates sort chronologically; the earliest row of a token wins
+        rows.sort(key=lambda row: row["expiry_iso"])
+        seen, items = set(), []
+        for row in rows:
+            if row["zerodha_token"] not in seen:
+                seen.add(row["zerodha_token"])
+                items.append(row)
+        index[symbol] = items
+    index[""] = sorted((row for items in index.values() for row in items),
+                       key=lambda row: (row["expiry_iso"], row["symbol"]))
+
+    bodies = {
+        symbol: json.dumps({"items": items, "count": len(items), "symbol": symbol or None, "version": version})
+        for symbol, items in index.items()
+    }
+    backend_logger.info("Loaded %d expiries for %d symbols from %s", len(index[""]), len(by_symbol), EXPIRIES_CSV)
+    return {
+        "stamp": stamp,
+        "version": version,
+        "last_modified": datetime.fromtimestamp(stamp[0] // 10**9, tz=timezone.utc) if stamp else None,
+        "bodies": bodies,
+    }
+
+def _reload_expiry_index():
+    """Rebuild the expiry index if the file changed since it was built"""
+    global _exp_index
+    try:
+        st = EXPIRIES_CSV.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        stamp = None
+    if stamp != _exp_index["stamp"]:
+        _exp_index = _build_expiry_index(stamp)
+
+def _watch_expiries():
+    while True:
+        time.sleep(EXPIRY_WATCH_SECS)
+        try:
+            _reload_expiry_index()
+        except Exception as e:
+            backend_logger.error(f"Expiry index reload failed: {e}")
+
+def _expiry_index():
+    """Current expiry index; the first call builds it and starts the file watcher"""
+    global _exp_watcher
+    if _exp_watcher is None:
+        with _exp_lock:
+            if _exp_watcher is None:
+                _reload_expiry_index()
+                _exp_watcher = threading.Thread(target=_watch_expiries, name="expiry-watch", daemon=True)
+                _exp_watcher.start()
+    return _exp_index
 
 @app.route('/api/expiries', methods=['GET'])
 def api_expiries():
+    """
+    Expiries of ?symbol= (all symbols if omitted), earliest first, from the
+    prebuilt index. Conditional requests (If-None-Match / If-Modified-Since)
+    get 304 until data/expiries.csv changes.
+    """
     try:
         symbol = (request.args.get('symbol') or "").upper().strip()
-        rows = _load_expiry_rows()
-
-        if symbol:
-            rows = [r for r in rows if (r["symbol"] or "").upper() == symbol]
+        index = _expiry_index()
+        body = index["bodies"].get(symbol)
+        if body is None:
+            body = json.dumps({"items": [], "count": 0, "symbol": symbol or None, "version": index["version"]})
 
-        rows = sorted(rows, key=lambda r: r.get("expiry", ""))
-        seen, items = set(), []
-        for r in rows:
-            tok = r.get("zerodha_token")
-            if tok and tok not in seen:
-                seen.add(tok)
-                items.append(r)
-
-        return jsonify({
-            "items": items,
-            "count": len(items),
-            "symbol": symbol or None,
-            "timestamp": time.time()
-        }), 200
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(f"{index['version']}-{symbol or 'ALL'}")
+        if index["last_modified"]:
+            response.last_modified = index["last_modified"]
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
         backend_logger.exception("Failed to serve expiries")
         return jsonify({"error": f"Failed to load expiries: {e}"}), 500
 
 
+@app.route('/api/underlyings', methods=['GET'])
+def api_underlyings():
+    """
+    List tradable underlyings and their resolved settings from the registry.
+    """
+    try:
+        registry = get_registry()
+        items = [registry.get(sym).to_dict() for sym in registry.symbols()]
+        return jsonify({"items": items, "count": len(items), "timestamp": time.time()}), 200
+    except Exception as e:
+        backend_logger.exception("Failed to serve underlyings")
+        return jsonify({"error": f"Failed to load underlyings: {e}"}), 500
+
+
 @app.route('/api/strategy/input', methods=['POST'])
 def set_strategy_input():
     """
@@ -94,19 +186,66 @@ def set_strategy_input():
         
         key = data.get('key')
         value = data.get('value')
+        # Optional: set the input for one instance only
+        instance = data.get('instance') or request.args.get('instance')
         if not key or value is None:
             return jsonify({"error": "Missing key or value"}), 400
         
-        r.set(INPUT_PREFIX + key, json.dumps(value))
+        write_config(r, key, value, instance=instance)
+        if key == 'index':
+            _view_cache["at"] = 0.0
+        publish_control(r, resolve_targets(r, instance=instance), "config_changed", keys=[key])
         return jsonify({"status": "ok", "message": f"Successfully saved {key}"}), 200
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+_view_cache = {"at": 0.0, "instance": None}
+_view_lock = threading.Lock()
+
+
+def _view_instance():
+    """
+    Instance a dashboard read is about: ?instance=, else the registered instance
+    trading the configured index, else None (the shared strategy:* keys).
+    The default is re-resolved at most every VIEW_CACHE_SECS, in one round
+    trip, so reads without ?instance= cost no extra trips in between.
+    """
+    instance = request.args.get("instance")
+    if instance:
+        return instance
+    with _view_lock:
+        if time.monotonic() - _view_cache["at"] < VIEW_CACHE_SECS:
+            return _view_cache["instance"]
+    pipe = r.pipeline(transaction=False)
+    pipe.hgetall(INSTANCES_KEY)
+    pipe.get(INPUT_PREFIX + "index")
+    raw_registered, raw_index = pipe.execute()
+    symbol = json.loads(raw_index) if raw_index else None
+    matches = [name for name, sym in parse_instances(raw_registered).items() if sym == symbol]
+    with _view_lock:
+        _view_cache["at"], _view_cache["instance"] = time.monotonic(), matches[0] if matches else None
+        return _view_cache["instance"]
+
+def _send_control(action, body, **fields):
+    """
+    Push a command to the control stream of the targeted instances: body's (or
+    the query's) 'instance', else every instance trading body's 'symbol' or the
+    configured index.
+    """
+    instance = body.get("instance") or request.args.get("instance")
+    symbol = body.get("symbol")
+    if not instance and not symbol:
+        raw = r.get(INPUT_PREFIX + "index")
+        symbol = json.loads(raw) if raw else None
+    targets = resolve_targets(r, instance=instance, symbol=symbol)
+    publish_control(r, targets, action, requested_by="backend_api", **fields)
+    return targets
+
 @app.route('/api/strategy/run', methods=['POST'])
 def run_strategy():
     """
-    Signal the strategy to start by setting a control flag in Redis.
-    The strategy process should be running independently and monitoring this flag.
+    Signal the strategy to start through the instances' control streams.
+    The strategy process should be running independently and listening on them.
     """
     try:
         backend_logger.info("Received request to start strategy execution")
@@ -117,7 +256,14 @@ def run_strategy():
             "timestamp": time.time(),
             "requested_by": "backend_api"
         }
-        
+        # Optional target when several instances are hosted by the orchestrator
+        body = request.get_json(silent=True) or {}
+        for field in ("instance", "symbol"):
+            if body.get(field):
+                control_signal[field] = body[field]
+        
+        control_signal["targets"] = _send_control("start", body)
+        # Last command, shown on the dashboard
         r.set(CONTROL_KEY, json.dumps(control_signal))
         
         # Update execution status
@@ -139,8 +285,8 @@ def run_strategy():
 @app.route('/api/strategy/stop', methods=['POST'])
 def stop_strategy():
     """
-    Signal the strategy to stop by setting a control flag in Redis.
-    The strategy process should monitor this flag and stop execution gracefully.
+    Signal the strategy to stop through the instances' control streams.
+    The strategy process stops execution gracefully when it reads the command.
     """
     try:
         backend_logger.info("Received request to stop strategy execution")
@@ -151,7 +297,14 @@ def stop_strategy():
             "timestamp": time.time(),
             "requested_by": "backend_api"
         }
-        
+        # Optional target when several instances are hosted by the orchestrator
+        body = request.get_json(silent=True) or {}
+        for field in ("instance", "symbol"):
+            if body.get(field):
+                control_signal[field] = body[field]
+        
+        control_signal["targets"] = _send_control("stop", body)
+        # Last command, shown on the dashboard
         r.set(CONTROL_KEY, json.dumps(control_signal))
         
         result = {
@@ -172,23 +325,18 @@ def stop_strategy():
 @app.route('/api/strategy/exit-all', methods=['POST'])
 def exit_all_positions():
     """
-    Signal the strategy to exit all positions by setting a control flag in Redis.
+    Signal the strategy to exit all positions through the instances' control streams.
     """
     try:
         backend_logger.info("Received request to exit all positions")
         
-        # Set the exit all signal in Redis
-        exit_signal = {
-            "exit_all_positions": True,
-            "timestamp": time.time(),
-            "requested_by": "backend_api"
-        }
-        
-        r.set("strategy:exit_all_signal", json.dumps(exit_signal))
+        body = request.get_json(silent=True) or {}
+        targets = _send_control("exit_all", body)
         
         result = {
             "status": "exit_all_requested",
             "message": "Exit all positions signal sent via Redis",
+            "targets": targets,
             "timestamp": time.time()
         }
         
@@ -216,31 +364,92 @@ def get_strategy_output():
         return jsonify({"status": "pending", "message": "No output available yet"}), 204
     return jsonify(json.loads(result)), 200
 
+CONFIG_FIELDS = [
+    'index', 'expiry', 'Quantity', 'QtyHedgeRatio', 'PivotRangeMinutes', 'ShiftThresholdPts',
+    'StraddleGapPct', 'HedgeGapPct', 'OrderBufferPct', 'FillTimeoutSec',
+    'RmsCap', 'TrailStopLossToggle',  'StopLossBufferPct', 'TargetPnl', 
+    'ExitPnl', 'RollingValue',
+]
+ESSENTIAL_FIELDS = ['index', 'Quantity']
+
+def _config_keys(instance):
+    """Keys of the shared inputs, then of the instance's own inputs if given one"""
+    prefixes = [INPUT_PREFIX] + ([input_prefix(instance)] if instance else [])
+    return [prefix + key for prefix in prefixes for key in CONFIG_FIELDS]
+
+def _config_view(instance, values):
+    """Config response body from the MGET of _config_keys(instance)"""
+    layers = []
+    for i in range(len(values) // len(CONFIG_FIELDS)):
+        layer = {}
+        for key, raw in zip(CONFIG_FIELDS, values[i * len(CONFIG_FIELDS):(i + 1) * len(CONFIG_FIELDS)]):
+            if raw:
+                try:
+                    layer[key] = json.loads(raw)
+                except Exception:
+                    layer[key] = raw.decode('utf-8') if isinstance(raw, bytes) else raw
+        layers.append(layer)
+    config = dict(layers[0])
+    if instance:
+        config.update(layers[1])
+    
+    response = {
+        "config": config,
+        "timestamp": time.time(),
+        "config_available": len(config) > 0
+    }
+    if instance:
+        response["instance"] = instance
+        response["instance_config"] = layers[1]
+    return response
+
 @app.route('/api/strategy/config', methods=['GET'])
 def get_current_config():
     """
     Get current configuration from Redis.
     """
-    keys = [
-        'index', 'expiry', 'Quantity', 'QtyHedgeRatio', 'PivotRangeMinutes', 'ShiftThresholdPts',
-        'StraddleGapPct', 'HedgeGapPct', 'OrderBufferPct', 'FillTimeoutSec',
-        'RmsCap', 'TrailStopLossToggle',  'StopLossBufferPct', 'TargetPnl', 
-        'ExitPnl', 'RollingValue',
-    ]
-    config = {}
-    for key in keys:
-        raw = r.get(INPUT_PREFIX + key)
-        if raw:
-            try:
-                config[key] = json.loads(raw)
-            except Exception:
-                config[key] = raw.decode('utf-8') if isinstance(raw, bytes) else raw
+    # With ?instance=, inputs set for that instance override the shared ones
+    instance = request.args.get("instance")
+    return jsonify(_config_view(instance, r.mget(_config_keys(instance)))), 200
+
+def _status_keys(instance):
+    return [instance_key('execution_status', instance), 'strategy:execution_status', CONTROL_KEY, OUTPUT_KEY]
+
+def _status_view(instance, values, config_count):
+    """Status response body from the MGET of _status_keys(instance) and the EXISTS of the essential inputs"""
+    execution_status, process_status, control_signal, last_output = values
+    # An instance that has not been started yet reports the orchestrator's status
+    execution_status = execution_status or process_status
     
-    return jsonify({
-        "config": config,
+    status_info = {
         "timestamp": time.time(),
-        "config_available": len(config) > 0
-    }), 200
+        "instance": instance
+    }
+
+    if execution_status:
+        try:
+            exec_data = loads(execution_status)
+            status_info.update(exec_data)
+        except ValueError:
+            pass
+    
+    if last_output:
+        try:
+            output_data = json.loads(last_output)
+            status_info["last_run"] = output_data.get('timestamp')
+            status_info["last_result"] = output_data.get('status')
+        except json.JSONDecodeError:
+            pass
+
+    if control_signal:
+        try:
+            control_data = json.loads(control_signal)
+            status_info["control_signal"] = control_data
+        except json.JSONDecodeError:
+            pass
+
+    status_info["config_available"] = config_count == len(ESSENTIAL_FIELDS)
+    return status_info
 
 @app.route('/api/strategy/status', methods=['GET'])
 def get_strategy_status():
@@ -248,204 +457,339 @@ def get_strategy_status():
     Get strategy execution status from Redis.
     """
     try:
-        # Check Redis for strategy status and control signals
-        execution_status = r.get('strategy:execution_status')
-        control_signal = r.get(CONTROL_KEY)
-        last_output = r.get(OUTPUT_KEY)
-        heartbeat = r.get('strategy:heartbeat')
-        
-        status_info = {
-            "timestamp": time.time()
-        }
-
-        if execution_status:
-            try:
-                exec_data = json.loads(execution_status)
-                status_info.update(exec_data)
-            except json.JSONDecodeError:
-                pass
-        
-        if last_output:
-            try:
-                output_data = json.loads(last_output)
-                status_info["last_run"] = output_data.get('timestamp')
-                status_info["last_result"] = output_data.get('status')
-            except json.JSONDecodeError:
-                pass
-
-        if control_signal:
-            try:
-                control_data = json.loads(control_signal)
-                status_info["control_signal"] = control_data
-            except json.JSONDecodeError:
-                pass
-
-        essential_keys = ['index', 'Quantity']
-        config_available = all(r.exists(INPUT_PREFIX + key) for key in essential_keys)
-        status_info["config_available"] = config_available
-        
-        return jsonify(status_info), 200
+        # Check Redis for strategy status, control signals and config in one round trip
+        instance = _view_instance()
+        pipe = r.pipeline(transaction=False)
+        pipe.mget(_status_keys(instance))
+        pipe.exists(*[INPUT_PREFIX + key for key in ESSENTIAL_FIELDS])
+        values, config_count = pipe.execute()
+        return jsonify(_status_view(instance, values, config_count)), 200
         
     except Exception as e:
         return jsonify({"error": f"Failed to get status: {str(e)}"}), 500
 
+def _trading_status_view(trading_status):
+    if not trading_status:
+        return {
+            "status": "no_data",
+            "message": "No trading status available",
+            "timestamp": time.time()
+        }
+    return {"timestamp": time.time(), **trading_status}
+
 @app.route('/api/strategy/trading-status', methods=['GET'])
 def get_trading_status():
     try:
-        trading_status = r.get('strategy:trading_status')
-        
-        response = {
-            "timestamp": time.time()
-        }
-        
-        if trading_status:
-            try:
-                response.update(json.loads(trading_status))
-            except json.JSONDecodeError:
-                pass
-        
-        if not trading_status:
-            return jsonify({
-                "status": "no_data",
-                "message": "No trading status available",
-                "timestamp": time.time()
-            }), 200
-        
-        return jsonify(response), 200
+        return jsonify(_trading_status_view(read_trading_status(r, _view_instance()))), 200
     except Exception as e:
         return jsonify({"error": f"Failed to get trading status: {str(e)}"}), 500
 
 @app.route('/api/strategy/logs', methods=['GET'])
 def get_strategy_logs():
     """
-    Get recent strategy logs
+    Get recent strategy logs, newest first. With ?since=<cursor> only entries
+    added after the cursor (the oldest 'limit' of them; has_more tells to ask
+    again); every response carries the cursor to send next time.
     """
     try:
         limit = request.args.get('limit', 50, type=int)
-        logs = r.lrange('strategy:logs', 0, limit - 1)
-        parsed_logs = []
-        
-        for log in logs:
-            try:
-                parsed_logs.append(json.loads(log))
-            except json.JSONDecodeError:
-                parsed_logs.append({"message": log.decode('utf-8'), "timestamp": time.time()})
+        since = request.args.get('since')
+        logs, cursor = read_entries(r, instance_key('logs', _view_instance()), since=since, limit=limit)
         
         return jsonify({
-            "logs": parsed_logs,
-            "count": len(parsed_logs),
+            "logs": logs,
+            "count": len(logs),
+            "cursor": cursor,
+            "has_more": bool(since) and len(logs) == limit,
             "timestamp": time.time()
         }), 200
     except Exception as e:
         return jsonify({"error": f"Failed to get logs: {str(e)}"}), 500
 
+def _actions_view(latest_action, action_history, cursor=None):
+    response = {
+        "timestamp": time.time(),
+        "cursor": cursor
+    }
+    
+    if latest_action:
+        try:
+            response["latest_action"] = loads(latest_action)
+        except ValueError:
+            pass
+    
+    if action_history:
+        response["action_history"] = action_history
+        response["latest_action"] = action_history[0]
+    return response
+
 @app.route('/api/strategy/actions', methods=['GET'])
 def get_strategy_actions():
     """
-    Get recent strategy actions
+    Get recent strategy actions, newest first; ?since=<cursor> returns only
+    the actions added after it, as /api/strategy/logs does.
     """
     try:
         limit = request.args.get('limit', 20, type=int)
-        
-        latest_action = r.get('strategy:latest_action')
-        action_history = r.lrange('strategy:action_history', 0, limit - 1)
-        
-        response = {
-            "timestamp": time.time()
-        }
-        
-        if latest_action:
-            try:
-                response["latest_action"] = json.loads(latest_action)
-            except json.JSONDecodeError:
-                pass
-        
-        if action_history:
-            actions = []
-            for action in action_history:
-                try:
-                    actions.append(json.loads(action))
-                except json.JSONDecodeError:
-                    continue
-            response["action_history"] = actions
-        
+        since = request.args.get('since')
+        
+        instance = _view_instance()
+        actions, cursor = read_entries(r, instance_key('action_history', instance), since=since, limit=limit)
+        # The newest history entry is the latest action; read the key only when there is none
+        latest_action = None if actions or since else r.get(instance_key('latest_action', instance))
+        response = _actions_view(latest_action, actions, cursor)
+        response["has_more"] = bool(since) and len(actions) == limit
         return jsonify(response), 200
         
     except Exception as e:
         return jsonify({"error": f"Failed to get strategy actions: {str(e)}"}), 500
 
+
+def _etag(parts):
+    """Digest of raw Redis replies (bytes, None, ints, or dicts of them)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, dict):
+            part = b"".join(k + b"=" + v + b";" for k, v in sorted(part.items()))
+        elif part is None:
+            part = b"\x00none"
+        elif not isinstance(part, bytes):
+            part = str(part).encode()
+        digest.update(len(part).to_bytes(4, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+@app.route('/api/strategy/snapshot', methods=['GET'])
+def get_strategy_snapshot():
+    """
+    Status, trading status, recent actions, heartbeat and config of the viewed
+    instance, read in one pipeline. The document's version is a digest of the
+    slow-changing state (also sent as the ETag), so a client that sends it back
+    in If-None-Match gets 304 Not Modified until something changes. The
+    heartbeat, rewritten every second, only counts by its responsiveness
+    class; its exact age is served by /api/strategy/heartbeat.
+    """
+    try:
+        instance = _view_instance()
+        limit = request.args.get('limit', 20, type=int)
+        status_keys = _status_keys(instance)
+        config_keys = _config_keys(instance)
+        pipe = r.pipeline(transaction=False)
+        pipe.mget(status_keys + config_keys +
+                  [instance_key('heartbeat', instance), instance_key('latest_action', instance)])
+        pipe.exists(*[INPUT_PREFIX + key for key in ESSENTIAL_FIELDS])
+        pipe.hgetall(instance_key('trading_status', instance))
+        pipe.xrevrange(instance_key('action_history', instance), max="+", min="-", count=limit)
+        values, config_count, trading, history = pipe.execute(raise_on_error=False)
+        for result in (values, config_count):
+            if isinstance(result, Exception):
+                raise result
+        if isinstance(trading, Exception):
+            trading = r.get(instance_key('trading_status', instance))   # JSON blob written by an older version
+        if isinstance(history, Exception):
+            action_history, actions_cursor = read_entries(r, instance_key('action_history', instance), limit=limit)
+            history_ids = [json.dumps(action_history, default=str)]
+        else:
+            action_history = decode_entries(history)
+            history_ids = [entry_id for entry_id, _ in history]
+            actions_cursor = action_history[0]["id"] if action_history else None
+
+        heartbeat, latest_action = values[-2:]
+        heartbeat = _heartbeat_view(loads(heartbeat) if heartbeat else None)
+        # Write times change with every update, whether the values did or not
+        trading_version = ({k: v for k, v in trading.items() if k not in TRADING_STAMP_FIELDS}
+                           if isinstance(trading, dict) else trading)
+        version = _etag([instance, limit, config_count, trading_version, heartbeat.get("responsiveness")]
+                        + values[:-2] + [latest_action] + history_ids)
+        if request.if_none_match.contains(version):
+            response = Response(status=304)
+            response.set_etag(version)
+            return response
+
+        status_values = values[:len(status_keys)]
+        config_values = values[len(status_keys):len(status_keys) + len(config_keys)]
+        trading_status = decode_hash(trading) if isinstance(trading, dict) else (loads(trading) if trading else {})
+        snapshot = {
+            "version": version,
+            "instance": instance,
+            "status": _status_view(instance, status_values, config_count),
+            "trading_status": _trading_status_view(trading_status),
+            "actions": _actions_view(latest_action, action_history, actions_cursor),
+            "heartbeat": heartbeat,
+            "config": _config_view(instance, config_values),
+            "timestamp": time.time()
+        }
+        response = jsonify(snapshot)
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({"error": f"Failed to get snapshot: {str(e)}"}), 500
+
+
+@app.route('/api/strategy/instances', methods=['GET'])
+def get_strategy_instances():
+    """
+    Aggregate view: status, heartbeat, latest action and trading status of every
+    registered instance, read in one pipeline.
+    """
+    try:
+        registered = registered_instances(r)
+        names = sorted(registered)
+        pipe = r.pipeline(transaction=False)
+        for name in names:
+            pipe.mget([instance_key('execution_status', name), instance_key('heartbeat', name),
+                       instance_key('latest_action', name)])
+            pipe.hgetall(instance_key('trading_status', name))
+        results = pipe.execute(raise_on_error=False)
+
+        now = time.time()
+        items = []
+        for i, name in enumerate(names):
+            values, trading = results[2 * i], results[2 * i + 1]
+            status, heartbeat, latest_action = [loads(v) if v else None for v in values]
+            heartbeat_age = now - heartbeat.get('timestamp', 0) if heartbeat else None
+            items.append({
+                "instance": name,
+                "symbol": registered[name],
+                "execution_status": status,
+                "heartbeat": heartbeat,
+                "is_responsive": heartbeat_age is not None and heartbeat_age < 30,
+                "latest_action": latest_action,
+                "trading_status": decode_hash(trading) if isinstance(trading, dict) else {},
+            })
+        return jsonify({"items": items, "count": len(items), "timestamp": now}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to get instances: {str(e)}"}), 500
+
+@app.route('/api/redis/health', methods=['GET'])
+def get_redis_health():
+    """
+    Redis round-trip latency and connection pool usage of this process.
+    """
+    try:
+        latency_ms = ping(r)
+        return jsonify({
+            "status": "ok",
+            "latency_ms": round(latency_ms, 3),
+            "pool": pool_stats(r),
+            "timestamp": time.time()
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "unreachable", "error": str(e), "pool": pool_stats(r)}), 503
+
+def _heartbeat_view(heartbeat_data):
+    """Heartbeat response body, shared by /api/strategy/heartbeat and the update stream"""
+    if not heartbeat_data:
+        return {
+            "status": "no_heartbeat",
+            "message": "No heartbeat available - strategy may not be running",
+            "timestamp": time.time()
+        }
+    heartbeat_age = time.time() - heartbeat_data.get('timestamp', 0)
+    
+    response = {
+        "heartbeat": heartbeat_data,
+        "heartbeat_age_seconds": heartbeat_age,
+        "is_responsive": heartbeat_age < 30,
+        "status": "alive" if heartbeat_age < 30 else "stale",
+        "timestamp": time.time()
+    }
+    
+    # Add responsiveness classification
+    if heartbeat_age < 10:
+        response["responsiveness"] = "excellent"
+    elif heartbeat_age < 30:
+        response["responsiveness"] = "good"
+    elif heartbeat_age < 60:
+        response["responsiveness"] = "poor"
+    else:
+        response["responsiveness"] = "dead"
+    return response
+
 @app.route('/api/strategy/heartbeat', methods=['GET'])
 def get_strategy_heartbeat():
     """
     Get detailed strategy heartbeat information.
     """
     try:
-        heartbeat = r.get('strategy:heartbeat')
-        
-        if not heartbeat:
-            return jsonify({
-                "status": "no_heartbeat",
-                "message": "No heartbeat available - strategy may not be running",
-                "timestamp": time.time()
-            }), 200
-        
-        heartbeat_data = json.loads(heartbeat)
-        heartbeat_age = time.time() - heartbeat_data.get('timestamp', 0)
-        
-        response = {
-            "heartbeat": heartbeat_data,
-            "heartbeat_age_seconds": heartbeat_age,
-            "is_responsive": heartbeat_age < 30,
-            "status": "alive" if heartbeat_age < 30 else "stale",
-            "timestamp": time.time()
-        }
-        
-        # Add responsiveness classification
-        if heartbeat_age < 10:
-            response["responsiveness"] = "excellent"
-        elif heartbeat_age < 30:
-            response["responsiveness"] = "good"
-        elif heartbeat_age < 60:
-            response["responsiveness"] = "poor"
-        else:
-            response["responsiveness"] = "dead"
-        
-        return jsonify(response), 200
+        heartbeat = r.get(instance_key('heartbeat', _view_instance()))
+        return jsonify(_heartbeat_view(loads(heartbeat) if heartbeat else None)), 200
         
     except Exception as e:
         return jsonify({"error": f"Failed to get heartbeat: {str(e)}"}), 500
 
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route('/api/strategy/stream', methods=['GET'])
+def stream_strategy_updates():
+    """
+    Server-Sent Events with the viewed instance's status, trading status,
+    action, log and heartbeat updates as they are written. All streams share
+    one Redis subscription (update_hub); a 'resync' event asks the client to
+    re-read everything through the regular endpoints.
+    """
+    instance = _view_instance()
+    updates = update_hub.subscribe()
+
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = updates.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event == RESYNC:
+                    yield _sse("resync", {"timestamp": time.time()})
+                    continue
+                kind, event_instance, payload = event
+                if event_instance != instance:
+                    continue
+                if kind == "heartbeat":
+                    payload = _heartbeat_view(payload)
+                elif kind == "trading_status":
+                    payload = _trading_status_view(payload)
+                elif kind == "actions":
+                    payload = _actions_view(None, payload, payload[0].get("id"))
+                elif kind == "logs":
+                    payload = {"logs": payload, "cursor": payload[0].get("id")}
+                yield _sse(kind, payload)
+        finally:
+            update_hub.unsubscribe(updates)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+_kite_session_manager = None
+
+def _kite_sessions():
+    """Shared KiteSessionManager; kiteconnect is imported on first use"""
+    global _kite_session_manager
+    if _kite_session_manager is None:
+        from kite_session import KiteSessionManager
+        _kite_session_manager = KiteSessionManager(r)
+    return _kite_session_manager
+
 @app.route('/api/auth/login', methods=['POST'])
 def auto_login():
     """
     Handle auto-login functionality
     """
     try:
-        import sys
-        import os
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from kite_login import load_access_token, load_credentials
-        from kiteconnect import KiteConnect
-        
-        credentials = load_credentials()
-        api_key = credentials["apiKey"]
-        kite = KiteConnect(api_key=api_key)
-        
-        # Check if current token is valid
-        access_token = load_access_token()
-        if access_token:
-            try:
-                kite.set_access_token(access_token)
-                profile = kite.profile()  # Test token validity
-                return jsonify({
-                    "status": "already_authenticated",
-                    "message": f"Already logged in as {profile['user_name']}",
-                    "user_name": profile['user_name']
-                }), 200
-            except Exception as e:
-                # Token is invalid, continue to login flow
-                backend_logger.info(f"Token validation failed: {e}")
+        # Check if current token is valid (a cached check unless ?force=1)
+        session = _kite_sessions().status(force=request.args.get('force') == '1')
+        if session["authenticated"]:
+            return jsonify({
+                "status": "already_authenticated",
+                "message": f"Already logged in as {session['user_name']}",
+                "user_name": session['user_name']
+            }), 200
+        api_key = session["api_key"]
         
         # Generate URLs for forced fresh login
         logout_url = "https://kite.zerodha.com/logout"  # Main logout
@@ -483,30 +827,13 @@ def submit_request_token():
         if not request_token:
             return jsonify({"error": "Request token is required"}), 400
         
-        import sys
-        import os
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from kite_login import load_credentials, save_access_token
-        from kiteconnect import KiteConnect
-        
-        credentials = load_credentials()
-        api_key = credentials["apiKey"]
-        api_secret = credentials["secret"]
-        
-        kite = KiteConnect(api_key=api_key)
-        data = kite.generate_session(request_token, api_secret=api_secret)
-        access_token = data["access_token"]
-        
-        save_access_token(access_token)
-        
-        # Verify the new token
-        kite.set_access_token(access_token)
-        profile = kite.profile()
+        # Saves the new token and replaces the cached (and shared) validation
+        user_name = _kite_sessions().login(request_token)
         
         return jsonify({
             "status": "success",
-            "message": f"Successfully authenticated as {profile['user_name']}",
-            "user_name": profile['user_name']
+            "message": f"Successfully authenticated as {user_name}",
+            "user_name": user_name
         }), 200
         
     except Exception as e:
@@ -518,28 +845,15 @@ def check_auth_status():
     Check current authentication status
     """
     try:
-        import sys
-        import os
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from kite_login import load_access_token, load_credentials
-        from kiteconnect import KiteConnect
-        
-        credentials = load_credentials()
-        api_key = credentials["apiKey"]
-        kite = KiteConnect(api_key=api_key)
-        
-        access_token = load_access_token()
-        if not access_token:
-            return jsonify({"authenticated": False, "message": "No access token found"}), 200
-        
-        kite.set_access_token(access_token)
-        profile = kite.profile()
-        
-        return jsonify({
-            "authenticated": True,
-            "user_name": profile['user_name'],
-            "message": f"Authenticated as {profile['user_name']}"
-        }), 200
+        session = _kite_sessions().status(force=request.args.get('force') == '1')
+        response = {
+            "authenticated": session["authenticated"],
+            "message": session["message"],
+            "checked_at": session["checked_at"]
+        }
+        if session["authenticated"]:
+            response["user_name"] = session["user_name"]
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({"authenticated": False, "message": f"Authentication failed: {str(e)}"}), 200
@@ -569,33 +883,15 @@ def submit_session_id():
         if not session_id:
             return jsonify({"error": "Valid request token not found in input"}), 400
         
-        import sys
-        import os
-        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from kite_login import load_credentials, save_access_token
-        from kiteconnect import KiteConnect
-        
-        credentials = load_credentials()
-        api_key = credentials["apiKey"]
-        
         # Try to use session ID as request token
-        kite = KiteConnect(api_key=api_key)
         try:
             # Sometimes session_id can be used as request_token
-            api_secret = credentials["secret"]
-            session_data = kite.generate_session(session_id, api_secret=api_secret)
-            access_token = session_data["access_token"]
-            
-            save_access_token(access_token)
-            
-            # Verify the new token
-            kite.set_access_token(access_token)
-            profile = kite.profile()
+            user_name = _kite_sessions().login(session_id)
             
             return jsonify({
                 "status": "success",
-                "message": f"Successfully authenticated as {profile['user_name']}",
-                "user_name": profile['user_name']
+                "message": f"Successfully authenticated as {user_name}",
+                "user_name": user_name
             }), 200
             
         except Exception as e:
@@ -608,6 +904,86 @@ def submit_session_id():
 # TRADINGVIEW WEBHOOK ENDPOINT
 # ═══════════════════════════════════════════════════════════════
 
+def _run_screenshot_script(rsi_momentum, ticker, interval, intent):
+    """Analysis from a one-off run of browseruse/playwright_screenshot.py"""
+    import subprocess
+    script_path = Path(__file__).parent.parent / 'browseruse' / 'playwright_screenshot.py'
+    
+    try:
+        result = subprocess.run(
+            [sys.executable, str(script_path), rsi_momentum, ticker, interval, intent],
+            capture_output=True,
+            text=True,
+            timeout=WEBHOOK_JOB_TIMEOUT, 
+            cwd=str(script_path.parent)
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Analysis timeout (>{WEBHOOK_JOB_TIMEOUT}s)")
+    
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr or "Screenshot analysis failed")
+
+    output_lines = result.stdout.strip().split('\n')
+    json_output = None
+    
+    for i, line in enumerate(output_lines):
+        if "[JSON OUTPUT]" in line and i + 1 < len(output_lines):
+            json_str = '\n'.join(output_lines[i+1:])
+            try:
+                json_output = json.loads(json_str)
+                break
+            except:
+                continue
+    
+    if not json_output:
+        try:
+            json_output = json.loads(output_lines[-1])
+        except:
+            raise RuntimeError("Invalid JSON output from analysis")
+    return json_output
+
+def _run_screenshot_analysis(rsi_momentum, ticker, interval, intent):
+    """
+    Analyze the chart for one RSI alert (on a webhook job worker) and return the
+    result; raises RuntimeError if it fails. Jobs go to the warm
+    browseruse/vision_worker.py processes when one is running.
+    """
+    backend_logger.info(f"Running analysis for {ticker} ({interval}m) | Intent: {intent}...")
+    
+    if live_workers(r):
+        job_id = submit_analysis(r, WEBHOOK_JOB_TIMEOUT, rsi_momentum=rsi_momentum, ticker=ticker,
+                                 interval=interval, intent=intent)
+        try:
+            json_output = wait_result(r, job_id, WEBHOOK_JOB_TIMEOUT)
+        except TimeoutError as e:
+            raise RuntimeError(str(e))
+    else:
+        json_output = _run_screenshot_script(rsi_momentum, ticker, interval, intent)
+    
+    signal = {
+        "source": "tradingview_rsi",
+        "ticker": ticker,
+        "rsi_momentum": rsi_momentum,
+        "timestamp": time.time(),
+        "analysis": json_output
+    }
+    
+    # r.set("strategy:latest_vision_analysis", json.dumps(signal))
+    # publish_control(r, resolve_targets(r), "tv_signal", signal=signal)
+    
+    backend_logger.info(f"✅ Analysis complete: {json_output.get('trade_decision')}")
+    
+    return {
+        "ticker": ticker,
+        "rsi_momentum": rsi_momentum,
+        "trade_decision": json_output.get('trade_decision'),
+        "entry_price": json_output.get('entry_price'),
+        "stop_loss": json_output.get('stop_loss'),
+        "target": json_output.get('target'),
+        "confidence": json_output.get('confidence'),
+        "full_analysis": json_output
+    }
+
 @app.route('/api/webhook/tradingview',methods=['POST'])
 def tradingview_webhook():
 
@@ -623,97 +999,19 @@ def tradingview_webhook():
         if rsi_momentum in ['POSITIVE', 'NEGATIVE']:
             backend_logger.info(f"🎯 RSI Alert received: {rsi_momentum}")
             
-           
-            import subprocess
-            script_path = Path(__file__).parent.parent / 'browseruse' / 'playwright_screenshot.py'
             ticker = data.get('ticker', 'UNKNOWN')
             interval = data.get('interval', '5') 
             intent = data.get('intent', 'Evaluation') 
             
-            backend_logger.info(f"Running analysis for {ticker} ({interval}m) | Intent: {intent}...")
-            
-            try:
-                result = subprocess.run(
-                    [sys.executable, str(script_path), rsi_momentum, ticker, interval, intent],
-                    capture_output=True,
-                    text=True,
-                    timeout=200, 
-                    cwd=str(script_path.parent)
-                )
-                
-                if result.returncode != 0:
-                    error_msg = result.stderr or "Screenshot analysis failed"
-                    backend_logger.error(f"Analysis error: {error_msg}")
-                    return jsonify({
-                        "status": "error",
-                        "error": error_msg
-                    }), 500
-                
-            
-                output_lines = result.stdout.strip().split('\n')
-                json_output = None
-                
-             
-                for i, line in enumerate(output_lines):
-                    if "[JSON OUTPUT]" in line and i + 1 < len(output_lines):
-                        
-                        json_str = '\n'.join(output_lines[i+1:])
-                        try:
-                            json_output = json.loads(json_str)
-                            break
-                        except:
-                            continue
-                
-                if not json_output:
-                 
-                    try:
-                        json_output = json.loads(output_lines[-1])
-                    except:
-                        backend_logger.error("Could not parse JSON from script output")
-                        return jsonify({
-                            "status": "error",
-                            "error": "Invalid JSON output from analysis"
-                        }), 500
-                
-               
-                signal = {
-                    "source": "tradingview_rsi",
-                    "ticker": ticker,
-                    "rsi_momentum": rsi_momentum,
-                    "timestamp": time.time(),
-                    "analysis": json_output
-                }
-                
-                # r.set("strategy:latest_vision_analysis", json.dumps(signal))
-                # r.set("strategy:tv_signal", json.dumps(signal))
-                
-                backend_logger.info(f"✅ Analysis complete: {json_output.get('trade_decision')}")
-                
-                
-                return jsonify({
-                    "status": "success",
-                    "ticker": ticker,
-                    "rsi_momentum": rsi_momentum,
-                    "trade_decision": json_output.get('trade_decision'),
-                    "entry_price": json_output.get('entry_price'),
-                    "stop_loss": json_output.get('stop_loss'),
-                    "target": json_output.get('target'),
-                    "confidence": json_output.get('confidence'),
-                    "full_analysis": json_output
-                }), 200
-                
-            except subprocess.TimeoutExpired:
-                backend_logger.error("Screenshot analysis timeout")
-                return jsonify({
-                    "status": "error",
-                    "error": "Analysis timeout (>45s)"
-                }), 504
-            except Exception as e:
-                backend_logger.error(f"Screenshot analysis exception: {e}")
-                return jsonify({
-                    "status": "error",
-                    "error": str(e)
-                }), 500
+            # The analysis takes tens of seconds; answer TradingView right away
+            job_id = webhook_jobs.submit(ticker, _run_screenshot_analysis, rsi_momentum, ticker, interval, intent)
+            return jsonify({
+                "status": "queued",
+                "job_id": job_id,
+                "ticker": ticker,
+                "rsi_momentum": rsi_momentum,
+                "result_url": f"/api/webhook/jobs/{job_id}"
+            }), 202
         
 
         strategy = data.get("strategy")
@@ -721,8 +1019,9 @@ def tradingview_webhook():
             result = tv_analyzer.analyze_gpt_vision(data)
             return jsonify({
                 "status": "vision_analysis_triggered",
-                "message": result.get("message")
-            }), 200
+                "message": result.get("message"),
+                "job_id": result.get("job_id")
+            }), 202
 
         decision = tv_analyzer.analyze(data)
         backend_logger.info(f"TradingView Analysis decision: {decision}")
@@ -733,16 +1032,41 @@ def tradingview_webhook():
             "raw_data": data,
             "decision": decision
         }
-        # r.set("strategy:tv_signal",json.dumps(signal))
+        # publish_control(r, resolve_targets(r), "tv_signal", signal=signal)
 
         return jsonify({
             "status":"received",
             "decision":decision
         }),200
 
+    except QueueFull as e:
+        backend_logger.warning(f"Webhook rejected, job queue full: {e}")
+        return jsonify({"status": "busy", "error": str(e)}), 429
     except Exception as e:
         backend_logger.error(f"Webhook error: {e}")
         return jsonify({"error": str(e)}), 500
+
+@app.route('/api/webhook/jobs/<job_id>', methods=['GET'])
+def get_webhook_job(job_id):
+    """
+    State of a queued webhook analysis: queued (with its queue position),
+    running, done (with the result) or failed (with the error).
+    """
+    job = webhook_jobs.get(job_id) or tv_analyzer.jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    return jsonify(job), 200
+
+@app.route('/api/webhook/jobs', methods=['GET'])
+def get_webhook_job_metrics():
+    """
+    Queue depth, running jobs per ticker and totals of the webhook job pools.
+    """
+    return jsonify({
+        "analysis": webhook_jobs.metrics(),
+        "vision": tv_analyzer.jobs.metrics(),
+        "timestamp": time.time()
+    }), 200
         
 
 if __name__ == '__main__':
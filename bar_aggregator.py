@@ -0,0 +1,277 @@
+"""
+Tick-to-bar aggregation: 1-minute OHLCV bars built from streamed ticks, plus
+3/5/15-minute bars resampled incrementally from the finalized 1-minute bars.
+"""
+import threading
+import logging
+from collections import deque
+from datetime import datetime, time as dtime, timedelta
+from utils.clock import get_clock
+
+logger = logging.getLogger("root")
+
+SESSION_START = dtime(9, 15)
+SESSION_END = dtime(15, 30)
+ONE_MINUTE = timedelta(minutes=1)
+
+
+def tick_time(tick):
+    """Exchange timestamp of a tick; index ticks carry no last_trade_time"""
+    ts = tick.get("exchange_timestamp") or tick.get("last_trade_time")
+    if ts is None:
+        return None
+    return ts.replace(tzinfo=None)
+
+
+def _floor_minute(ts):
+    return ts.replace(second=0, microsecond=0)
+
+
+class Resampler:
+    """
+    Folds finalized 1-minute bars into N-minute bars aligned to the session
+    open (09:15, 09:20, ... for N=5). A bar is emitted as soon as its last
+    minute is folded in, or when a later minute starts a new bucket.
+    """
+    def __init__(self, minutes, session_start=SESSION_START):
+        self.minutes = minutes
+        self.session_start = session_start
+        self.current = None
+        self.bucket_end = None
+
+    def _bucket_start(self, ts):
+        anchor = datetime.combine(ts.date(), self.session_start)
+        offset = int((ts - anchor).total_seconds() // 60) // self.minutes * self.minutes
+        return anchor + timedelta(minutes=offset)
+
+    def add(self, bar):
+        """Fold in one 1-minute bar; returns the N-minute bars that completed (0, 1 or 2)"""
+        done = []
+        start = self._bucket_start(bar["date"])
+        if self.current is not None and self.current["date"] != start:
+            done.append(self.current)
+            self.current = None
+        if self.current is None:
+            self.current = dict(bar, date=start)
+            self.bucket_end = start + timedelta(minutes=self.minutes)
+        else:
+            cur = self.current
+            cur["high"] = max(cur["high"], bar["high"])
+            cur["low"] = min(cur["low"], bar["low"])
+            cur["close"] = bar["close"]
+            cur["volume"] += bar["volume"]
+        if bar["date"] + ONE_MINUTE >= self.bucket_end:
+            done.append(self.current)
+            self.current = None
+        return done
+
+
+class BarAggregator:
+    """
+    Builds 1-minute OHLCV bars per instrument token from ticks.
+
+    Ticks are bucketed by exchange timestamp, never by arrival time, and a bar
+    opens and closes at its earliest and latest exchange timestamps. A minute is
+    finalized once the watermark (latest exchange timestamp seen on any token)
+    passes the minute's end plus late_grace seconds, or when advance() is called
+    with a later time. Ticks for an already finalized minute are dropped and
+    counted in late_ticks, so the same tick sequence always yields the same bars,
+    live or in replay.
+
+    Every token that has traded keeps a bar for every finalized minute: a minute
+    without ticks gets a flat bar at the previous close with zero volume.
+    Volume is the change in the exchange's cumulative volume_traded. The first
+    bar of a token only covers the ticks since it was subscribed, usually part
+    of the minute, and is marked "partial": True.
+
+    Subscribers registered with on_minute(callback) get callback(minute, bars)
+    with {token: bar} for each finalized minute, in order; on_tick(callback)
+    subscribers get every accepted tick batch. Callbacks run on the thread that
+    fed the ticks or called advance(), outside the aggregator's lock; closing
+    and notifying are serialized, so minutes reach subscribers in order
+    whichever thread closed them.
+    """
+    def __init__(self, intervals=(3, 5, 15), late_grace=1.0, history=400,
+                 session_start=SESSION_START, session_end=SESSION_END):
+        self.intervals = tuple(intervals)
+        self.late_grace = timedelta(seconds=late_grace)
+        self.history_len = history
+        self.session_start = session_start
+        self.session_end = session_end
+        self.lock = threading.Lock()
+        self.notify_lock = threading.RLock()   # held from closing minutes until their subscribers have run
+
+        self.pending = {}          # minute -> {token: bar}
+        self.last_closed = None    # last finalized minute
+        self.watermark = None
+        self.last_close = {}       # token -> last finalized close
+        self.cum_volume = {}       # token -> volume_traded at the last finalized bar
+        self.bars = {}             # (token, interval) -> deque of finalized bars
+        self.resamplers = {}       # (token, interval) -> Resampler
+        self.listeners = []
+        self.tick_listeners = []
+        self.ltp = {}              # token -> latest traded price seen
+        self.late_ticks = 0
+
+    def on_minute(self, callback):
+        self.listeners.append(callback)
+
+    def on_tick(self, callback):
+        self.tick_listeners.append(callback)
+
+    def last_price(self, token):
+        return self.ltp.get(token)
+
+    def start_after(self, minute):
+        """Treat every minute up to and including 'minute' as already finalized"""
+        with self.lock:
+            self.last_closed = _floor_minute(minute)
+
+    def history(self, token, interval=1):
+        """Finalized bars for a token and interval (in minutes), oldest first"""
+        with self.lock:
+            return list(self.bars.get((int(token), interval), ()))
+
+    def _in_session(self, ts):
+        return self.session_start <= ts.time() < self.session_end
+
+    def on_ticks(self, ticks, now=None):
+        """TickHub callback. 'now' is only used for ticks without exchange timestamps."""
+        with self.lock:
+            for tick in ticks:
+                self._add_tick(tick, now)
+        for callback in self.tick_listeners:
+            try:
+                callback(ticks)
+            except Exception as e:
+                logger.error(f"Tick listener error: {e}")
+        with self.notify_lock:
+            with self.lock:
+                closed = self._close_until(self.watermark - self.late_grace) if self.watermark else []
+            self._notify(closed)
+
+    def advance(self, now):
+        """Finalize minutes that ended before now - late_grace even if no tick has arrived since"""
+        with self.notify_lock:
+            with self.lock:
+                closed = self._close_until(now - self.late_grace)
+            self._notify(closed)
+
+    def _add_tick(self, tick, now):
+        ts = tick_time(tick) or now or get_clock().now()
+        if not self._in_session(ts):
+            return
+        minute = _floor_minute(ts)
+        if self.last_closed is not None and minute <= self.last_closed:
+            self.late_ticks += 1
+            return
+
+        token = int(tick["instrument_token"])
+        price = float(tick["last_price"])
+        self.ltp[token] = price
+        volume_traded = tick.get("volume_traded")
+        bars = self.pending.setdefault(minute, {})
+        bar = bars.get(token)
+        if bar is None:
+            bars[token] = {"date": minute, "open": price, "high": price, "low": price,
+                           "close": price, "volume": 0, "_ts0": ts, "_ts": ts, "_vt": volume_traded,
+                           "_vt0": volume_traded}
+        else:
+            bar["high"] = max(bar["high"], price)
+            bar["low"] = min(bar["low"], price)
+            if ts < bar["_ts0"]:
+                bar["open"] = price
+                bar["_ts0"] = ts
+            if ts >= bar["_ts"]:
+                bar["close"] = price
+                bar["_ts"] = ts
+            if volume_traded is not None:
+                bar["_vt"] = max(bar["_vt"] or 0, volume_traded)
+
+        if self.watermark is None or ts > self.watermark:
+            self.watermark = ts
+
+    def _close_until(self, cutoff):
+        """Finalize every minute whose end is at or before cutoff; returns [(minute, bars)]"""
+        if not self.pending and self.last_closed is None:
+            return []
+        last_open = _floor_minute(cutoff) - ONE_MINUTE
+        if self.last_closed is None:
+            minute = min(self.pending)
+        else:
+            minute = self.last_closed + ONE_MINUTE
+        # Flat bars are only carried within the session of the last finalized minute
+        if self.last_closed is not None and minute.date() != last_open.date():
+            upcoming = [m for m in self.pending if m.date() == last_open.date()]
+            minute = min(upcoming) if upcoming else last_open + ONE_MINUTE
+
+        closed = []
+        while minute <= last_open:
+            if self._in_session(minute) or minute in self.pending:
+                closed.append((minute, self._finalize(minute)))
+            self.last_closed = minute
+            minute += ONE_MINUTE
+        return closed
+
+    def _finalize(self, minute):
+        ticked = self.pending.pop(minute, {})
+        finalized = {}
+        for token in set(self.last_close) | set(ticked):
+            bar = ticked.get(token)
+            if bar is None:
+                close = self.last_close[token]
+                bar = {"date": minute, "open": close, "high": close, "low": close,
+                       "close": close, "volume": 0}
+            else:
+                vt, first_vt = bar.pop("_vt"), bar.pop("_vt0")
+                bar.pop("_ts"), bar.pop("_ts0")
+                if token not in self.last_close:
+                    bar["partial"] = True   # started at the token's first tick, not at the minute's start
+                if vt is not None:
+                    # The first bar of a token only counts volume from its first tick
+                    prev = self.cum_volume.get(token, first_vt)
+                    bar["volume"] = max(vt - (prev or 0), 0)
+                    self.cum_volume[token] = vt
+            self.last_close[token] = bar["close"]
+            finalized[token] = bar
+            self._store(token, 1, bar)
+            for interval in self.intervals:
+                resampler = self.resamplers.get((token, interval))
+                if resampler is None:
+                    resampler = self.resamplers[(token, interval)] = Resampler(interval, self.session_start)
+                for done in resampler.add(bar):
+                    self._store(token, interval, done)
+        return finalized
+
+    def _store(self, token, interval, bar):
+        key = (token, interval)
+        bars = self.bars.get(key)
+        if bars is None:
+            bars = self.bars[key] = deque(maxlen=self.history_len)
+        bars.append(bar)
+
+    def _notify(self, closed):
+        for minute, bars in closed:
+            for callback in self.listeners:
+                try:
+                    callback(minute, bars)
+                except Exception as e:
+                    logger.error(f"Bar subscriber error for {minute:%H:%M}: {e}")
+
+
+def replay_ticks(ticks, aggregator=None, until=None):
+    """
+    Feed recorded ticks through an aggregator in order, exactly as the live
+    TickHub callback would, then finalize up to 'until' (default: last tick).
+    """
+    aggregator = aggregator or BarAggregator()
+    last = None
+    for tick in ticks:
+        aggregator.on_ticks([tick])
+        ts = tick_time(tick)
+        if ts is not None and (last is None or ts > last):
+            last = ts
+    end = until or (last + aggregator.late_grace + ONE_MINUTE if last else None)
+    if end is not None:
+        aggregator.advance(end)
+    return aggregator
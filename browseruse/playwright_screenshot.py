@@ -183,82 +183,89 @@ async def run_analysis_flow(rsi_momentum, ticker, interval, intent):
         context = browser.contexts[0]
         page = await context.new_page() if not context.pages else context.pages[0]
 
-       
-        await goto_chart(page, ticker, interval)
+        return await analyze_on_page(page, rsi_momentum, ticker, interval, intent)
 
-        # Create a unique name for this run
-        unique_id = uuid.uuid4().hex[:8]
-        screenshot_path = f"chart_primary_{unique_id}.png"
+async def analyze_on_page(page, rsi_momentum, ticker, interval, intent):
+    """
+    Screenshot and analyze the chart on an already open page; used per run by
+    run_analysis_flow and per job by the long-lived vision_worker.py.
+    """
+    await goto_chart(page, ticker, interval)
 
+    # Create a unique name for this run (several runs may share the directory)
+    unique_id = uuid.uuid4().hex[:8]
+    screenshot_path = f"chart_primary_{unique_id}.png"
 
-        await page.bring_to_front()
-        await page.screenshot(path=screenshot_path, full_page=False)
-        
-        primary_res = analyze_adx(screenshot_path)
-        primary_res['rsi_momentum'] = rsi_momentum
-        
+
+    await page.bring_to_front()
+    await page.screenshot(path=screenshot_path, full_page=False)
     
-        if intent == "live_trade":
-            decision, sig_type = apply_trading_rules(primary_res, rsi_momentum)
-            primary_res["trade_decision"] = decision
-            primary_res["signal_type"] = sig_type
-        else:
-            primary_res["trade_decision"] = "EVALUATION_ONLY"
-            primary_res["signal_type"] = "NONE"
-
-        tf_map = {
-            "1":  "5m",   "1m":  "5m",
-            "2":  "10m",  "2m":  "10m",
-            "3":  "15m",  "3m":  "15m",
-            "5":  "1h",   "5m":  "1h",
-            "15": "1h",   "15m": "1h",
-            "30": "2h",   "30m": "2h",
-            "60": "4h",   "1h":  "4h",
-        }
-
-        interval_key = str(interval).strip().lower()
-        higher_tf = tf_map.get(interval_key)
-
-        if higher_tf:
-            print(f"Fetching Alignment: {interval_key} vs {higher_tf} ...")
-            await goto_chart(page, ticker, higher_tf)
-
-            align_path = "chart_secondary.png"
-            await page.bring_to_front()
-            await page.screenshot(path=align_path, full_page=False)
-
-            alignment = analyze_alignment_context(align_path, primary_res, interval_key, higher_tf)
-
-            primary_res[f"alignment_analysis"] = alignment.get("alignment_analysis")
-            primary_res[f"alignment_confidence"] = alignment.get("alignment_confidence")
-            primary_res["alignment_tf"] = higher_tf
-        else:
-            print(f"No alignment mapping for interval={interval}. Skipping alignment.")
-     
-        print("Checking Telegram alert criteria...")
-        if (
-            primary_res["confidence"] >= 8
-            # and (
-            #     intent.lower() == "evaluation"
-            #     or (intent.lower() == "live_trade" and primary_res["trade_decision"] == "TRADE")
-            # )
-        ):
-            send_telegram_alert(
-                ticker=ticker,
-                primary=primary_res,
-                hourly={}, 
-                daily={}, 
-                rsi_momentum=rsi_momentum,
-                screenshot_path=screenshot_path
-            )
-            # send_email_alert(
-            #     ticker=ticker,
-            #     primary=primary_res,
-            #     rsi_momentum=rsi_momentum,
-            #     screenshot_path=screenshot_path
-            # )
-
-        return primary_res
+    primary_res = await asyncio.to_thread(analyze_adx, screenshot_path)
+    primary_res['rsi_momentum'] = rsi_momentum
+    
+
+    if intent == "live_trade":
+        decision, sig_type = apply_trading_rules(primary_res, rsi_momentum)
+        primary_res["trade_decision"] = decision
+        primary_res["signal_type"] = sig_type
+    else:
+        primary_res["trade_decision"] = "EVALUATION_ONLY"
+        primary_res["signal_type"] = "NONE"
+
+    tf_map = {
+        "1":  "5m",   "1m":  "5m",
+        "2":  "10m",  "2m":  "10m",
+        "3":  "15m",  "3m":  "15m",
+        "5":  "1h",   "5m":  "1h",
+        "15": "1h",   "15m": "1h",
+        "30": "2h",   "30m": "2h",
+        "60": "4h",   "1h":  "4h",
+    }
+
+    interval_key = str(interval).strip().lower()
+    higher_tf = tf_map.get(interval_key)
+
+    if higher_tf:
+        print(f"Fetching Alignment: {interval_key} vs {higher_tf} ...")
+        await goto_chart(page, ticker, higher_tf)
+
+        align_path = f"chart_secondary_{unique_id}.png"
+        await page.bring_to_front()
+        await page.screenshot(path=align_path, full_page=False)
+
+        alignment = await asyncio.to_thread(analyze_alignment_context, align_path, primary_res, interval_key, higher_tf)
+
+        primary_res[f"alignment_analysis"] = alignment.get("alignment_analysis")
+        primary_res[f"alignment_confidence"] = alignment.get("alignment_confidence")
+        primary_res["alignment_tf"] = higher_tf
+    else:
+        print(f"No alignment mapping for interval={interval}. Skipping alignment.")
+ 
+    print("Checking Telegram alert criteria...")
+    if (
+        primary_res["confidence"] >= 8
+        # and (
+        #     intent.lower() == "evaluation"
+        #     or (intent.lower() == "live_trade" and primary_res["trade_decision"] == "TRADE")
+        # )
+    ):
+        await asyncio.to_thread(
+            send_telegram_alert,
+            ticker=ticker,
+            primary=primary_res,
+            hourly={}, 
+            daily={}, 
+            rsi_momentum=rsi_momentum,
+            screenshot_path=screenshot_path
+        )
+        # send_email_alert(
+        #     ticker=ticker,
+        #     primary=primary_res,
+        #     rsi_momentum=rsi_momentum,
+        #     screenshot_path=screenshot_path
+        # )
+
+    return primary_res
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
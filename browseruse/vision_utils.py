@@ -7,12 +7,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+_client = None
+
+def get_client():
+    """One OpenAI client per process, so a long-lived worker reuses its connections"""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
 def encode_image(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 def analyze_adx(image_path):
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
 
     base64_image = encode_image(image_path)
 
@@ -143,7 +152,7 @@ def analyze_alignment_context(image_path, primary_analysis, primary_tf="5m", sec
     """
     Analyzes a higher timeframe chart to see if it aligns with the primary timeframe analysis.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    client = get_client()
     base64_image = encode_image(image_path)
     
     p_decision = primary_analysis.get("trade_decision")
@@ -0,0 +1,97 @@
+#browseruse\vision_worker.py
+"""
+Long-lived chart analysis worker. It keeps the CDP connection to Chrome, its
+chart pages and the OpenAI client open and runs the analyses the backend
+queues in Redis (utils/vision_queue.py), instead of a fresh interpreter per
+alert as playwright_screenshot.py does.
+
+    python vision_worker.py [--pages N]
+
+Every page is an independent slot taking one job at a time; add pages or
+start more workers for more throughput. The backend falls back to running
+playwright_screenshot.py when no worker is alive.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+from pathlib import Path
+
+root_dir = Path(__file__).resolve().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.append(str(root_dir))
+
+from playwright.async_api import async_playwright
+from playwright_screenshot import CDP_URL, analyze_on_page
+from utils.redis_client import get_redis
+from utils.vision_queue import take_job, post_result, worker_heartbeat, worker_gone, WORKER_TTL
+
+RECONNECT_SECS = 5
+HEARTBEAT_SECS = WORKER_TTL / 3
+
+
+async def heartbeat(redis_client, browser, worker_id):
+    # Separate from the job loop, so a slot stays live while an analysis runs longer than WORKER_TTL
+    while browser.is_connected():
+        try:
+            await asyncio.to_thread(worker_heartbeat, redis_client, worker_id)
+        except Exception as e:
+            print(f"[WARN] Heartbeat of {worker_id} failed: {e}")
+        await asyncio.sleep(HEARTBEAT_SECS)
+
+
+async def run_slot(redis_client, browser, page, slot):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{slot}"
+    print(f"[INFO] Slot {worker_id} ready")
+    beat = asyncio.create_task(heartbeat(redis_client, browser, worker_id))
+    try:
+        while browser.is_connected():
+            job = await asyncio.to_thread(take_job, redis_client)
+            if job is None:
+                continue
+            print(f"[INFO] Slot {slot}: {job['ticker']} ({job['interval']}) {job['rsi_momentum']} | job {job['id']}")
+            try:
+                result = await analyze_on_page(
+                    page, job["rsi_momentum"], job["ticker"], job["interval"], job["intent"])
+                await asyncio.to_thread(post_result, redis_client, job["id"], result=result)
+            except Exception as e:
+                print(f"[ERROR] Slot {slot}: job {job['id']} failed: {e}")
+                await asyncio.to_thread(post_result, redis_client, job["id"], error=str(e))
+    finally:
+        beat.cancel()
+        worker_gone(redis_client, worker_id)
+
+
+async def run_worker(pages):
+    redis_client = get_redis()
+    async with async_playwright() as p:
+        while True:
+            try:
+                browser = await p.chromium.connect_over_cdp(CDP_URL)
+            except Exception as e:
+                print(f"[WARN] Chrome not connected ({e}), retrying in {RECONNECT_SECS}s")
+                await asyncio.sleep(RECONNECT_SECS)
+                continue
+
+            context = browser.contexts[0]
+            # The first slot uses the open chart tab, like playwright_screenshot.py does
+            slot_pages = list(context.pages[:1])
+            while len(slot_pages) < pages:
+                slot_pages.append(await context.new_page())
+
+            await asyncio.gather(*(run_slot(redis_client, browser, page, i) for i, page in enumerate(slot_pages)))
+            print(f"[WARN] Chrome disconnected, reconnecting in {RECONNECT_SECS}s")
+            await asyncio.sleep(RECONNECT_SECS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm TradingView chart analysis worker")
+    parser.add_argument("--pages", type=int, default=1, help="chart pages (concurrent jobs) in this worker")
+    args = parser.parse_args()
+    # Screenshots land next to the scripts, as when the backend runs playwright_screenshot.py
+    os.chdir(Path(__file__).resolve().parent)
+    try:
+        asyncio.run(run_worker(max(1, args.pages)))
+    except KeyboardInterrupt:
+        pass
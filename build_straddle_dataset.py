@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Build a per-day minute dataset of the index and its ATM straddle for backtests.
+
+For every trading day in the range the builder reads the index minute candles,
+works out the band of strikes that were ATM during the day (plus a margin),
+downloads minute candles for those CE/PE series and writes one compressed
+columnar file per day with the ATM straddle already joined:
+
+    datasets/<SYMBOL>/<YYYY-MM-DD>.npz
+
+Downloads are split into chunks of at most CHUNK_DAYS days and fetched in
+parallel through KiteGateway, which keeps all workers under Kite's
+historical-data rate limit. Every chunk is cached under datasets/<SYMBOL>/raw
+as soon as it arrives, and days whose file already exists are skipped, so an
+interrupted run resumes where it stopped. Today is only built once the session
+has closed, and chunks ending today are never cached, so a run during market
+hours cannot leave partial candles behind.
+
+Kite only serves history for instruments in the current instruments dump, so
+expired weekly contracts cannot be fetched later. Run the builder nightly to
+keep the dataset complete.
+
+    python build_straddle_dataset.py NIFTY --from 2026-09-01 --to 2026-10-16
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, time as dtime, timedelta
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from kite_gateway import KiteGateway
+from underlying_registry import get_registry
+from utils.logger import setup_logger
+
+logger = logging.getLogger("root")
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "data"
+DATASET_DIR = BASE_DIR / "datasets"
+INSTRUMENTS_CSV = DATA_DIR / "kiteInstruments.csv"
+EXPIRIES_CSV = DATA_DIR / "expiries.csv"
+
+CHUNK_DAYS = 60       # Kite's maximum span for one minute-interval request
+MAX_GAP_DAYS = 5      # days of a series closer than this are fetched in one chunk
+STRIKE_PAD = 2        # extra strikes on each side of the day's ATM range
+RETRIES = 4
+SESSION_OPEN = dtime(9, 15)
+SESSION_CLOSE = dtime(15, 30)
+CLOSE_GRACE = timedelta(minutes=5)   # after the close, before the day's candles count as final
+
+
+def last_complete_day(now=None):
+    """Latest day whose session has closed: today after the close, else yesterday"""
+    now = now or datetime.now()
+    if now >= datetime.combine(now.date(), SESSION_CLOSE) + CLOSE_GRACE:
+        return now.date()
+    return now.date() - timedelta(days=1)
+
+
+def load_expiries(symbol, path=EXPIRIES_CSV):
+    """Sorted option expiries for a symbol from make_expiries.py's calendar"""
+    df = pd.read_csv(path, parse_dates=["expiry"])
+    return sorted(df.loc[df["symbol"] == symbol, "expiry"].dt.date.unique())
+
+
+def load_option_tokens(symbol, options_segment, path=INSTRUMENTS_CSV):
+    """{(expiry, strike, 'CE'/'PE'): instrument_token} for listed contracts of a symbol"""
+    df = pd.read_csv(path, parse_dates=["expiry"])
+    mask = (
+        (df["name"] == symbol)
+        & (df["segment"] == options_segment)
+        & (df["instrument_type"].isin(["CE", "PE"]))
+    )
+    rows = df.loc[mask, ["expiry", "strike", "instrument_type", "instrument_token"]]
+    return {
+        (exp.date(), int(round(strike)), opt): int(token)
+        for exp, strike, opt, token in rows.itertuples(index=False)
+    }
+
+
+def date_chunks(days, max_span=CHUNK_DAYS, max_gap=MAX_GAP_DAYS):
+    """Group sorted days into (first, last) runs that fit in one historical request"""
+    chunks = []
+    for day in days:
+        if chunks and (day - chunks[-1][1]).days <= max_gap and (day - chunks[-1][0]).days < max_span:
+            chunks[-1][1] = day
+        else:
+            chunks.append([day, day])
+    return [tuple(c) for c in chunks]
+
+
+def _atomic_savez(path, **arrays):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CandleCache:
+    """Raw minute candles per (token, chunk) on disk, so finished chunks are never fetched twice"""
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, token, first, last):
+        return self.directory / f"{token}_{first:%Y%m%d}_{last:%Y%m%d}.npz"
+
+    def has(self, token, first, last):
+        return self.path(token, first, last).exists()
+
+    @staticmethod
+    def arrays(candles):
+        return {
+            "minute": np.array([c["date"].replace(tzinfo=None) for c in candles], dtype="datetime64[m]"),
+            "ohlcv": np.array([[c["open"], c["high"], c["low"], c["close"], c["volume"]] for c in candles],
+                              dtype=np.float64).reshape(-1, 5),
+        }
+
+    @staticmethod
+    def frame(minute, ohlcv):
+        return pd.DataFrame(ohlcv, columns=["open", "high", "low", "close", "volume"],
+                            index=pd.DatetimeIndex(minute.astype("datetime64[ns]")))
+
+    def save(self, token, first, last, candles):
+        _atomic_savez(self.path(token, first, last), **self.arrays(candles))
+
+    def load(self, token, first, last):
+        with np.load(self.path(token, first, last)) as data:
+            frame = self.frame(data["minute"], data["ohlcv"])
+        return frame
+
+
+class StraddleDatasetBuilder:
+    def __init__(self, kite, symbol, out_dir=DATASET_DIR, workers=3, strike_pad=STRIKE_PAD):
+        self.kite = kite
+        self.symbol = symbol.upper()
+        self.underlying = get_registry().get(self.symbol)
+        self.out_dir = Path(out_dir) / self.symbol
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = CandleCache(self.out_dir / "raw")
+        self.workers = workers
+        self.strike_pad = strike_pad
+        self.step = self.underlying.strike_step
+
+    def day_path(self, day):
+        return self.out_dir / f"{day.isoformat()}.npz"
+
+    def build(self, start, end):
+        """Write every missing day between start and end (inclusive); returns the days written"""
+        if end > last_complete_day():
+            end = last_complete_day()
+            logger.info(f"[{self.symbol}] Today's session is not over; building up to {end}")
+        if end < start:
+            return []
+        todo = [d for d in pd.bdate_range(start, end).date if not self.day_path(d).exists()]
+        if not todo:
+            logger.info(f"[{self.symbol}] Dataset already complete for {start} → {end}")
+            return []
+
+        index = self._fetch_series(self.underlying.index_token, todo)
+        # Index chunks can span days that are already built
+        todo_days = set(todo)
+        plan = {day: v for day, v in self._plan(index).items() if day in todo_days}
+        if not plan:
+            logger.warning(f"[{self.symbol}] Nothing to build for {start} → {end}")
+            return []
+
+        needed = {}
+        for day, (expiry, strikes, tokens) in plan.items():
+            for token in tokens.values():
+                if token is not None:
+                    needed.setdefault(token, []).append(day)
+        logger.info(f"[{self.symbol}] {len(plan)} days, {len(needed)} option series to fetch")
+        options = self._fetch_many(needed)
+
+        written = []
+        for day in sorted(plan):
+            try:
+                self._write_day(day, index, plan[day], options)
+                written.append(day)
+            except Exception as e:
+                logger.error(f"[{self.symbol}] Could not write dataset for {day}: {e}")
+        return written
+
+    def _plan(self, index):
+        """day -> (expiry, band strikes, {(strike, opt): token}) from each day's index range"""
+        expiries = load_expiries(self.symbol)
+        tokens = load_option_tokens(self.symbol, self.underlying.options_segment)
+        plan = {}
+        for day, closes in index["close"].groupby(index.index.date):
+            expiry = next((e for e in expiries if e >= day), None)
+            if expiry is None:
+                logger.warning(f"[{self.symbol}] No expiry on or after {day} in {EXPIRIES_CSV}; skipped")
+                continue
+            atm = np.round(closes.to_numpy() / self.step) * self.step
+            low = int(atm.min()) - self.strike_pad * self.step
+            high = int(atm.max()) + self.strike_pad * self.step
+            strikes = list(range(low, high + 1, self.step))
+            legs = {(k, opt): tokens.get((expiry, k, opt)) for k in strikes for opt in ("CE", "PE")}
+            if not any(legs.values()):
+                logger.warning(f"[{self.symbol}] {day}: {expiry} contracts are not in the instruments dump "
+                               f"(expired contracts have no history); skipped")
+                continue
+            plan[day] = (expiry, strikes, legs)
+        return plan
+
+    def _fetch_chunk(self, token, first, last):
+        """Download a chunk into the cache; a chunk ending today is returned instead, never cached"""
+        if self.cache.has(token, first, last):
+            return None
+        from_dt = datetime.combine(first, SESSION_OPEN)
+        to_dt = datetime.combine(last, SESSION_CLOSE)
+        for attempt in range(1, RETRIES + 1):
+            try:
+                candles = self.kite.historical_data(token, from_dt, to_dt, "minute")
+                if last >= date.today():
+                    # Late corrections to today's candles must not be frozen in the cache
+                    return self.cache.arrays(candles)
+                self.cache.save(token, first, last, candles)
+                return None
+            except Exception as e:
+                if attempt == RETRIES:
+                    raise
+                logger.warning(f"[{self.symbol}] {token} {first}→{last} attempt {attempt} failed: {e}")
+                time.sleep(2 ** attempt)
+
+    def _fetch_many(self, needed):
+        """Fetch every (token, chunk) in parallel and return {token: DataFrame of minute candles}"""
+        jobs = [(token, first, last) for token, days in needed.items() for first, last in date_chunks(sorted(days))]
+        pending = [job for job in jobs if not self.cache.has(*job)]
+        logger.info(f"[{self.symbol}] {len(jobs)} chunks, {len(jobs) - len(pending)} cached, {len(pending)} to download")
+
+        failed = set()
+        uncached = {}   # job -> arrays of a chunk that ends today
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._fetch_chunk, *job): job for job in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                job = futures[future]
+                try:
+                    arrays = future.result()
+                    if arrays is not None:
+                        uncached[job] = arrays
+                except Exception as e:
+                    failed.add(job)
+                    logger.error(f"[{self.symbol}] Chunk {job} failed: {e}")
+                if done % 50 == 0 or done == len(futures):
+                    logger.info(f"[{self.symbol}] Downloaded {done}/{len(futures)} chunks")
+
+        frames = {}
+        for token, first, last in jobs:
+            job = (token, first, last)
+            if job in failed:
+                continue
+            if job in uncached:
+                frames.setdefault(token, []).append(self.cache.frame(**uncached[job]))
+            else:
+                frames.setdefault(token, []).append(self.cache.load(token, first, last))
+        return {token: pd.concat(parts).sort_index() for token, parts in frames.items()}
+
+    def _fetch_series(self, token, days):
+        empty = pd.DataFrame(columns=["open", "high", "low", "close", "volume"], index=pd.DatetimeIndex([]))
+        return self._fetch_many({token: days}).get(token, empty)
+
+    def _write_day(self, day, index, day_plan, options):
+        expiry, strikes, legs = day_plan
+        idx = index.loc[str(day)]
+        idx = idx[~idx.index.duplicated(keep="last")]
+        minutes = idx.index
+
+        shape = (len(minutes), len(strikes))
+        close = {"CE": np.full(shape, np.nan), "PE": np.full(shape, np.nan)}
+        volume = {"CE": np.zeros(shape), "PE": np.zeros(shape)}
+        for col, strike in enumerate(strikes):
+            for opt in ("CE", "PE"):
+                series = options.get(legs[(strike, opt)])
+                if series is None or series.empty:
+                    continue
+                series = series[~series.index.duplicated(keep="last")]
+                day_rows = series.reindex(minutes)
+                close[opt][:, col] = day_rows["close"].ffill().to_numpy()
+                volume[opt][:, col] = day_rows["volume"].fillna(0).to_numpy()
+
+        # ATM at each minute close, as StraddleVWAPUpdater picks it
+        idx_close = idx["close"].to_numpy()
+        atm = (np.round(idx_close / self.step) * self.step).astype(np.int64)
+        atm_col = np.clip(np.searchsorted(strikes, atm), 0, len(strikes) - 1)
+        rows = np.arange(len(minutes))
+        straddle = close["CE"][rows, atm_col] + close["PE"][rows, atm_col]
+        straddle_volume = volume["CE"][rows, atm_col] + volume["PE"][rows, atm_col]
+
+        _atomic_savez(
+            self.day_path(day),
+            symbol=np.array(self.symbol),
+            expiry=np.array(expiry.isoformat()),
+            minute=minutes.to_numpy().astype("datetime64[m]"),
+            index_ohlc=idx[["open", "high", "low", "close"]].to_numpy(dtype=np.float64),
+            strikes=np.array(strikes, dtype=np.int64),
+            ce_close=close["CE"].astype(np.float32),
+            pe_close=close["PE"].astype(np.float32),
+            ce_volume=volume["CE"].astype(np.float32),
+            pe_volume=volume["PE"].astype(np.float32),
+            atm_strike=atm,
+            straddle=straddle.astype(np.float32),
+            straddle_volume=straddle_volume.astype(np.float32),
+        )
+        logger.info(f"[{self.symbol}] Wrote {self.day_path(day)} ({len(minutes)} minutes, {len(strikes)} strikes, expiry {expiry})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build per-day index + ATM straddle minute datasets")
+    parser.add_argument("symbol", help="Underlying, e.g. NIFTY")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, default=None,
+                        help="First day (YYYY-MM-DD), default 30 days before --to")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=last_complete_day(),
+                        help="Last day (YYYY-MM-DD), default the last day whose session has closed")
+    parser.add_argument("--workers", type=int, default=3, help="Parallel download workers")
+    parser.add_argument("--out", default=str(DATASET_DIR), help="Dataset root directory")
+    args = parser.parse_args()
+
+    setup_logger("root", log_file="dataset_builder.log", rotate=True)
+    if not INSTRUMENTS_CSV.exists() or not EXPIRIES_CSV.exists():
+        logger.error("Run make_expiries.py first to download the instruments dump and expiry calendar")
+        sys.exit(1)
+
+    from kite_login import kite_login
+    kite = KiteGateway(kite_login())
+    start = args.start or args.end - timedelta(days=30)
+    builder = StraddleDatasetBuilder(kite, args.symbol, out_dir=args.out, workers=args.workers)
+    written = builder.build(start, args.end)
+    logger.info(f"[{builder.symbol}] Wrote {len(written)} day files to {builder.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
-import redis
+from utils.redis_client import get_redis
 
 #!/usr/bin/env python3
 
-def clear_redis_data(redis_host='localhost', redis_port=6379, redis_db=0):
+def clear_redis_data(redis_host=None, redis_port=None, redis_db=None):
     try:
         # Connect to Redis
-        client = redis.Redis(host=redis_host, port=redis_port, db=redis_db)
+        client = get_redis(redis_host, redis_port, redis_db)
         # Flush all data from all databases
         client.flushall()
         print("Successfully cleared Redis data.")
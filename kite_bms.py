@@ -1,8 +1,18 @@
 import logging
 from utils.redis_utils import update_trading_status 
+from utils.order_journal import apply_fill
+from utils.clock import get_clock
 import time 
+import itertools
+import threading
 
 logger = logging.getLogger(__name__)
+
+# Sandbox order IDs, unique within the process (every instance of an orchestrator)
+# however many orders fall in the same clock second
+_sandbox_ids = itertools.count(1)
+
+
 class KiteTrader:
     def __init__(self):
         self.sandbox_mode = True
@@ -10,11 +20,30 @@ class KiteTrader:
             'NFO': 1800,
             'BFO': 1000
         }
+        self.freeze_limit = None  # per-underlying limit from the registry, when known
         self.slice_delay = 0.5  # Delay between slice orders in seconds
         self.max_slices = 10    # Maximum number of slices per order
+        self.journal = None     # OrderJournal, set once the strategy knows its symbol
+        self.clock = get_clock()
+        self._intent_counter = itertools.count(1)
+        self.ledger_lock = threading.RLock()  # guards position books against the reconciler
+        self.orders_in_flight = set()  # order IDs whose fill this thread is still waiting for
+        self.reconcile_interval = 30  # Seconds between broker position reconciliations
+
+    def _journal(self, event, **fields):
+        """Append a record to the order journal if one is attached"""
+        if self.journal is not None:
+            return self.journal.append(event, **fields)
+        return None
+
+    def _after_order(self):
+        """Hook run after every sliced order completes; overridden by strategies to checkpoint state"""
+        pass
 
     def _get_freeze_limit(self, exchange):
-        """Get freeze limit for the given exchange"""
+        """Get freeze limit for the traded underlying, falling back to the exchange default"""
+        if self.freeze_limit:
+            return self.freeze_limit
         return self.freeze_limits.get(exchange, 1000)
     
     def _calculate_order_slices(self, quantity, exchange):
@@ -43,16 +72,19 @@ class KiteTrader:
         
         return slices
 
-    def _place_single_order_slice(self, tradingsymbol, transaction_type, quantity, strategy, slice_num=1, total_slices=1):
+    def _place_single_order_slice(self, tradingsymbol, transaction_type, quantity, strategy, slice_num=1, total_slices=1, intent_id=None):
         """
         Place a single order slice with fallback mechanism
         """
+        order_id = None
         try:
 
             if self.sandbox_mode:
-                fake_order_id = f"SANDBOX_{int(time.time())}_{slice_num}"
+                fake_order_id = f"SANDBOX_{int(self.clock.time())}_{next(_sandbox_ids)}"
                 logger.info(f"[SANDBOX] SIMULATED ORDER : {transaction_type} {quantity} {tradingsymbol}")
                 logger.info(f"[SANDBOX] Order ID : {fake_order_id}")
+                self._journal("order", intent_id=intent_id, order_id=fake_order_id, symbol=tradingsymbol,
+                              side=transaction_type, quantity=quantity, strategy=strategy, slice=slice_num, sandbox=True)
                 return fake_order_id
 
             logger.info(f"[{tradingsymbol}] Placing {transaction_type} order slice {slice_num}/{total_slices} for {tradingsymbol} qty={quantity}")
@@ -64,32 +96,45 @@ class KiteTrader:
             else:
                 limit_price = round(ltp * (1 - self.order_buffer_pct) / 0.05) * 0.05
 
-            order_id = self.kite.place_order(
-                variety=self.kite.VARIETY_REGULAR,
-                exchange=self.exchange_options,
-                tradingsymbol=tradingsymbol,
-                transaction_type=transaction_type,
-                quantity=quantity,
-                order_type=self.kite.ORDER_TYPE_LIMIT,
-                price=round(limit_price, 2),
-                product=self.product_type
-            )
+            try:
+                order_id = self.kite.place_order(
+                    variety=self.kite.VARIETY_REGULAR,
+                    exchange=self.exchange_options,
+                    tradingsymbol=tradingsymbol,
+                    transaction_type=transaction_type,
+                    quantity=quantity,
+                    order_type=self.kite.ORDER_TYPE_LIMIT,
+                    price=round(limit_price, 2),
+                    product=self.product_type
+                )
+            except Exception as e:
+                # The order may still have reached the exchange (e.g. a timeout); journal the
+                # attempt so the reconciler can match it to a broker order
+                self._journal("order", intent_id=intent_id, order_id=None, symbol=tradingsymbol, side=transaction_type,
+                              quantity=quantity, strategy=strategy, slice=slice_num, order_type="LIMIT",
+                              price=round(limit_price, 2), status="PLACE_FAILED", error=str(e))
+                raise
+            # Until its fill is booked below, the reconciler leaves this order alone
+            self.orders_in_flight.add(order_id)
             
+            self._journal("order", intent_id=intent_id, order_id=order_id, symbol=tradingsymbol, side=transaction_type,
+                          quantity=quantity, strategy=strategy, slice=slice_num, order_type="LIMIT", price=round(limit_price, 2))
+
             # order_id = f"{slice_num}_{int(time.time())}"  # Simulated order ID
             # self._update_position(tradingsymbol, transaction_type, quantity, limit_price, strategy)
 
             logger.info(f"[{tradingsymbol}] LIMIT {transaction_type} slice {slice_num}/{total_slices} {tradingsymbol} @ {limit_price:.2f} → ID {order_id}")
             
-            start = time.time()
-            while time.time() - start < self.fill_timeout_sec:
+            start = self.clock.monotonic()
+            while self.clock.monotonic() - start < self.fill_timeout_sec:
                 hist = self.kite.order_history(order_id)
                 complete = next((o for o in hist if o.get("status") == "COMPLETE"), None)
                 if complete:
                     traded_price = complete.get("average_price") or complete.get("price")
-                    self._update_position(tradingsymbol, transaction_type, quantity, traded_price, strategy)
+                    self._update_position(tradingsymbol, transaction_type, quantity, traded_price, strategy, order_id=order_id)
                     logger.info(f"[{tradingsymbol}] Order slice {slice_num} {order_id} filled @ {traded_price:.2f}")
                     return order_id
-                time.sleep(0.5)
+                self.clock.sleep(0.5)
 
             # Fallback to market order if limit order not filled
             try:
@@ -99,11 +144,14 @@ class KiteTrader:
                     order_type=self.kite.ORDER_TYPE_MARKET,
                     price=None
                 )
+                self._journal("status", order_id=order_id, symbol=tradingsymbol, status="MODIFIED_MARKET")
             except Exception as e:
                 logger.error(f"[{tradingsymbol}] Error modifying order {order_id} to MARKET: {e}")
+                self._journal("status", order_id=order_id, symbol=tradingsymbol, status="MODIFY_FAILED", error=str(e))
                 
             #This is just for market convert
-            self._update_position(tradingsymbol, transaction_type, quantity, limit_price, strategy)
+            self._update_position(tradingsymbol, transaction_type, quantity, limit_price, strategy,
+                                  order_id=order_id, estimated=True)
 
             logger.warning(f"[{tradingsymbol}] LIMIT slice {slice_num} {order_id} not filled in {self.fill_timeout_sec}s → modified to MARKET")
             
@@ -111,9 +159,13 @@ class KiteTrader:
 
         except Exception as e:
             logger.error(f"[{tradingsymbol}] Error placing order slice {slice_num} for {tradingsymbol}: {e}")
+            self._journal("slice_failed", intent_id=intent_id, symbol=tradingsymbol, side=transaction_type,
+                          quantity=quantity, strategy=strategy, slice=slice_num, error=str(e))
             return None
+        finally:
+            self.orders_in_flight.discard(order_id)
 
-    def _update_position(self, tradingsymbol, transaction_type, quantity, price, strategy):
+    def _update_position(self, tradingsymbol, transaction_type, quantity, price, strategy, order_id=None, estimated=False):
 
         if strategy == "BATMAN":
             positions_dict = self.batman_positions
@@ -121,53 +173,11 @@ class KiteTrader:
         elif strategy == "DEBIT_SPREAD":
             positions_dict = self.debit_spread_positions
             closed_pnls_list = self.debit_spread_closed_pnls
-            
-        pos = positions_dict.get(tradingsymbol, {'quantity': 0, 'avg_price': 0.0})
-        qty, avg = pos['quantity'], pos['avg_price']
-
-        if transaction_type == self.kite.TRANSACTION_TYPE_BUY:
-            if qty >= 0:
-                new_qty = qty + quantity
-                new_avg = ((qty * avg) + (quantity * price)) / new_qty
-            else:
-                cover_qty = min(quantity, -qty)
-                pnl = (avg - price) * cover_qty
-                closed_pnls_list.append(pnl)
-
-                if quantity > -qty:
-                    new_qty = quantity + qty      # qty is negative
-                    new_avg = price               # new long basis = this price
-                else:
-                    new_qty = qty + quantity
-                    new_avg = avg
-
-        else:  # SELL
-            if qty <= 0:
-                new_qty = qty - quantity      # more negative
-                total_shorts = -qty + quantity
-                new_avg = ((-qty * avg) + (quantity * price)) / total_shorts
-            else:
-                # unwinding long
-                close_qty = min(quantity, qty)
-                pnl = (price - avg) * close_qty
-                closed_pnls_list.append(pnl)
 
-                if quantity > qty:
-                    # flipped from long to net short
-                    new_qty = qty - quantity      # negative
-                    new_avg = price               # new short basis = this price
-                else:
-                    # still long
-                    new_qty = qty - quantity
-                    new_avg = avg
-
-        if new_qty == 0:
-            positions_dict.pop(tradingsymbol, None)
-        else:
-            positions_dict[tradingsymbol] = {
-                'quantity': new_qty,
-                'avg_price': new_avg
-            }
+        with self.ledger_lock:
+            new_qty, new_avg = apply_fill(positions_dict, closed_pnls_list, tradingsymbol, transaction_type, quantity, price)
+            self._journal("fill", order_id=order_id, symbol=tradingsymbol, side=transaction_type, quantity=quantity,
+                          price=price, strategy=strategy, estimated=estimated)
             
         logger.info(f"[{strategy}] Updated position for {tradingsymbol}: qty={new_qty}, avg={new_avg:.2f}")
 
@@ -185,6 +195,9 @@ class KiteTrader:
             # Calculate order slices
             slices = self._calculate_order_slices(quantity, self.exchange_options)
             total_slices = len(slices)
+            intent_id = f"{strategy}-{int(self.clock.time() * 1000)}-{next(self._intent_counter)}"
+            self._journal("intent", intent_id=intent_id, symbol=tradingsymbol, side=transaction_type,
+                          quantity=quantity, strategy=strategy, slices=slices)
             
             if total_slices > 1:
                 logger.info(f"[{tradingsymbol}] Order requires slicing: {quantity} qty split into {total_slices} slices due to freeze limit")
@@ -197,7 +210,7 @@ class KiteTrader:
                     continue
                     
                 order_id = self._place_single_order_slice(
-                    tradingsymbol, transaction_type, slice_qty, strategy, slice_num, total_slices
+                    tradingsymbol, transaction_type, slice_qty, strategy, slice_num, total_slices, intent_id
                 )
                 
                 if order_id:
@@ -208,8 +221,10 @@ class KiteTrader:
                 
                 # Add delay between slices (except for last slice)
                 if slice_num < total_slices:
-                    time.sleep(self.slice_delay)
+                    self.clock.sleep(self.slice_delay)
             
+            self._after_order()
+
             if order_ids:
                 logger.info(f"[{tradingsymbol}] All order slices placed successfully. Order IDs: {order_ids}")
                 return order_ids[0] if order_ids else None
@@ -240,31 +255,35 @@ class KiteTrader:
 
     def compute_mtm(self):
         """Return a dict with realized, unrealized & total PnL computed separately for BATMAN and DEBIT_SPREAD strategies."""
+        batman_positions_copy = dict(getattr(self, 'batman_positions', {}))
+        debit_positions_copy = dict(getattr(self, 'debit_spread_positions', {}))
+
+        # One batched LTP call for every open leg of both strategies
+        keys = [f"{self.exchange_options}:{sym}" for sym in set(batman_positions_copy) | set(debit_positions_copy)]
+        quotes = {}
+        if keys:
+            try:
+                quotes = self.kite.ltp(keys)
+            except Exception as e:
+                logger.error(f"MTM LTP fetch error for {keys}: {e}")
+
         # Compute unrealized PnL for BATMAN
         batman_unrealized = 0.0
-        if hasattr(self, 'batman_positions'):
-            # Create a copy to avoid "dictionary changed size during iteration" error
-            batman_positions_copy = dict(self.batman_positions)
-            for sym, pos in batman_positions_copy.items():
-                try:
-                    key = f"{self.exchange_options}:{sym}"
-                    ltp = self.kite.ltp(key)[key]["last_price"]
-                    batman_unrealized += (ltp - pos['avg_price']) * pos['quantity']
-                except Exception as e:
-                    logger.error(f"MTM fetch error for {sym} in BATMAN: {e}")
+        for sym, pos in batman_positions_copy.items():
+            try:
+                ltp = quotes[f"{self.exchange_options}:{sym}"]["last_price"]
+                batman_unrealized += (ltp - pos['avg_price']) * pos['quantity']
+            except Exception as e:
+                logger.error(f"MTM fetch error for {sym} in BATMAN: {e}")
         
         # Compute unrealized PnL for DEBIT_SPREAD
         debit_unrealized = 0.0
-        if hasattr(self, 'debit_spread_positions'):
-            # Create a copy to avoid "dictionary changed size during iteration" error
-            debit_positions_copy = dict(self.debit_spread_positions)
-            for sym, pos in debit_positions_copy.items():
-                try:
-                    key = f"{self.exchange_options}:{sym}"
-                    ltp = self.kite.ltp(key)[key]["last_price"]
-                    debit_unrealized += (ltp - pos['avg_price']) * pos['quantity']
-                except Exception as e:
-                    logger.error(f"MTM fetch error for {sym} in DEBIT_SPREAD: {e}")
+        for sym, pos in debit_positions_copy.items():
+            try:
+                ltp = quotes[f"{self.exchange_options}:{sym}"]["last_price"]
+                debit_unrealized += (ltp - pos['avg_price']) * pos['quantity']
+            except Exception as e:
+                logger.error(f"MTM fetch error for {sym} in DEBIT_SPREAD: {e}")
         
         batman_realized = sum(self.batman_closed_pnls) if hasattr(self, 'batman_closed_pnls') else 0.0
         debit_realized = sum(self.debit_spread_closed_pnls) if hasattr(self, 'debit_spread_closed_pnls') else 0.0
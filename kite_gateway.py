@@ -0,0 +1,158 @@
+import threading
+import logging
+from utils.clock import get_clock
+
+logger = logging.getLogger("root")
+
+# Kite Connect API rate limits (requests per second) by endpoint class
+RATE_LIMITS = {
+    "quote": 1,
+    "historical": 3,
+    "order": 10,
+    "default": 10,
+}
+
+ENDPOINT_CLASSES = {
+    "ltp": "quote",
+    "quote": "quote",
+    "ohlc": "quote",
+    "historical_data": "historical",
+    "place_order": "order",
+    "modify_order": "order",
+    "cancel_order": "order",
+}
+
+
+class RateLimiter:
+    """Thread-safe token bucket; acquire() blocks until a request may be sent"""
+    def __init__(self, rate, burst=None, clock=None):
+        self.clock = clock or get_clock()
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = self.clock.monotonic()
+        self.calls = 0   # requests let through, counted under the lock
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.calls += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.clock.sleep(wait)
+
+
+class KiteGateway:
+    """
+    Rate-limited proxy around one KiteConnect session.
+
+    Every strategy instance in a process shares the gateway, so the per-second
+    API limits are enforced across all of them. Attributes that are not API
+    calls (TRANSACTION_TYPE_BUY, api_key, ...) pass straight through.
+    """
+    def __init__(self, kite, rate_limits=None):
+        self._kite = kite
+        limits = dict(RATE_LIMITS, **(rate_limits or {}))
+        self._limiters = {name: RateLimiter(rate) for name, rate in limits.items()}
+
+    def __getattr__(self, name):
+        attr = getattr(self._kite, name)
+        if not callable(attr) or name.startswith("_") or name.isupper():
+            return attr
+
+        endpoint_class = ENDPOINT_CLASSES.get(name, "default")
+        limiter = self._limiters[endpoint_class]
+
+        def call(*args, **kwargs):
+            limiter.acquire()
+            return attr(*args, **kwargs)
+        return call
+
+    def stats(self):
+        return {name: limiter.calls for name, limiter in self._limiters.items()}
+
+
+class TickHub:
+    """
+    One KiteTicker websocket shared by every strategy instance in the process.
+    Subscribers register instrument tokens and a callback that receives the
+    ticks for those tokens only.
+    """
+    def __init__(self, kite):
+        self.kite = kite
+        self.ticker = None
+        self.lock = threading.Lock()
+        self.subscribers = {}   # callback -> set(tokens)
+        self.connected = False
+
+    def _ensure_connected(self):
+        if self.ticker is not None:
+            return
+        from kiteconnect import KiteTicker
+        self.ticker = KiteTicker(self.kite.api_key, self.kite.access_token)
+        self.ticker.on_ticks = self._on_ticks
+        self.ticker.on_connect = self._on_connect
+        self.ticker.on_close = self._on_close
+        self.ticker.connect(threaded=True)
+
+    def _all_tokens(self):
+        tokens = set()
+        for toks in self.subscribers.values():
+            tokens |= toks
+        return tokens
+
+    def _on_connect(self, ws, response):
+        self.connected = True
+        with self.lock:
+            tokens = list(self._all_tokens())
+        if tokens:
+            ws.subscribe(tokens)
+            ws.set_mode(ws.MODE_FULL, tokens)
+        logger.info(f"Tick connection established, subscribed {len(tokens)} tokens")
+
+    def _on_close(self, ws, code, reason):
+        self.connected = False
+        logger.warning(f"Tick connection closed: {code} {reason}")
+
+    def _on_ticks(self, ws, ticks):
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for callback, tokens in subscribers:
+            mine = [t for t in ticks if t.get("instrument_token") in tokens]
+            if mine:
+                try:
+                    callback(mine)
+                except Exception as e:
+                    logger.error(f"Tick subscriber error: {e}")
+
+    def subscribe(self, tokens, callback):
+        tokens = {int(t) for t in tokens}
+        with self.lock:
+            new = tokens - self._all_tokens()
+            self.subscribers.setdefault(callback, set()).update(tokens)
+            self._ensure_connected()
+        if new and self.connected:
+            self.ticker.subscribe(list(new))
+            self.ticker.set_mode(self.ticker.MODE_FULL, list(new))
+
+    def unsubscribe(self, callback, tokens=None):
+        with self.lock:
+            current = self.subscribers.get(callback, set())
+            removed = set(current) if tokens is None else {int(t) for t in tokens} & current
+            current -= removed
+            if not current:
+                self.subscribers.pop(callback, None)
+            stale = removed - self._all_tokens()
+        if stale and self.connected:
+            self.ticker.unsubscribe(list(stale))
+
+    def close(self):
+        if self.ticker is not None:
+            self.ticker.close()
+            self.ticker = None
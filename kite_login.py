@@ -45,6 +45,24 @@ def save_access_token(access_token):
     save_credentials(credentials)
     logger.info("Access token saved successfully to creds.json")
 
+def _shared_session(access_token):
+    """Validation of access_token published by kite_session, if still fresh"""
+    try:
+        from kite_session import shared_session
+        from utils.redis_client import get_redis
+        return shared_session(get_redis(), access_token)
+    except Exception as e:
+        logger.debug("Shared Kite session unavailable: %s", e)
+        return None
+
+def _share_session(access_token, user_name):
+    try:
+        from kite_session import record_session
+        from utils.redis_client import get_redis
+        record_session(get_redis(), access_token, user_name)
+    except Exception as e:
+        logger.debug("Could not share Kite session: %s", e)
+
 def kite_login():
 
     is_token_valid = False
@@ -63,10 +81,17 @@ def kite_login():
 
             if access_token:
                 kite.set_access_token(access_token)
+                shared = _shared_session(access_token)
+                if shared:
+                    # Validated recently by the backend or another strategy process
+                    is_token_valid = True
+                    print(f"Logged in as {shared['user_name']}")
+                    continue
                 try:
                     profile = kite.profile()  # Verify token validity
                     is_token_valid = True
                     print(f"Logged in as {profile['user_name']}")
+                    _share_session(access_token, profile['user_name'])
                 except Exception:
                     print("Access token invalid, Waiting for Token to set from FE...")
             else:
@@ -0,0 +1,153 @@
+"""
+Cached Kite session validation. The backend checks the stored access token
+with profile() at most once per SESSION_TTL instead of on every auth request,
+and publishes the result in Redis so kite_login() in the strategy processes
+can trust a token the backend (or another process) validated recently.
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from kiteconnect import KiteConnect
+from kite_login import load_credentials, save_access_token
+
+logger = logging.getLogger("root")
+
+SESSION_KEY = "kite:session"   # {"token": digest of the access token, "user_name", "validated_at"}
+SESSION_TTL = 300              # seconds a successful profile() check is trusted
+INVALID_TTL = 15               # seconds a failed check is trusted
+
+
+def token_digest(access_token):
+    """Identifies a token in Redis without storing it there"""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+
+def record_session(redis_client, access_token, user_name, ttl=SESSION_TTL):
+    """Publish that access_token was just validated"""
+    record = {"token": token_digest(access_token), "user_name": user_name, "validated_at": time.time()}
+    redis_client.set(SESSION_KEY, json.dumps(record), ex=ttl)
+
+
+def shared_session(redis_client, access_token):
+    """The published validation of access_token if it has not expired, else None"""
+    raw = redis_client.get(SESSION_KEY)
+    if not raw:
+        return None
+    record = json.loads(raw)
+    return record if record.get("token") == token_digest(access_token) else None
+
+
+def clear_session(redis_client):
+    redis_client.delete(SESSION_KEY)
+
+
+class KiteSessionManager:
+    """
+    One KiteConnect per (api key, access token) and the last validation result
+    of the stored token. A valid result is kept for ttl seconds, an invalid
+    one for INVALID_TTL; saving a new token through login() replaces both.
+    """
+    def __init__(self, redis_client=None, ttl=SESSION_TTL):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._kite = None        # KiteConnect of the current token
+        self._kite_for = None    # (api_key, access_token) it was built for
+        self._status = None      # last result of status()
+        self._expires = 0.0
+
+    def _client(self, api_key, access_token=None):
+        if self._kite_for != (api_key, access_token):
+            kite = KiteConnect(api_key=api_key)
+            if access_token:
+                kite.set_access_token(access_token)
+            self._kite, self._kite_for = kite, (api_key, access_token)
+        return self._kite
+
+    def _remember(self, status, ttl):
+        self._status, self._expires = status, time.monotonic() + ttl
+        return self._public(status)
+
+    @staticmethod
+    def _public(status):
+        return {key: value for key, value in status.items() if key != "token"}
+
+    def _publish(self, access_token, user_name):
+        if self.redis_client is None:
+            return
+        try:
+            record_session(self.redis_client, access_token, user_name, self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not share the Kite session: {e}")
+
+    def status(self, force=False):
+        """
+        {"authenticated", "user_name", "message", "api_key", "checked_at"} for
+        the token in creds.json; profile() is only called when no fresh
+        result is cached here or shared in Redis.
+        """
+        credentials = load_credentials()
+        api_key = credentials["apiKey"]
+        access_token = credentials.get("accessToken")
+        with self.lock:
+            cached = self._status
+            if (not force and cached is not None and cached["token"] == access_token
+                    and cached["api_key"] == api_key and time.monotonic() < self._expires):
+                return self._public(cached)
+
+            status = {"token": access_token, "api_key": api_key, "checked_at": time.time()}
+            if not access_token:
+                return self._remember({**status, "authenticated": False, "user_name": None,
+                                       "message": "No access token found"}, INVALID_TTL)
+
+            if not force and self.redis_client is not None:
+                try:
+                    shared = shared_session(self.redis_client, access_token)
+                except Exception:
+                    shared = None
+                if shared:
+                    self._client(api_key, access_token)
+                    remaining = shared["validated_at"] + self.ttl - time.time()
+                    return self._remember({**status, "authenticated": True, "user_name": shared["user_name"],
+                                           "message": f"Authenticated as {shared['user_name']}",
+                                           "checked_at": shared["validated_at"]}, max(remaining, 1))
+
+            kite = self._client(api_key, access_token)
+            try:
+                profile = kite.profile()
+            except Exception as e:
+                logger.info(f"Kite token validation failed: {e}")
+                return self._remember({**status, "authenticated": False, "user_name": None,
+                                       "message": f"Authentication failed: {e}"}, INVALID_TTL)
+            self._publish(access_token, profile["user_name"])
+            return self._remember({**status, "authenticated": True, "user_name": profile["user_name"],
+                                   "message": f"Authenticated as {profile['user_name']}"}, self.ttl)
+
+    def login(self, request_token):
+        """Exchange a request token for an access token, save and share it; returns the user name"""
+        credentials = load_credentials()
+        api_key = credentials["apiKey"]
+        with self.lock:
+            self._status = None
+            session = self._client(api_key).generate_session(request_token, api_secret=credentials["secret"])
+            access_token = session["access_token"]
+            save_access_token(access_token)
+            kite = self._client(api_key, access_token)
+            # generate_session already proved the token; profile() only if it did not name the user
+            user_name = session.get("user_name") or kite.profile()["user_name"]
+            self._publish(access_token, user_name)
+            self._remember({"token": access_token, "api_key": api_key, "checked_at": time.time(),
+                            "authenticated": True, "user_name": user_name,
+                            "message": f"Authenticated as {user_name}"}, self.ttl)
+            return user_name
+
+    def invalidate(self):
+        with self.lock:
+            self._status = None
+        if self.redis_client is not None:
+            try:
+                clear_session(self.redis_client)
+            except Exception:
+                pass
@@ -7,6 +7,7 @@ from datetime import datetime
 from pathlib import Path
 import requests
 import re
+from underlying_registry import get_registry
 
 URL = "https://api.kite.trade/instruments"
 
@@ -74,11 +75,15 @@ def main():
     df = pd.read_csv(out_path, parse_dates=["expiry"])
     df.columns = [c.strip() for c in df.columns]
 
-    nifty_exps = unique_expiries_with_tokens(df, symbol="NIFTY", exchange="NFO", segment="NFO-OPT")
-    sensex_exps = unique_expiries_with_tokens(df, symbol="SENSEX", exchange="BFO", segment="BFO-OPT")
-        
+    registry = get_registry()
+    per_symbol = {}
+    for symbol in registry.symbols():
+        underlying = registry.get(symbol)
+        per_symbol[symbol] = unique_expiries_with_tokens(
+            df, symbol=symbol, exchange=underlying.options_exchange, segment=underlying.options_segment
+        )
 
-    combined = pd.concat([nifty_exps, sensex_exps], axis=0).reset_index(drop=True)
+    combined = pd.concat(list(per_symbol.values()), axis=0).reset_index(drop=True)
     combined.rename(columns={"token_short": "zerodha_token"}, inplace=True)
 
     # Order columns nicely
@@ -90,10 +95,9 @@ def main():
     print("\nWrote:")
     print(f"- CSV:     {csv_path}")
 
-    print("\nNIFTY Option Expiries:")
-    print(nifty_exps)
-    print("\nSENSEX Option Expiries:")
-    print(sensex_exps)
+    for symbol, exps in per_symbol.items():
+        print(f"\n{symbol} Option Expiries:")
+        print(exps)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,228 @@
+import threading
+import logging
+from datetime import datetime
+from utils.order_journal import JournalReader
+from utils.redis_utils import update_strategy_action, instance_thread_name
+
+logger = logging.getLogger("root")
+
+PRICE_TOLERANCE = 0.05  # one tick
+ADOPT_WINDOW = 60       # seconds after a failed placement in which a matching broker order is taken as its
+
+
+def _epoch(timestamp):
+    """Epoch seconds of a broker order timestamp (datetime or 'YYYY-mm-dd HH:MM:SS'), None if absent"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return None
+
+
+class PositionReconciler:
+    """
+    Background reconciliation of the strategy ledger against the broker.
+
+    Every interval it pulls kite.positions() and kite.orders() (two calls per
+    cycle, no per-order history polling), corrects journaled fills whose
+    quantity or price differs from what the broker executed, rebuilds the
+    ledger from the corrected journal and flags positions in this
+    instance's symbols that the ledger cannot explain. Orders whose fill the
+    trading thread is still waiting for are left to it. Broker calls and the
+    journal replay run on this thread; the trading thread is only blocked
+    for the in-memory ledger swap.
+    """
+    def __init__(self, trader, interval=30):
+        self.trader = trader
+        self.interval = interval
+        self.last_report = {}
+        self._thread = None
+
+    def start(self, stop_event):
+        self._thread = self.trader.clock.register(threading.Thread(
+            target=self._run, args=(stop_event,), name=instance_thread_name(self.trader.instance, "reconciler"), daemon=True))
+        self._thread.start()
+        return self._thread
+
+    def _run(self, stop_event):
+        logger.info(f"[{self.trader.symbol}] Position reconciler started (every {self.interval}s)")
+        while not self.trader.clock.wait(stop_event, self.interval):
+            try:
+                self.reconcile_once()
+            except Exception as e:
+                logger.error(f"[{self.trader.symbol}] Reconciliation error: {e}")
+
+    def reconcile_once(self):
+        trader = self.trader
+        if trader.sandbox_mode or trader.journal is None:
+            return None
+
+        broker_positions = trader.kite.positions().get("net", [])
+        broker_orders = {o["order_id"]: o for o in trader.kite.orders()}
+
+        trader.journal.flush()
+        reader = JournalReader(trader.journal.path)
+        adopted = self._adopt_failed_orders(reader, broker_orders)
+        if adopted:
+            trader.journal.flush()
+            reader = JournalReader(trader.journal.path)
+
+        corrections = self._correct_fills(reader, broker_orders)
+        ledger_changes = self._apply_ledger()
+        flags = self._diff_positions(reader, broker_positions)
+
+        self.last_report = {
+            "timestamp": self.trader.clock.time(),
+            "adopted": adopted,
+            "corrections": corrections,
+            "ledger_changes": ledger_changes,
+            "flags": flags,
+        }
+        if adopted or corrections or ledger_changes or flags:
+            logger.warning(f"[{trader.symbol}] Reconciliation report: {self.last_report}")
+            update_strategy_action(trader.redis_client, "Position Reconciliation", self.last_report)
+        return self.last_report
+
+    def _adopt_failed_orders(self, reader, broker_orders):
+        """
+        Journal the broker order behind a placement that raised (e.g. timed out after
+        reaching the exchange): same symbol, side and quantity, placed within
+        ADOPT_WINDOW of the attempt and not journaled already. Its fill is then
+        corrected like that of any other own order.
+        """
+        trader = self.trader
+        adopted = []
+        taken = set(reader.orders)
+        for seq, attempt in reader.failed_orders.items():
+            for order_id, order in broker_orders.items():
+                if (order_id in taken or order.get("exchange") != trader.exchange_options
+                        or order.get("tradingsymbol") != attempt["symbol"]
+                        or order.get("transaction_type") != attempt["side"]
+                        or int(order.get("quantity") or 0) != attempt["quantity"]):
+                    continue
+                placed = _epoch(order.get("order_timestamp"))
+                if placed is None or not attempt["ts"] - 5 <= placed <= attempt["ts"] + ADOPT_WINDOW:
+                    continue
+                trader._journal("order", intent_id=attempt.get("intent_id"), order_id=order_id, symbol=attempt["symbol"],
+                                side=attempt["side"], quantity=attempt["quantity"], strategy=attempt["strategy"],
+                                slice=attempt.get("slice"), attempt_seq=seq, adopted=True)
+                taken.add(order_id)
+                adopted.append({"order_id": order_id, "symbol": attempt["symbol"], "attempt_seq": seq})
+                break
+        return adopted
+
+    def _correct_fills(self, reader, broker_orders):
+        """Journal a fill_correction for every own order the broker executed differently"""
+        corrections = []
+        in_flight = set(self.trader.orders_in_flight)
+        for order_id, order in reader.orders.items():
+            broker = broker_orders.get(order_id)
+            if broker is None or order_id in in_flight:
+                continue   # unknown to the broker, or its fill is about to be booked by the trading thread
+            status = broker.get("status")
+            if status not in ("COMPLETE", "CANCELLED", "REJECTED"):
+                continue   # still working at the exchange
+
+            filled_qty = int(broker.get("filled_quantity") or 0)
+            avg_price = float(broker.get("average_price") or 0.0)
+
+            known = reader.corrections.get(order_id)
+            if known is not None:
+                journaled_qty, journaled_price = known["quantity"], known["price"]
+            else:
+                journaled_qty = sum(f["quantity"] for f in order["fills"])
+                journaled_price = order["fills"][-1]["price"] if order["fills"] else 0.0
+
+            if journaled_qty == filled_qty and (filled_qty == 0 or abs(journaled_price - avg_price) < PRICE_TOLERANCE):
+                continue
+
+            correction = {
+                "order_id": order_id,
+                "symbol": order["symbol"],
+                "side": order["side"],
+                "strategy": order["strategy"],
+                "quantity": filled_qty,
+                "price": avg_price,
+                "status": status,
+                "journaled_quantity": journaled_qty,
+                "journaled_price": journaled_price,
+            }
+            self.trader._journal("fill_correction", **correction)
+            corrections.append(correction)
+        return corrections
+
+    def _apply_ledger(self, attempts=3):
+        """
+        Replace in-memory books with the ledger replayed from the corrected journal,
+        keeping the same dict objects. The journal is replayed without holding
+        ledger_lock; fills and resets are journaled under it, so the swap only
+        happens if nothing was journaled since the replay started, else the
+        replay is repeated.
+        """
+        trader = self.trader
+        for _ in range(attempts):
+            with trader.ledger_lock:
+                seq = trader.journal.last_seq   # every fill up to here is queued for the flush
+            trader.journal.flush()
+            ledger = JournalReader(trader.journal.path).rebuild_ledger()
+            with trader.ledger_lock:
+                if trader.journal.last_seq == seq:
+                    return self._swap_ledger(ledger)
+        logger.info(f"[{trader.symbol}] Journal kept changing during reconciliation; ledger swap deferred")
+        return []
+
+    def _swap_ledger(self, ledger):
+        """Swap a replayed ledger into the books; the caller holds ledger_lock"""
+        trader = self.trader
+        books = (
+            ("BATMAN", trader.batman_positions, trader.batman_closed_pnls),
+            ("DEBIT_SPREAD", trader.debit_spread_positions, trader.debit_spread_closed_pnls),
+        )
+        changes = []
+        for strategy, positions, closed_pnls in books:
+            expected = ledger[strategy]["positions"]
+            book_changes = []
+            for sym in set(positions) | set(expected):
+                have = positions.get(sym, {'quantity': 0, 'avg_price': 0.0})
+                want = expected.get(sym, {'quantity': 0, 'avg_price': 0.0})
+                if have['quantity'] != want['quantity'] or abs(have['avg_price'] - want['avg_price']) >= PRICE_TOLERANCE:
+                    book_changes.append({"strategy": strategy, "symbol": sym, "from": have, "to": want})
+            if book_changes:
+                changes.extend(book_changes)
+                positions.clear()
+                positions.update(expected)
+                closed_pnls[:] = ledger[strategy]["closed_pnls"]
+        return changes
+
+    def _diff_positions(self, reader, broker_positions):
+        """
+        Flag broker positions the ledger cannot explain and ledger positions the broker
+        does not hold. Only symbols this instance journaled or holds are compared;
+        legs of other instances trading the same segment are not its business.
+        """
+        trader = self.trader
+        own = {}
+        with trader.ledger_lock:
+            for positions in (trader.batman_positions, trader.debit_spread_positions):
+                for sym, pos in positions.items():
+                    own[sym] = own.get(sym, 0) + pos['quantity']
+        symbols = set(reader.by_symbol) | set(own)
+
+        broker = {
+            p["tradingsymbol"]: int(p.get("quantity") or 0)
+            for p in broker_positions
+            if p.get("exchange") == trader.exchange_options and p["tradingsymbol"] in symbols
+        }
+
+        flags = []
+        for sym in set(own) | set(broker):
+            own_qty = own.get(sym, 0)
+            broker_qty = broker.get(sym, 0)
+            if own_qty == broker_qty:
+                continue
+            kind = "unexplained" if abs(broker_qty) > abs(own_qty) or own_qty * broker_qty < 0 else "missing"
+            flags.append({"symbol": sym, "type": kind, "ledger_qty": own_qty, "broker_qty": broker_qty})
+        return flags
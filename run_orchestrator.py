@@ -0,0 +1,279 @@
+import logging
+import signal
+import sys
+import os
+import csv
+import json
+import time
+import queue
+import threading
+from kite_login import kite_login
+from kite_gateway import KiteGateway, TickHub
+from algo_strategy import AlgoStrategy
+from utils.redis_config import RedisConfigReader
+from utils.logger import setup_logger, start_async_logging, stop_async_logging, ThrottleFilter
+from utils.redis_utils import RedisLogHandler, send_heartbeat, update_strategy_status, for_instance, instance_thread_name
+from utils.control_channel import ControlListener, register_instances
+from utils.clock import get_clock
+from utils.redis_client import get_redis
+from utils.status_publisher import start_status_publisher, stop_status_publisher
+
+INSTANCES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instances.json")
+EXPIRIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "expiries.csv")
+
+logger = logging.getLogger("root")
+
+
+def load_instances(path=INSTANCES_FILE):
+    """
+    Read per-instance configuration. Each entry needs a unique 'name' and a 'symbol';
+    an optional 'config' dict overrides the shared strategy:input:* values (e.g. expiry).
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    instances = data.get("instances", data) if isinstance(data, dict) else data
+    names = [i["name"] for i in instances]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate instance names in {path}: {names}")
+    return instances
+
+
+def nearest_expiry(symbol, today, path=EXPIRIES_CSV):
+    """Expiry input (the contract's symbol code, e.g. '26113') of the first expiry of 'symbol' on or after today"""
+    try:
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.DictReader(f)
+                    if row.get("symbol", "").strip().upper() == symbol and row.get("zerodha_token", "").strip()]
+    except FileNotFoundError:
+        return None
+    upcoming = sorted((row["expiry"].strip(), row["zerodha_token"].strip()) for row in rows
+                      if row["expiry"].strip() >= today.isoformat())
+    return upcoming[0][1] if upcoming else None
+
+
+class StrategyInstance:
+    """
+    One symbol/expiry strategy hosted by the orchestrator. Control commands
+    run in order on the instance's own command thread, so a slow one (a stop
+    that exits positions) never holds up commands for other instances.
+    """
+    def __init__(self, spec, redis_client, tick_hub):
+        self.name = spec["name"]
+        self.symbol = spec["symbol"].upper()
+        self.overrides = spec.get("config", {})
+        self.redis_client = for_instance(redis_client, self.name)
+        self.tick_hub = tick_hub
+        self.strat = None
+        self.thread = None
+        self.commands = queue.Queue()
+        self.command_thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def submit(self, func, *args):
+        """Queue func(*args) behind this instance's earlier commands"""
+        self.commands.put((func, args))
+        if self.command_thread is None:
+            self.command_thread = threading.Thread(target=self._run_commands,
+                                                   name=instance_thread_name(self.name, "control"), daemon=True)
+            self.command_thread.start()
+
+    def _run_commands(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                return
+            func, args = item
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"[{self.name}] Control command failed: {e}")
+
+    def close(self):
+        """Stop the command thread once the commands already queued have run"""
+        if self.command_thread is not None:
+            self.commands.put(None)
+
+    def start(self, kite, redis_config):
+        config = redis_config.get_all_config()
+        overrides = self.overrides
+        own_expiry = 'expiry' in overrides or 'expiry' in redis_config.get_instance_config(self.name)
+        if config.get('index') != self.symbol and not own_expiry:
+            # The shared expiry belongs to another index; trade this one's nearest expiry
+            expiry = nearest_expiry(self.symbol, get_clock().now().date())
+            if expiry is None:
+                logger.warning(f"[{self.name}] Not starting: Redis expiry is set for {config.get('index')}, "
+                               f"no expiry is configured for this instance and none is listed in {EXPIRIES_CSV}")
+                return
+            logger.info(f"[{self.name}] No expiry configured for this instance; using the nearest one, {expiry}")
+            overrides = {**overrides, "expiry": expiry}
+        logger.info(f"[{self.name}] Received START")
+        update_strategy_status(self.redis_client, "starting", f"[{self.name}] Strategy execution starting…")
+        self.strat = AlgoStrategy(redis_client=self.redis_client, tick_hub=self.tick_hub, instance=self.name)
+        self.thread = threading.Thread(
+            target=self.strat.start_algo_class,
+            args=(kite, self.symbol, redis_config, overrides),
+            name=instance_thread_name(self.name, "strategy"),
+            daemon=True
+        )
+        self.thread.start()
+
+    def stop(self, exit_positions=True):
+        if self.strat is None:
+            return
+        logger.info(f"[{self.name}] Received STOP")
+        update_strategy_status(self.redis_client, "stopping", f"[{self.name}] Stopping strategy…")
+        if exit_positions:
+            update_strategy_status(self.redis_client, "stopping", f"[{self.name}] Exiting All Positions")
+            with self.strat.signal_lock:   # not while a bar or intrabar entry is being placed
+                self.strat._check_exit_all_signal()
+        self.strat.stop(reason="REQUESTED")
+        if self.thread is not None:
+            self.thread.join()
+        update_strategy_status(self.redis_client, "stopped", f"[{self.name}] Strategy stopped")
+
+
+class Orchestrator:
+    """
+    Hosts N strategy instances in one process. All instances share one Kite
+    session behind a rate-limited gateway, one tick connection and one Redis
+    connection pool.
+    """
+    def __init__(self, specs, redis_client, redis_config=None):
+        self.redis_client = redis_client
+        self.redis_config = redis_config or RedisConfigReader(redis_client=redis_client, watch=True)
+        self.kite = None
+        self.tick_hub = None
+        self.specs = specs
+        self.instances = {}
+        self.clock = get_clock()
+        self.stop_event = threading.Event()
+        self.control_thread = None
+
+    def login(self):
+        update_strategy_status(self.redis_client, "waiting", "waiting for Kite login")
+        kite = kite_login()
+        logger.info("Kite login successful")
+        self.kite = KiteGateway(kite)
+        self.tick_hub = TickHub(kite)
+        self.instances = {
+            spec["name"]: StrategyInstance(spec, self.redis_client, self.tick_hub)
+            for spec in self.specs
+        }
+        register_instances(self.redis_client, {name: inst.symbol for name, inst in self.instances.items()})
+        names = ", ".join(self.instances)
+        update_strategy_status(self.redis_client, "waiting", f"Instances [{names}] initialized, waiting for start signal from backend")
+
+    def handle_control(self, name, event):
+        """
+        Dispatch one command from an instance's control stream. Runs on the
+        listener thread, so it only queues the command on the instance.
+        """
+        inst = self.instances.get(name)
+        if inst is None:
+            logger.warning(f"Control command for unknown instance {name}: {event}")
+            return
+        action = event.get("action")
+        logger.info(f"[{name}] Control command: {action}")
+        if action == "config_changed":
+            logger.info(f"[{name}] Strategy inputs changed: {event.get('keys')}")
+            self.redis_config.invalidate()
+        else:
+            inst.submit(self._apply_control, inst, event)
+
+    def _apply_control(self, inst, event):
+        """Apply one command on the instance's command thread"""
+        action = event.get("action")
+        if action == "start" and not inst.running:
+            inst.start(self.kite, self.redis_config)
+        elif action == "stop" and inst.strat is not None:
+            inst.stop()
+        elif action == "exit_all" and inst.running:
+            with inst.strat.signal_lock:
+                inst.strat._check_exit_all_signal()
+        elif action == "tv_signal" and inst.running:
+            inst.strat.on_tv_signal(event.get("signal", {}))
+
+    def start_control_listener(self):
+        listener = ControlListener(self.redis_client, list(self.instances), self.handle_control)
+        self.control_thread = threading.Thread(target=listener.run, args=(self.stop_event,),
+                                               name="control-listener", daemon=True)
+        self.control_thread.start()
+
+    def run_forever(self):
+        self.start_control_listener()
+        while True:
+            try:
+                send_heartbeat(self.redis_client, instances=list(self.instances))
+                for name, inst in self.instances.items():
+                    send_heartbeat(inst.redis_client, status="alive" if inst.running else "idle", symbol=inst.symbol)
+                self.clock.sleep(1)
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                logger.error(f"Error in control loop: {e}")
+                self.clock.sleep(5)
+
+    def shutdown(self):
+        self.stop_event.set()
+        for inst in self.instances.values():
+            inst.close()
+            if inst.strat is not None:
+                inst.strat.stop("REQUESTED")
+        if self.tick_hub is not None:
+            self.tick_hub.close()
+
+
+def main(specs=None, log_name="orchestrator"):
+    r = get_redis()
+    specs = specs or load_instances()
+    update_strategy_status(r, "starting", f"Starting strategy instances {[s['name'] for s in specs]}... Please wait.")
+
+    setup_logger("root", log_file=f"{log_name}_strategy.log", rotate=True)
+    redis_handler = RedisLogHandler(r)
+    redis_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    redis_handler.setFormatter(formatter)
+    logger.addHandler(redis_handler)
+    # Trading threads only enqueue records; console, file and Redis writes are batched
+    start_async_logging("root", throttle=ThrottleFilter(rate=5.0, burst=20, sample=10))
+
+    # Shared by all instances; reloaded when the backend publishes a config change
+    redis_config = RedisConfigReader(redis_client=r, watch=True)
+    while not redis_config.is_config_available():
+        update_strategy_status(r, "waiting", "Waiting for configuration to be set in Redis...")
+        logger.info("No configuration available in Redis. Waiting for strategy parameters to be set.")
+        time.sleep(5)
+
+    # Status updates from the trading threads are flushed by a background publisher
+    start_status_publisher(r)
+    orchestrator = Orchestrator(specs, r, redis_config=redis_config)
+
+    def _shutdown(sig=None, frame=None):
+        logger.info("Shutdown signal received")
+        update_strategy_status(r, "stopping", "Strategy is shutting down...")
+        orchestrator.shutdown()
+        update_strategy_status(r, "stopped", "Strategy has stopped")
+        stop_status_publisher(r)
+        stop_async_logging("root")
+        sys.exit(0)
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    try:
+        orchestrator.login()
+        orchestrator.run_forever()
+    except KeyboardInterrupt:
+        logger.info("KeyboardInterrupt received. Shutting down gracefully...")
+        _shutdown()
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        update_strategy_status(r, "error", f"Fatal error: {str(e)}")
+        stop_async_logging("root")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
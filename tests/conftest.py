@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The strategy modules live at the repository root, as the run_*.py scripts expect
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
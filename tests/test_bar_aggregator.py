@@ -0,0 +1,156 @@
+import threading
+from datetime import datetime, timedelta
+from bar_aggregator import BarAggregator, Resampler, replay_ticks
+
+DAY = datetime(2026, 10, 19)
+INDEX, CALL = 256265, 12345
+
+
+def at(hh, mm, ss=0):
+    return DAY.replace(hour=hh, minute=mm, second=ss)
+
+
+def tick(token, ts, price, volume=None):
+    return {"instrument_token": token, "exchange_timestamp": ts, "last_price": price, "volume_traded": volume}
+
+
+def minute_bar(ts, close, volume=0, open_=None):
+    open_ = close if open_ is None else open_
+    return {"date": ts, "open": open_, "high": max(open_, close), "low": min(open_, close),
+            "close": close, "volume": volume}
+
+
+def collect(aggregator):
+    closed = []
+    aggregator.on_minute(lambda minute, bars: closed.append((minute, bars)))
+    return closed
+
+
+def test_minute_closes_when_the_watermark_passes_its_end_plus_grace():
+    aggregator = BarAggregator(late_grace=1.0)
+    closed = collect(aggregator)
+    aggregator.on_ticks([tick(INDEX, at(9, 15, 5), 100.0), tick(INDEX, at(9, 15, 40), 103.0),
+                         tick(INDEX, at(9, 15, 50), 99.0), tick(INDEX, at(9, 15, 59), 101.0)])
+    aggregator.on_ticks([tick(INDEX, at(9, 16, 0, ), 102.0)])
+    assert closed == []   # still within the grace period
+
+    aggregator.on_ticks([tick(INDEX, at(9, 16, 1), 102.5)])
+    assert [minute for minute, _ in closed] == [at(9, 15)]
+    bar = closed[0][1][INDEX]
+    assert (bar["open"], bar["high"], bar["low"], bar["close"]) == (100.0, 103.0, 99.0, 101.0)
+
+
+def test_bars_are_bucketed_by_exchange_time_not_arrival_order():
+    aggregator = BarAggregator()
+    aggregator.on_ticks([tick(INDEX, at(9, 15, 30), 101.0), tick(INDEX, at(9, 15, 10), 100.0)])
+    aggregator.advance(at(9, 17))
+    bar = aggregator.history(INDEX)[0]
+    assert bar["open"] == 100.0   # earliest exchange timestamp, though it arrived last
+    assert bar["close"] == 101.0  # latest exchange timestamp
+
+
+def test_arrival_order_within_a_minute_does_not_change_the_bar():
+    ticks = [tick(INDEX, at(9, 15, 5), 100.0), tick(INDEX, at(9, 15, 20), 104.0),
+             tick(INDEX, at(9, 15, 40), 98.0), tick(INDEX, at(9, 15, 55), 101.0)]
+    bars = []
+    for order in (ticks, ticks[::-1], ticks[2:] + ticks[:2]):
+        aggregator = BarAggregator()
+        aggregator.on_ticks(order)
+        aggregator.advance(at(9, 17))
+        bars.append(aggregator.history(INDEX))
+    assert bars[0] == bars[1] == bars[2]
+    assert bars[0][0] == {"date": at(9, 15), "open": 100.0, "high": 104.0, "low": 98.0, "close": 101.0,
+                          "volume": 0, "partial": True}
+
+
+def test_quiet_minutes_get_flat_bars_and_late_ticks_are_dropped():
+    aggregator = BarAggregator()
+    closed = collect(aggregator)
+    aggregator.on_ticks([tick(INDEX, at(9, 15, 30), 100.0)])
+    aggregator.advance(at(9, 18, 5))
+
+    assert [minute for minute, _ in closed] == [at(9, 15), at(9, 16), at(9, 17)]
+    assert closed[2][1][INDEX] == minute_bar(at(9, 17), 100.0)
+
+    aggregator.on_ticks([tick(INDEX, at(9, 16, 30), 105.0)])
+    assert aggregator.late_ticks == 1
+    assert len(closed) == 3
+
+
+def test_volume_is_the_change_in_cumulative_volume_and_first_bars_are_partial():
+    aggregator = BarAggregator()
+    aggregator.on_ticks([tick(CALL, at(9, 15, 40), 50.0, volume=1000), tick(CALL, at(9, 15, 50), 51.0, volume=1300)])
+    aggregator.on_ticks([tick(CALL, at(9, 16, 20), 52.0, volume=1500)])
+    aggregator.advance(at(9, 17, 5))
+
+    first, second = aggregator.history(CALL)
+    assert first["volume"] == 300 and first["partial"] is True
+    assert second["volume"] == 200 and "partial" not in second
+
+
+def test_minutes_outside_the_session_are_ignored():
+    aggregator = BarAggregator()
+    aggregator.on_ticks([tick(INDEX, at(9, 14, 59), 99.0), tick(INDEX, at(15, 30, 0), 99.0)])
+    assert aggregator.pending == {}
+
+
+def test_resampler_aligns_buckets_to_the_session_open():
+    resampler = Resampler(5)
+    done = []
+    for i, close in enumerate([10, 12, 8, 11, 13, 14]):
+        done += resampler.add(minute_bar(at(9, 15) + timedelta(minutes=i), close, volume=1, open_=close - 1))
+
+    assert done == [{"date": at(9, 15), "open": 9, "high": 13, "low": 7, "close": 13, "volume": 5}]
+    assert resampler.current["date"] == at(9, 20)
+
+
+def test_resampler_emits_an_incomplete_bucket_when_a_later_one_starts():
+    resampler = Resampler(3)
+    assert resampler.add(minute_bar(at(9, 15), 10)) == []
+    done = resampler.add(minute_bar(at(9, 19), 12))
+    assert [bar["date"] for bar in done] == [at(9, 15)]
+    assert resampler.current["date"] == at(9, 18)
+
+
+def test_aggregator_keeps_resampled_history():
+    ticks = [tick(INDEX, at(9, 15) + timedelta(minutes=i, seconds=30), 100.0 + i) for i in range(15)]
+    aggregator = replay_ticks(ticks)
+    assert [bar["date"] for bar in aggregator.history(INDEX, 5)] == [at(9, 15), at(9, 20), at(9, 25)]
+    assert [bar["close"] for bar in aggregator.history(INDEX, 15)] == [114.0]
+
+
+def test_replay_yields_the_same_bars_as_live_feeding():
+    ticks = [tick(INDEX, at(9, 15) + timedelta(seconds=7 * i), 100.0 + (i % 5)) for i in range(100)]
+    live = BarAggregator()
+    for i in range(0, len(ticks), 10):
+        live.on_ticks(ticks[i:i + 10])
+    live.advance(ticks[-1]["exchange_timestamp"] + timedelta(minutes=1, seconds=2))
+
+    assert replay_ticks(ticks).history(INDEX) == live.history(INDEX)
+
+
+def test_minutes_reach_subscribers_in_order_across_threads():
+    aggregator = BarAggregator()
+    entered, release = threading.Event(), threading.Event()
+    minutes = []
+
+    def slow_subscriber(minute, bars):
+        if minute == at(9, 15):
+            entered.set()
+            release.wait(2)
+        minutes.append(minute)
+    aggregator.on_minute(slow_subscriber)
+    aggregator.on_ticks([tick(INDEX, at(9, 15, 1), 100.0)])
+
+    first = threading.Thread(target=aggregator.advance, args=(at(9, 16, 5),))
+    first.start()
+    assert entered.wait(2)
+    # The tick thread closes the next minute while 9:15 is still being delivered
+    second = threading.Thread(target=aggregator.on_ticks, args=([tick(INDEX, at(9, 17, 5), 100.0)],))
+    second.start()
+    second.join(0.2)
+    release.set()
+    first.join(2)
+    second.join(2)
+
+    assert minutes == [at(9, 15), at(9, 16)]
@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from utils.clock import SimulatedClock, RealClock, get_clock, set_clock
+
+START = datetime(2026, 10, 19, 9, 15)
+
+
+def run_threads(clock, *targets):
+    threads = [clock.register(threading.Thread(target=target, daemon=True)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+
+
+def test_sleep_jumps_straight_to_the_deadline():
+    clock = SimulatedClock(START)
+    started = time.monotonic()
+    clock.sleep(3600)
+    assert clock.now() == START + timedelta(hours=1)
+    assert clock.time() == clock.monotonic() == (START + timedelta(hours=1)).timestamp()
+    assert time.monotonic() - started < 1
+
+
+def test_sleep_until_and_negative_sleeps():
+    clock = SimulatedClock(START)
+    clock.sleep_until(START + timedelta(minutes=5))
+    assert clock.now() == START + timedelta(minutes=5)
+    clock.sleep(-10)
+    assert clock.now() == START + timedelta(minutes=5)
+
+
+def test_time_only_moves_once_every_participant_is_blocked():
+    clock = SimulatedClock(START)
+    woke = []
+
+    def sleeper(seconds):
+        def run():
+            clock.sleep(seconds)
+            woke.append((seconds, clock.now()))
+        return run
+
+    run_threads(clock, sleeper(90), sleeper(30), sleeper(60))
+
+    assert woke == [(30, START + timedelta(seconds=30)),
+                    (60, START + timedelta(seconds=60)),
+                    (90, START + timedelta(seconds=90))]
+
+
+def test_minute_loop_replays_a_session_in_virtual_time():
+    clock = SimulatedClock(START)
+    minutes = []
+
+    def loop():
+        for _ in range(375):
+            clock.sleep(60)
+            minutes.append(clock.now())
+
+    started = time.monotonic()
+    run_threads(clock, loop)
+    assert minutes[-1] == datetime(2026, 10, 19, 15, 30)
+    assert time.monotonic() - started < 5
+
+
+def test_wait_returns_false_at_the_timeout_and_true_when_set():
+    clock = SimulatedClock(START)
+    event = threading.Event()
+    assert clock.wait(event, 30) is False
+    assert clock.now() == START + timedelta(seconds=30)
+
+    event.set()
+    assert clock.wait(event, 30) is True
+    assert clock.now() == START + timedelta(seconds=30)
+
+
+def test_wait_wakes_on_an_event_set_by_another_participant():
+    clock = SimulatedClock(START)
+    event = threading.Event()
+    result = {}
+
+    def waiter():
+        result["set"] = clock.wait(event, 300)
+        result["at"] = clock.now()
+
+    def setter():
+        clock.sleep(10)
+        event.set()
+
+    run_threads(clock, waiter, setter)
+    assert result == {"set": True, "at": START + timedelta(seconds=10)}
+
+
+def test_manual_clock_only_moves_through_advance():
+    clock = SimulatedClock(START, auto_advance=False)
+    done = threading.Event()
+
+    def sleeper():
+        clock.sleep(60)
+        done.set()
+
+    thread = threading.Thread(target=sleeper, daemon=True)
+    thread.start()
+    assert not done.wait(0.1)
+    clock.advance(59)
+    assert not done.wait(0.1)
+    clock.advance(1)
+    assert done.wait(2)
+    thread.join(timeout=2)
+
+
+def test_set_never_moves_time_backwards():
+    clock = SimulatedClock(START, auto_advance=False)
+    clock.set(START + timedelta(minutes=1))
+    clock.set(START)
+    assert clock.now() == START + timedelta(minutes=1)
+
+
+def test_set_clock_installs_the_process_clock():
+    previous = get_clock()
+    try:
+        clock = set_clock(SimulatedClock(START))
+        assert get_clock() is clock
+    finally:
+        set_clock(previous)
+    assert isinstance(RealClock().now(), datetime)
+
+
+@pytest.mark.parametrize("seconds", [0, 0.01])
+def test_real_clock_sleeps_for_real(seconds):
+    clock = RealClock()
+    started = clock.monotonic()
+    clock.sleep(seconds)
+    assert clock.monotonic() - started >= seconds
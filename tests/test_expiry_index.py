@@ -0,0 +1,57 @@
+import json
+import pytest
+from backend import app as backend
+
+CSV = """symbol,expiry,zerodha_token
+nifty,2026-10-28,1001
+NIFTY,2026-10-21,1000
+NIFTY,2026-11-25,1000
+BANKNIFTY,2026-10-28,2000
+SENSEX,2026-10-23,
+SENSEX,2026-10-23,3000
+"""
+
+
+@pytest.fixture
+def expiries(tmp_path, monkeypatch):
+    path = tmp_path / "expiries.csv"
+    path.write_text(CSV, encoding="utf-8")
+    monkeypatch.setattr(backend, "EXPIRIES_CSV", path)
+    st = path.stat()
+    return (st.st_mtime_ns, st.st_size)
+
+
+def body(index, symbol):
+    return json.loads(index["bodies"][symbol])
+
+
+def test_rows_are_grouped_sorted_and_deduplicated_by_token(expiries):
+    index = backend._build_expiry_index(expiries)
+    nifty = body(index, "NIFTY")
+
+    assert [(item["expiry_iso"], item["zerodha_token"]) for item in nifty["items"]] == [
+        ("2026-10-21", "1000"), ("2026-10-28", "1001")]
+    assert nifty["count"] == 2 and nifty["symbol"] == "NIFTY"
+    assert body(index, "SENSEX")["items"] == [{"symbol": "SENSEX", "expiry_iso": "2026-10-23", "zerodha_token": "3000"}]
+
+
+def test_all_symbols_body_is_sorted_by_date_then_symbol(expiries):
+    all_symbols = body(backend._build_expiry_index(expiries), "")
+    assert all_symbols["symbol"] is None
+    assert [(item["expiry_iso"], item["symbol"].upper()) for item in all_symbols["items"]] == [
+        ("2026-10-21", "NIFTY"), ("2026-10-23", "SENSEX"), ("2026-10-28", "BANKNIFTY"), ("2026-10-28", "NIFTY")]
+
+
+def test_version_and_last_modified_follow_the_file_stamp(expiries):
+    index = backend._build_expiry_index(expiries)
+    version = f"{expiries[0]:x}-{expiries[1]:x}"
+    assert index["version"] == version
+    assert all(json.loads(raw)["version"] == version for raw in index["bodies"].values())
+    assert int(index["last_modified"].timestamp()) == expiries[0] // 10**9
+
+
+def test_missing_file_gives_an_empty_index():
+    index = backend._build_expiry_index(None)
+    assert index["version"] == "none" and index["last_modified"] is None
+    assert body(index, "") == {"items": [], "count": 0, "symbol": None, "version": "none"}
+    assert list(index["bodies"]) == [""]
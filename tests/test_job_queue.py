@@ -0,0 +1,109 @@
+import threading
+import time
+import pytest
+from utils.job_queue import JobQueue, QueueFull
+
+
+@pytest.fixture
+def make_queue():
+    queues = []
+
+    def make(**kwargs):
+        queues.append(JobQueue(**kwargs))
+        return queues[-1]
+    yield make
+    for queue in queues:
+        queue.close()
+
+
+def wait_for(queue, job_id, status, timeout=2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.005)
+    raise AssertionError(f"job {job_id} is {queue.get(job_id)['status']}, expected {status}")
+
+
+def test_job_result_and_failure_are_recorded(make_queue):
+    queue = make_queue(workers=1)
+    ok = queue.submit("NIFTY", lambda a, b=0: a + b, 2, b=3)
+    bad = queue.submit("NIFTY", lambda: 1 / 0)
+
+    assert wait_for(queue, ok, "done")["result"] == 5
+    failed = wait_for(queue, bad, "failed")
+    assert "division by zero" in failed["error"]
+    assert "call" not in failed
+    assert queue.metrics()["completed"] == 1 and queue.metrics()["failed"] == 1
+
+
+def test_submit_beyond_max_pending_raises_queue_full(make_queue):
+    release = threading.Event()
+    queue = make_queue(workers=1, max_pending=2)
+    running = queue.submit("A", release.wait)
+    wait_for(queue, running, "running")
+    queue.submit("A", lambda: None)
+    queue.submit("A", lambda: None)
+
+    with pytest.raises(QueueFull):
+        queue.submit("B", lambda: None)
+    metrics = queue.metrics()
+    assert metrics["rejected"] == 1 and metrics["queued"] == 2
+    release.set()
+
+
+def test_busy_key_does_not_block_other_keys(make_queue):
+    release = threading.Event()
+    queue = make_queue(workers=2, per_key=1)
+    first = queue.submit("NIFTY", release.wait, 2)
+    second = queue.submit("NIFTY", lambda: "second")
+    other = queue.submit("BANKNIFTY", lambda: "other")
+
+    assert wait_for(queue, other, "done")["result"] == "other"
+    assert queue.get(first)["status"] == "running"
+    assert queue.get(second)["status"] == "queued"
+    assert queue.metrics()["running_by_key"] == {"NIFTY": 1}
+
+    release.set()
+    assert wait_for(queue, second, "done")["result"] == "second"
+
+
+def test_queued_jobs_report_their_position(make_queue):
+    release = threading.Event()
+    queue = make_queue(workers=1)
+    wait_for(queue, queue.submit("A", release.wait, 2), "running")
+    later = [queue.submit("A", lambda: None) for _ in range(3)]
+
+    assert [queue.get(job_id)["position"] for job_id in later] == [0, 1, 2]
+    assert queue.get("unknown") is None
+    assert queue.metrics()["oldest_queued_secs"] >= 0
+    release.set()
+
+
+def test_only_the_most_recent_finished_jobs_are_kept(make_queue):
+    queue = make_queue(workers=1, keep=2)
+    ids = [queue.submit("A", lambda: None) for _ in range(4)]
+    wait_for(queue, ids[-1], "done")
+
+    assert [queue.get(job_id) is None for job_id in ids] == [True, True, False, False]
+
+
+def test_close_stops_workers_and_drops_queued_jobs(make_queue):
+    started, release = threading.Event(), threading.Event()
+    queue = make_queue(workers=1)
+
+    def job():
+        started.set()
+        release.wait(2)
+    queue.submit("A", job)
+    queued = queue.submit("A", lambda: None)
+    assert started.wait(2)
+
+    closer = threading.Thread(target=queue.close)
+    closer.start()
+    time.sleep(0.05)   # closed while the job still runs
+    release.set()
+    closer.join(2)
+    assert all(not thread.is_alive() for thread in queue._threads)
+    assert queue.get(queued)["status"] == "queued"
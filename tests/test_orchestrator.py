@@ -0,0 +1,106 @@
+import threading
+import time
+from datetime import date
+import pytest
+from run_orchestrator import Orchestrator, StrategyInstance, nearest_expiry
+
+
+class FakeStrategy:
+    def __init__(self, release=None):
+        self.signal_lock = threading.RLock()
+        self.release = release
+        self.calls = []
+
+    def _check_exit_all_signal(self):
+        self.calls.append("exit_all")
+        if self.release is not None:
+            self.release.wait(2)
+
+    def on_tv_signal(self, signal):
+        self.calls.append(signal["action"])
+
+
+class FakeConfig:
+    def __init__(self):
+        self.invalidated = 0
+
+    def invalidate(self):
+        self.invalidated += 1
+
+
+@pytest.fixture
+def orchestrator():
+    alive = threading.Event()
+    running = threading.Thread(target=alive.wait, daemon=True)
+    running.start()
+    orchestrator = Orchestrator([], redis_client=None, redis_config=FakeConfig())
+    for name in ("NIFTY", "SENSEX"):
+        inst = StrategyInstance({"name": name, "symbol": name}, None, None)
+        inst.strat, inst.thread = FakeStrategy(), running
+        orchestrator.instances[name] = inst
+    yield orchestrator
+    alive.set()
+    for inst in orchestrator.instances.values():
+        inst.close()
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_slow_command_does_not_hold_up_other_instances(orchestrator):
+    release = threading.Event()
+    nifty, sensex = orchestrator.instances["NIFTY"], orchestrator.instances["SENSEX"]
+    nifty.strat.release = release
+
+    started = time.monotonic()
+    orchestrator.handle_control("NIFTY", {"action": "exit_all"})
+    orchestrator.handle_control("NIFTY", {"action": "tv_signal", "signal": {"action": "BUY"}})
+    orchestrator.handle_control("SENSEX", {"action": "tv_signal", "signal": {"action": "SELL"}})
+    assert time.monotonic() - started < 0.5
+
+    wait_until(lambda: sensex.strat.calls == ["SELL"])
+    assert nifty.strat.calls == ["exit_all"]   # its signal waits behind its own exit
+
+    release.set()
+    wait_until(lambda: nifty.strat.calls == ["exit_all", "BUY"])
+
+
+def test_config_change_is_applied_on_the_listener_thread(orchestrator):
+    orchestrator.handle_control("NIFTY", {"action": "config_changed", "keys": ["expiry"]})
+    assert orchestrator.redis_config.invalidated == 1
+    assert orchestrator.instances["NIFTY"].command_thread is None
+
+
+def test_failing_command_does_not_stop_the_command_thread(orchestrator):
+    nifty = orchestrator.instances["NIFTY"]
+    nifty.submit(lambda: 1 / 0)
+    orchestrator.handle_control("NIFTY", {"action": "tv_signal", "signal": {"action": "BUY"}})
+    wait_until(lambda: nifty.strat.calls == ["BUY"])
+
+
+def test_stop_exits_positions_under_the_signal_lock(orchestrator, monkeypatch):
+    monkeypatch.setattr("run_orchestrator.update_strategy_status", lambda *args: None)
+    nifty = orchestrator.instances["NIFTY"]
+    strat = nifty.strat
+    held = []
+    strat._check_exit_all_signal = lambda: held.append(strat.signal_lock._is_owned())
+    strat.stop = lambda reason: None
+    nifty.thread = None
+
+    nifty.stop()
+    assert held == [True]
+
+
+def test_nearest_expiry_is_the_first_listed_on_or_after_today(tmp_path):
+    path = tmp_path / "expiries.csv"
+    path.write_text("symbol,expiry,zerodha_token\n"
+                    "SENSEX,2026-10-22,26O22\nSENSEX,2026-10-15,26O15\nSENSEX,2026-10-19,\n"
+                    "NIFTY,2026-10-20,26O20\nSENSEX,2026-10-29,26OCT\n", encoding="utf-8")
+    assert nearest_expiry("SENSEX", date(2026, 10, 19), path) == "26O22"
+    assert nearest_expiry("SENSEX", date(2026, 10, 22), path) == "26O22"
+    assert nearest_expiry("SENSEX", date(2026, 10, 30), path) is None
+    assert nearest_expiry("NIFTY", date(2026, 10, 19), tmp_path / "missing.csv") is None
@@ -0,0 +1,178 @@
+import json
+import threading
+import pytest
+from utils.order_journal import OrderJournal, JournalReader, apply_fill
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = OrderJournal(str(tmp_path / "NIFTY_20261019.jsonl"), flush_interval=60)
+    yield journal
+    journal.close()
+
+
+def replay(journal):
+    journal.flush()
+    return JournalReader(journal.path)
+
+
+def test_apply_fill_opens_adds_and_averages():
+    positions, pnls = {}, []
+    assert apply_fill(positions, pnls, "X", "SELL", 50, 100.0) == (-50, 100.0)
+    assert apply_fill(positions, pnls, "X", "SELL", 50, 110.0) == (-100, 105.0)
+    assert positions == {"X": {"quantity": -100, "avg_price": 105.0}}
+    assert pnls == []
+
+
+def test_apply_fill_realizes_pnl_and_drops_flat_positions():
+    positions, pnls = {}, []
+    apply_fill(positions, pnls, "X", "SELL", 50, 100.0)
+    apply_fill(positions, pnls, "X", "BUY", 20, 90.0)
+    assert positions["X"] == {"quantity": -30, "avg_price": 100.0}
+    apply_fill(positions, pnls, "X", "BUY", 30, 95.0)
+    assert "X" not in positions
+    assert pnls == [200.0, 150.0]
+
+
+def test_apply_fill_flips_side_at_the_fill_price():
+    positions, pnls = {}, []
+    apply_fill(positions, pnls, "X", "BUY", 50, 10.0)
+    assert apply_fill(positions, pnls, "X", "SELL", 75, 12.0) == (-25, 12.0)
+    assert pnls == [100.0]
+
+
+def test_journal_continues_its_sequence_after_a_restart(tmp_path):
+    path = str(tmp_path / "NIFTY_20261019.jsonl")
+    first = OrderJournal(path, flush_interval=60)
+    first.append("intent", intent_id="i1", symbol="X")
+    assert first.append("order", intent_id="i1", order_id="A", symbol="X") == 2
+    assert first.last_seq == 2
+    first.close()
+
+    second = OrderJournal(path, flush_interval=60)
+    try:
+        assert second.last_seq == 2
+        assert second.append("status", order_id="A", status="CANCELLED") == 3
+    finally:
+        second.close()
+
+
+def test_records_from_many_threads_are_written_in_seq_order(journal):
+    def writer(n):
+        for i in range(200):
+            journal.append("status", order_id=f"{n}-{i}", status="OPEN")
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.flush()
+
+    with open(journal.path, encoding="utf-8") as f:
+        seqs = [json.loads(line)["seq"] for line in f]
+    assert seqs == list(range(1, 801))
+
+
+def test_reader_indexes_orders_by_intent_and_symbol(journal):
+    journal.append("intent", intent_id="i1", symbol="X", side="SELL", quantity=100, strategy="BATMAN")
+    journal.append("order", intent_id="i1", order_id="A", symbol="X", side="SELL", quantity=50, strategy="BATMAN")
+    journal.append("order", intent_id="i1", order_id="B", symbol="X", side="SELL", quantity=50, strategy="BATMAN")
+    journal.append("fill", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0, strategy="BATMAN")
+    reader = replay(journal)
+
+    assert reader.intents["i1"]["order_ids"] == ["A", "B"]
+    assert reader.orders["A"]["status"] == "COMPLETE"
+    assert reader.orders["B"]["status"] == "OPEN"
+    assert reader.own_order_ids("BATMAN") == {"A", "B"}
+    assert reader.own_order_ids("DEBIT_SPREAD") == set()
+    assert len(reader.by_symbol["X"]) == 4
+
+
+def test_reader_skips_a_torn_last_line(journal):
+    journal.append("fill", order_id="A", symbol="X", side="BUY", quantity=25, price=10.0, strategy="BATMAN")
+    journal.flush()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "ev": "fi')
+    ledger = JournalReader(journal.path).rebuild_ledger()
+    assert ledger["BATMAN"]["positions"] == {"X": {"quantity": 25, "avg_price": 10.0}}
+
+
+def test_rebuild_ledger_replays_fills_per_strategy(journal):
+    journal.append("fill", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0, strategy="BATMAN")
+    journal.append("fill", order_id="B", symbol="Y", side="BUY", quantity=25, price=20.0, strategy="DEBIT_SPREAD")
+    journal.append("fill", order_id="C", symbol="X", side="BUY", quantity=50, price=90.0, strategy="BATMAN")
+    ledger = replay(journal).rebuild_ledger()
+
+    assert ledger["BATMAN"] == {"positions": {}, "closed_pnls": [500.0]}
+    assert ledger["DEBIT_SPREAD"]["positions"] == {"Y": {"quantity": 25, "avg_price": 20.0}}
+    assert ledger["day_pnl"] == 0.0
+
+
+def test_fill_correction_replaces_the_journaled_fill_in_place(journal):
+    # Market-converted order booked at the limit price, then corrected to the broker's average
+    journal.append("fill", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0,
+                   strategy="BATMAN", estimated=True)
+    journal.append("fill", order_id="B", symbol="X", side="BUY", quantity=50, price=90.0, strategy="BATMAN")
+    journal.append("fill_correction", order_id="A", symbol="X", side="SELL", quantity=50, price=98.0,
+                   strategy="BATMAN", status="COMPLETE")
+    ledger = replay(journal).rebuild_ledger()
+
+    # Applied where the original fill was: the short is covered after it opened
+    assert ledger["BATMAN"]["positions"] == {}
+    assert ledger["BATMAN"]["closed_pnls"] == [400.0]
+
+
+def test_latest_fill_correction_wins(journal):
+    journal.append("fill", order_id="A", symbol="X", side="BUY", quantity=50, price=10.0, strategy="BATMAN")
+    journal.append("fill_correction", order_id="A", symbol="X", side="BUY", quantity=25, price=11.0,
+                   strategy="BATMAN", status="COMPLETE")
+    journal.append("fill_correction", order_id="A", symbol="X", side="BUY", quantity=50, price=12.0,
+                   strategy="BATMAN", status="COMPLETE")
+    reader = replay(journal)
+
+    assert reader.corrections["A"]["price"] == 12.0
+    assert reader.rebuild_ledger()["BATMAN"]["positions"] == {"X": {"quantity": 50, "avg_price": 12.0}}
+
+
+def test_correction_of_an_unfilled_order_applies_where_it_was_made(journal):
+    journal.append("order", order_id="A", symbol="X", side="SELL", quantity=50, strategy="BATMAN")
+    journal.append("fill_correction", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0,
+                   strategy="BATMAN", status="COMPLETE")
+    reader = replay(journal)
+
+    assert reader.orders["A"]["status"] == "COMPLETE"
+    assert reader.rebuild_ledger()["BATMAN"]["positions"] == {"X": {"quantity": -50, "avg_price": 100.0}}
+
+
+def test_correction_to_zero_quantity_removes_the_fill(journal):
+    journal.append("fill", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0,
+                   strategy="BATMAN", estimated=True)
+    journal.append("fill_correction", order_id="A", symbol="X", side="SELL", quantity=0, price=0.0,
+                   strategy="BATMAN", status="CANCELLED")
+    ledger = replay(journal).rebuild_ledger()
+    assert ledger["BATMAN"]["positions"] == {}
+    assert ledger["BATMAN"]["closed_pnls"] == []
+
+
+def test_ledger_reset_clears_the_book_and_carries_day_pnl(journal):
+    journal.append("fill", order_id="A", symbol="X", side="SELL", quantity=50, price=100.0, strategy="BATMAN")
+    journal.append("ledger_reset", strategy="BATMAN", day_pnl=-250.0)
+    journal.append("fill", order_id="B", symbol="Y", side="SELL", quantity=25, price=50.0, strategy="BATMAN")
+    ledger = replay(journal).rebuild_ledger()
+
+    assert ledger["BATMAN"]["positions"] == {"Y": {"quantity": -25, "avg_price": 50.0}}
+    assert ledger["day_pnl"] == -250.0
+
+
+def test_failed_placements_are_kept_until_matched_to_a_broker_order(journal):
+    failed = journal.append("order", order_id=None, symbol="X", side="BUY", quantity=25,
+                            strategy="BATMAN", status="PLACE_FAILED")
+    journal.append("order", order_id=None, symbol="Y", side="BUY", quantity=25,
+                   strategy="BATMAN", status="PLACE_FAILED")
+    journal.append("order", order_id="A", symbol="X", side="BUY", quantity=25,
+                   strategy="BATMAN", attempt_seq=failed, adopted=True)
+    reader = replay(journal)
+
+    assert [rec["symbol"] for rec in reader.failed_orders.values()] == ["Y"]
+    assert None not in reader.orders
+    assert "A" in reader.orders
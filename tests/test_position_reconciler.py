@@ -0,0 +1,175 @@
+from datetime import datetime
+import pytest
+import position_reconciler
+from position_reconciler import PositionReconciler
+from kite_bms import KiteTrader
+from utils.order_journal import OrderJournal
+
+
+class FakeKite:
+    def __init__(self):
+        self.net = []
+        self.order_book = []
+
+    def positions(self):
+        return {"net": self.net}
+
+    def orders(self):
+        return self.order_book
+
+
+@pytest.fixture
+def trader(tmp_path, monkeypatch):
+    monkeypatch.setattr(position_reconciler, "update_strategy_action", lambda *args, **kwargs: None)
+    trader = KiteTrader()
+    trader.sandbox_mode = False
+    trader.kite = FakeKite()
+    trader.symbol = trader.instance = "NIFTY"
+    trader.exchange_options = "NFO"
+    trader.redis_client = None
+    trader.batman_positions, trader.batman_closed_pnls = {}, []
+    trader.debit_spread_positions, trader.debit_spread_closed_pnls = {}, []
+    trader.journal = OrderJournal(str(tmp_path / "NIFTY_20261019.jsonl"), flush_interval=60)
+    yield trader
+    trader.journal.close()
+
+
+def order(trader, order_id, symbol="X", side="SELL", quantity=50, strategy="BATMAN"):
+    trader._journal("order", order_id=order_id, symbol=symbol, side=side, quantity=quantity, strategy=strategy)
+
+
+def broker_order(order_id, quantity=50, price=100.0, status="COMPLETE", **fields):
+    return dict(order_id=order_id, status=status, quantity=quantity, filled_quantity=quantity,
+                average_price=price, **fields)
+
+
+def test_market_converted_fill_is_corrected_to_the_broker_price(trader):
+    order(trader, "A")
+    trader._update_position("X", "SELL", 50, 100.0, "BATMAN", order_id="A", estimated=True)
+    trader.kite.order_book = [broker_order("A", price=97.5)]
+    trader.kite.net = [{"tradingsymbol": "X", "exchange": "NFO", "quantity": -50}]
+
+    report = PositionReconciler(trader).reconcile_once()
+
+    assert [c["price"] for c in report["corrections"]] == [97.5]
+    assert trader.batman_positions == {"X": {"quantity": -50, "avg_price": 97.5}}
+    assert report["flags"] == []
+    # A second cycle finds nothing left to correct
+    report = PositionReconciler(trader).reconcile_once()
+    assert report["corrections"] == [] and report["ledger_changes"] == []
+
+
+def test_order_awaiting_its_fill_is_left_to_the_trader(trader):
+    order(trader, "A")
+    trader.orders_in_flight.add("A")
+    trader.kite.order_book = [broker_order("A")]
+    reconciler = PositionReconciler(trader)
+
+    assert reconciler.reconcile_once()["corrections"] == []
+    assert trader.batman_positions == {}
+
+    # The trading thread books the fill once it sees COMPLETE; it is counted once
+    trader._update_position("X", "SELL", 50, 100.0, "BATMAN", order_id="A")
+    trader.orders_in_flight.discard("A")
+    report = reconciler.reconcile_once()
+    assert report["corrections"] == [] and report["ledger_changes"] == []
+    assert trader.batman_positions == {"X": {"quantity": -50, "avg_price": 100.0}}
+
+
+def test_fill_booked_after_a_correction_is_not_double_counted(trader):
+    # The reconciler saw the order complete before the trader journaled its fill
+    order(trader, "A")
+    trader.kite.order_book = [broker_order("A")]
+    reconciler = PositionReconciler(trader)
+    assert len(reconciler.reconcile_once()["corrections"]) == 1
+    assert trader.batman_positions == {"X": {"quantity": -50, "avg_price": 100.0}}
+
+    trader._update_position("X", "SELL", 50, 100.0, "BATMAN", order_id="A")
+    assert trader.batman_positions["X"]["quantity"] == -100   # in memory until the next cycle
+    reconciler.reconcile_once()
+    assert trader.batman_positions == {"X": {"quantity": -50, "avg_price": 100.0}}
+
+
+def test_diff_ignores_symbols_of_other_instances(trader):
+    order(trader, "A")
+    trader._update_position("X", "SELL", 50, 100.0, "BATMAN", order_id="A")
+    trader.kite.order_book = [broker_order("A")]
+    trader.kite.net = [
+        {"tradingsymbol": "X", "exchange": "NFO", "quantity": -75},   # another 25 nobody journaled
+        {"tradingsymbol": "Z", "exchange": "NFO", "quantity": -50},   # another instance's leg
+        {"tradingsymbol": "X", "exchange": "BFO", "quantity": 10},
+    ]
+
+    flags = PositionReconciler(trader).reconcile_once()["flags"]
+
+    assert flags == [{"symbol": "X", "type": "unexplained", "ledger_qty": -50, "broker_qty": -75}]
+
+
+def test_position_missing_at_the_broker_is_flagged(trader):
+    order(trader, "A")
+    trader._update_position("X", "SELL", 50, 100.0, "BATMAN", order_id="A")
+    trader.kite.order_book = [broker_order("A")]
+
+    flags = PositionReconciler(trader).reconcile_once()["flags"]
+
+    assert flags == [{"symbol": "X", "type": "missing", "ledger_qty": -50, "broker_qty": 0}]
+
+
+def test_failed_placement_is_adopted_and_its_fill_corrected(trader):
+    attempt_ts = trader.clock.time()
+    trader._journal("order", order_id=None, symbol="Y", side="BUY", quantity=25, strategy="BATMAN",
+                    status="PLACE_FAILED", error="Read timed out")
+    placed = datetime.fromtimestamp(attempt_ts + 1)
+    trader.kite.order_book = [
+        broker_order("OTHER", quantity=25, price=4.0, exchange="NFO", tradingsymbol="Y", transaction_type="SELL",
+                     order_timestamp=placed),
+        broker_order("B", quantity=25, price=4.0, exchange="NFO", tradingsymbol="Y", transaction_type="BUY",
+                     order_timestamp=placed),
+    ]
+    trader.kite.net = [{"tradingsymbol": "Y", "exchange": "NFO", "quantity": 25}]
+    reconciler = PositionReconciler(trader)
+
+    report = reconciler.reconcile_once()
+
+    assert [a["order_id"] for a in report["adopted"]] == ["B"]
+    assert [c["order_id"] for c in report["corrections"]] == ["B"]
+    assert trader.batman_positions == {"Y": {"quantity": 25, "avg_price": 4.0}}
+    assert report["flags"] == []
+    assert reconciler.reconcile_once()["adopted"] == []
+
+
+def test_broker_order_outside_the_adoption_window_is_not_adopted(trader):
+    attempt_ts = trader.clock.time()
+    trader._journal("order", order_id=None, symbol="Y", side="BUY", quantity=25, strategy="BATMAN",
+                    status="PLACE_FAILED")
+    trader.kite.order_book = [
+        broker_order("B", quantity=25, price=4.0, exchange="NFO", tradingsymbol="Y", transaction_type="BUY",
+                     order_timestamp=datetime.fromtimestamp(attempt_ts - 600)),
+    ]
+
+    report = PositionReconciler(trader).reconcile_once()
+
+    assert report["adopted"] == [] and report["corrections"] == []
+
+
+def test_sandbox_mode_is_not_reconciled(trader):
+    trader.sandbox_mode = True
+    assert PositionReconciler(trader).reconcile_once() is None
+
+
+def test_ledger_swap_is_deferred_while_the_journal_keeps_changing(trader, monkeypatch):
+    order(trader, "A")
+    trader.kite.order_book = [broker_order("A")]
+    reader = position_reconciler.JournalReader
+
+    def busy_reader(path):
+        # Another record lands while every replay runs
+        trader._journal("status", order_id="A", symbol="X", status="OPEN")
+        return reader(path)
+    monkeypatch.setattr(position_reconciler, "JournalReader", busy_reader)
+
+    report = PositionReconciler(trader).reconcile_once()
+
+    assert len(report["corrections"]) == 1
+    assert report["ledger_changes"] == []
+    assert trader.batman_positions == {}
@@ -0,0 +1,106 @@
+import json
+import pytest
+from utils.redis_config import RedisConfigReader, CONFIG_VERSION_KEY, INPUT_PREFIX
+from algo_strategy import AlgoStrategy
+import algo_strategy
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def get(self, key):
+        self.ops.append(lambda: self.store.get(key))
+
+    def mget(self, keys):
+        self.ops.append(lambda: [self.store.get(key) for key in keys])
+
+    def execute(self):
+        return [op() for op in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def set_input(self, key, value, instance=None, bump=True):
+        prefix = f"strategy:{instance}:input:" if instance else INPUT_PREFIX
+        self.store[prefix + key] = json.dumps(value).encode()
+        if bump:
+            self.store[CONFIG_VERSION_KEY] = str(int(self.store.get(CONFIG_VERSION_KEY, 0)) + 1).encode()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+
+@pytest.fixture
+def redis():
+    redis = FakeRedis()
+    redis.set_input("index", "NIFTY")
+    redis.set_input("TargetPnl", 5000)
+    redis.set_input("ExitPnl", -3000)
+    return redis
+
+
+def test_generation_moves_only_when_inputs_change(redis):
+    reader = RedisConfigReader(redis_client=redis, revalidate_secs=0)
+    first = reader.generation
+    assert reader.generation == first
+
+    redis.set_input("TargetPnl", 6000, bump=False)   # e.g. redis-cli
+    assert reader.generation == first + 1
+    assert reader.version == 3
+
+    redis.store[CONFIG_VERSION_KEY] = b"9"          # a version bump alone changes nothing
+    assert reader.generation == first + 1
+
+
+def test_generation_survives_invalidate(redis):
+    reader = RedisConfigReader(redis_client=redis, revalidate_secs=60)
+    first = reader.generation
+    redis.set_input("ExitPnl", -2000)
+    reader.invalidate()
+    assert reader.generation == first + 1
+    assert reader.get_instance_config("SENSEX") == {}
+    redis.set_input("TargetPnl", 7000, instance="SENSEX")
+    reader.invalidate()
+    assert reader.generation == first + 2
+
+
+@pytest.fixture
+def strategy(redis, monkeypatch):
+    monkeypatch.setattr(algo_strategy, "update_strategy_action", lambda *args, **kwargs: None)
+    strat = AlgoStrategy.__new__(AlgoStrategy)
+    strat.symbol = strat.instance = "NIFTY"
+    strat.redis_client = None
+    strat.overrides = {}
+    strat.redis_config = RedisConfigReader(redis_client=redis, revalidate_secs=0)
+    strat.target_pnl, strat.exit_pnl = 5000.0, -3000.0
+    strat.rolling_value, strat.shift_threshold, strat.order_buffer_pct = 0.0, 50, 0.01
+    strat.config_version = strat.redis_config.version
+    strat.config_generation = strat.redis_config.generation
+    return strat
+
+
+def test_inputs_written_without_a_version_bump_are_applied(redis, strategy):
+    redis.set_input("TargetPnl", 8000, bump=False)
+    strategy._reload_params()
+    assert strategy.target_pnl == 8000.0
+
+
+def test_rejected_inputs_are_not_applied_until_they_change(redis, strategy, monkeypatch):
+    redis.set_input("ExitPnl", 9000)   # not below TargetPnl
+    strategy._reload_params()
+    assert strategy.exit_pnl == -3000.0
+
+    rebuilt = []
+    monkeypatch.setattr(strategy, "_instance_config", lambda: rebuilt.append(1) or {})
+    strategy._reload_params()
+    assert rebuilt == []   # nothing changed since, the config is not rebuilt
+
+    monkeypatch.undo()
+    monkeypatch.setattr(algo_strategy, "update_strategy_action", lambda *args, **kwargs: None)
+    redis.set_input("ExitPnl", -1000)
+    strategy._reload_params()
+    assert strategy.exit_pnl == -1000.0
@@ -0,0 +1,82 @@
+import redis
+import pytest
+from utils.redis_utils import read_entries, decode_entries
+from utils.serializer import dumps
+
+KEY = "NIFTY:logs"
+
+
+class FakeStreams:
+    """XRANGE/XREVRANGE over an in-memory stream, or LRANGE when the key holds a legacy list"""
+    def __init__(self, count=0, legacy=None):
+        self.entries = [(f"1760000000000-{i}".encode(), {b"data": dumps({"msg": f"line {i}"}, KEY)})
+                        for i in range(count)]
+        self.legacy = legacy
+
+    def _check_type(self):
+        if self.legacy is not None:
+            raise redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+    def xrevrange(self, key, max="+", min="-", count=None):
+        self._check_type()
+        return list(reversed(self.entries))[:count]
+
+    def xrange(self, key, min="-", max="+", count=None):
+        self._check_type()
+        after = min[1:].encode()
+        newer = [entry for entry in self.entries if self._id(entry[0]) > self._id(after)]
+        return newer[:count]
+
+    @staticmethod
+    def _id(entry_id):
+        ms, seq = entry_id.split(b"-")
+        return int(ms), int(seq)
+
+    def lrange(self, key, start, end):
+        return self.legacy[start:end + 1]
+
+
+def messages(entries):
+    return [entry["msg"] for entry in entries]
+
+
+def test_latest_entries_newest_first_with_a_cursor():
+    client = FakeStreams(count=10)
+    entries, cursor = read_entries(client, KEY, limit=3)
+    assert messages(entries) == ["line 9", "line 8", "line 7"]
+    assert entries[0]["id"] == cursor == "1760000000000-9"
+
+
+def test_since_cursor_returns_only_newer_entries_oldest_page_first():
+    client = FakeStreams(count=10)
+    entries, cursor = read_entries(client, KEY, since="1760000000000-4", limit=3)
+    assert messages(entries) == ["line 7", "line 6", "line 5"]
+    assert cursor == "1760000000000-7"
+
+    entries, cursor = read_entries(client, KEY, since=cursor, limit=3)
+    assert messages(entries) == ["line 9", "line 8"]
+    assert cursor == "1760000000000-9"
+
+
+def test_nothing_new_keeps_the_cursor():
+    client = FakeStreams(count=3)
+    assert read_entries(client, KEY, since="1760000000000-2") == ([], "1760000000000-2")
+    assert read_entries(FakeStreams(), KEY) == ([], None)
+
+
+def test_legacy_list_is_read_without_a_cursor():
+    client = FakeStreams(legacy=[dumps({"msg": "new"}), b"garbage", dumps({"msg": "old"})])
+    entries, cursor = read_entries(client, KEY, since="1760000000000-2", limit=10)
+    assert messages(entries) == ["new", "old"]
+    assert cursor is None
+
+
+@pytest.mark.parametrize("data_key", [b"data", "data"])
+def test_decode_entries_adds_ids_and_skips_undecodable_entries(data_key):
+    raw = [
+        (b"1-0", {data_key: dumps({"msg": "a"})}),
+        (b"2-0", {data_key: b"{broken"}),
+        ("3-0", {data_key: dumps({"msg": "c"})}),
+        (b"4-0", {}),
+    ]
+    assert decode_entries(raw) == [{"msg": "a", "id": "1-0"}, {"msg": "c", "id": "3-0"}]
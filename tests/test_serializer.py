@@ -0,0 +1,80 @@
+import json
+import math
+import pytest
+from utils import serializer
+from utils.serializer import dumps, loads, codec_for, MSGPACK_TAG
+
+STATUS = {"status": "RUNNING", "spot": 24512.35, "positions": [{"symbol": "X", "qty": -50}], "note": None}
+
+
+@pytest.fixture
+def codec(monkeypatch):
+    def use(value):
+        monkeypatch.setattr(serializer, "CODEC", value)
+    return use
+
+
+def test_json_round_trip_for_cold_keys():
+    raw = dumps(STATUS, "NIFTY:config")
+    assert raw[:1] in (b"{", "{")   # orjson writes bytes, json str
+    assert loads(raw) == STATUS
+
+
+def test_plain_json_written_before_the_serializer_stays_readable():
+    assert loads(json.dumps(STATUS)) == STATUS
+    assert loads(json.dumps(STATUS).encode()) == STATUS
+    assert math.isnan(loads(json.dumps({"iv": float("nan")}))["iv"])
+
+
+def test_unknown_tag_is_rejected():
+    with pytest.raises(ValueError, match="Unknown payload tag"):
+        loads(b"\x00z9payload")
+
+
+def test_invalid_json_raises_value_error():
+    with pytest.raises(ValueError):
+        loads(b"not json")
+
+
+def test_everything_is_json_without_msgpack(monkeypatch, codec):
+    monkeypatch.setattr(serializer, "msgpack", None)
+    codec("msgpack")
+    assert codec_for("NIFTY:heartbeat") == "json"
+    assert loads(dumps(STATUS, "NIFTY:heartbeat")) == STATUS
+    with pytest.raises(ValueError, match="not installed"):
+        loads(MSGPACK_TAG + b"\x80")
+
+
+def test_codec_choice_by_key(monkeypatch, codec):
+    monkeypatch.setattr(serializer, "msgpack", object())
+    codec("auto")
+    assert codec_for("NIFTY:trading_status") == "msgpack"
+    assert codec_for("heartbeat") == "msgpack"
+    assert codec_for("NIFTY:config") == "json"
+    assert codec_for(None) == "json"
+    codec("json")
+    assert codec_for("NIFTY:trading_status") == "json"
+    codec("msgpack")
+    assert codec_for("NIFTY:config") == "msgpack"
+
+
+def test_msgpack_round_trip_for_hot_keys(codec):
+    pytest.importorskip("msgpack")
+    codec("auto")
+    raw = dumps(STATUS, "NIFTY:trading_status")
+    assert raw.startswith(MSGPACK_TAG)
+    assert loads(raw) == STATUS
+
+
+def test_values_msgpack_cannot_encode_fall_back_to_json(codec):
+    pytest.importorskip("msgpack")
+    codec("msgpack")
+    raw = dumps({"big": 2 ** 70}, "NIFTY:heartbeat")
+    assert raw[:1] in (b"{", "{")   # orjson writes bytes, json str
+    assert loads(raw) == {"big": 2 ** 70}
+
+
+def test_corrupt_msgpack_payload_raises_value_error():
+    pytest.importorskip("msgpack")
+    with pytest.raises(ValueError, match="Invalid msgpack payload"):
+        loads(MSGPACK_TAG + b"\xc1")
@@ -0,0 +1,52 @@
+import pytest
+from algo_strategy import StraddleVWAPUpdater
+
+INDEX = "NSE:NIFTY 50"
+
+
+class FakeKite:
+    def __init__(self, prices):
+        self.prices = prices
+        self.calls = []
+
+    def ltp(self, instruments):
+        self.calls.append(list(instruments))
+        return {name: {"last_price": self.prices[name]} for name in instruments if name in self.prices}
+
+
+@pytest.fixture
+def updater():
+    return StraddleVWAPUpdater(None, "NIFTY", "26O20", 50)
+
+
+def test_polled_prices_come_from_one_batched_ltp_call(updater):
+    updater.kite = FakeKite({INDEX: 25010.0, "NFO:NIFTY26O2025000CE": 80.0, "NFO:NIFTY26O2025000PE": 70.0})
+    updater.index_history.append((None, 24990.0))
+
+    assert updater.live_prices() == (150.0, 25010.0)
+    assert updater.kite.calls == [[INDEX, "NFO:NIFTY26O2025000CE", "NFO:NIFTY26O2025000PE"]]
+
+
+def test_legs_are_fetched_again_when_the_index_crossed_a_strike(updater):
+    updater.kite = FakeKite({INDEX: 25040.0, "NFO:NIFTY26O2025050CE": 60.0, "NFO:NIFTY26O2025050PE": 85.0})
+    updater.polled_index = 25010.0
+
+    assert updater.live_prices() == (145.0, 25040.0)
+    assert updater.kite.calls[1] == ["NFO:NIFTY26O2025050CE", "NFO:NIFTY26O2025050PE"]
+
+    updater.kite.calls.clear()
+    assert updater.live_prices() == (145.0, 25040.0)
+    assert len(updater.kite.calls) == 1   # the new ATM is known now
+
+
+def test_first_poll_without_a_known_index_price(updater):
+    updater.kite = FakeKite({INDEX: 25010.0, "NFO:NIFTY26O2025000CE": 80.0, "NFO:NIFTY26O2025000PE": 70.0})
+    assert updater.live_prices() == (150.0, 25010.0)
+    assert updater.kite.calls == [[INDEX], ["NFO:NIFTY26O2025000CE", "NFO:NIFTY26O2025000PE"]]
+
+
+def test_missing_quotes_give_no_prices(updater):
+    updater.kite = FakeKite({INDEX: 25010.0, "NFO:NIFTY26O2025000CE": 80.0})
+    assert updater.live_prices() is None
+    updater.kite = FakeKite({})
+    assert updater.live_prices() is None
@@ -0,0 +1,95 @@
+import logging
+import queue
+import pytest
+import utils.logger
+from utils.logger import ThrottleFilter, THROTTLE, _DroppingQueueHandler
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeMonotonic()
+    monkeypatch.setattr(utils.logger.time, "monotonic", clock)
+    return clock
+
+
+def record(msg="tick", level=logging.DEBUG, lineno=10, name="strategy", **extra):
+    rec = logging.LogRecord(name, level, "algo_strategy.py", lineno, msg, None, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def passed(throttle, count, /, **kwargs):
+    return sum(throttle.filter(record(**kwargs)) for _ in range(count))
+
+
+def test_burst_passes_then_records_are_suppressed(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=3)
+    assert passed(throttle, 10) == 3
+    assert throttle.suppressed == 7
+
+
+def test_next_record_through_carries_the_suppressed_count(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=2)
+    passed(throttle, 5)
+    clock.now += 1.0
+    rec = record("tick")
+    assert throttle.filter(rec)
+    assert rec.suppressed == 3
+    assert rec.getMessage() == "tick"   # other handlers see the record unchanged
+
+    assert not throttle.filter(record("tick"))   # the refilled token was spent
+
+
+def test_queue_handler_appends_the_note_to_its_copy(clock):
+    log_queue = queue.Queue()
+    handler = _DroppingQueueHandler(log_queue)
+    rec = record("tick %d", args=(7,), suppressed=3)
+    handler.handle(rec)
+
+    assert log_queue.get_nowait().getMessage() == "tick 7 [3 similar suppressed]"
+    assert rec.getMessage() == "tick 7"
+
+
+def test_tokens_refill_at_rate_up_to_burst(clock):
+    throttle = ThrottleFilter(rate=2.0, burst=4)
+    passed(throttle, 4)
+    clock.now += 1.0
+    assert passed(throttle, 5) == 2
+    clock.now += 60.0
+    assert passed(throttle, 10) == 4
+
+
+def test_call_sites_are_throttled_separately(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=1)
+    assert passed(throttle, 3, lineno=10) == 1
+    assert passed(throttle, 3, lineno=11) == 1
+    assert passed(throttle, 3, lineno=10, name="gateway") == 1
+
+
+def test_only_debug_and_marked_monitoring_lines_are_throttled_by_default(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=1)
+    assert passed(throttle, 5, level=logging.INFO) == 5       # e.g. order and fill confirmations
+    assert passed(throttle, 5, level=logging.WARNING) == 5
+    assert passed(throttle, 5, level=logging.INFO, lineno=20, **THROTTLE) == 1
+    assert throttle.suppressed == 4
+
+
+def test_level_raises_the_throttled_levels(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=1, level=logging.INFO)
+    assert passed(throttle, 5, level=logging.INFO) == 1
+    assert passed(throttle, 5, level=logging.ERROR) == 5
+
+
+def test_sampling_lets_every_nth_suppressed_record_through(clock):
+    throttle = ThrottleFilter(rate=1.0, burst=1, sample=5)
+    results = [throttle.filter(record()) for _ in range(11)]
+    assert results == [True] + ([False] * 4 + [True]) * 2
+    assert throttle.suppressed == 8
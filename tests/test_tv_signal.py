@@ -0,0 +1,35 @@
+import queue
+import time
+from datetime import datetime
+import pytest
+import algo_strategy
+from algo_strategy import AlgoStrategy
+from utils.clock import SimulatedClock
+
+
+@pytest.fixture
+def strategy(monkeypatch):
+    monkeypatch.setattr(algo_strategy, "update_strategy_action", lambda *args, **kwargs: None)
+    strat = AlgoStrategy.__new__(AlgoStrategy)
+    strat.symbol, strat.redis_client = "NIFTY", None
+    strat.clock = SimulatedClock(datetime(2025, 1, 6, 9, 15))   # a replayed session
+    strat.tv_signals = queue.Queue()
+    strat.exits = []
+    strat.exit_all_positions = lambda: strat.exits.append(True)
+    return strat
+
+
+def sell_signal(age):
+    return {"timestamp": time.time() - age, "decision": {"action": "sell"}}
+
+
+def test_fresh_signal_is_acted_on_under_a_simulated_clock(strategy):
+    strategy.on_tv_signal(sell_signal(age=5))
+    strategy._check_tradingview_signal()
+    assert strategy.exits == [True]
+
+
+def test_signal_older_than_a_minute_is_dropped(strategy):
+    strategy.on_tv_signal(sell_signal(age=120))
+    strategy._check_tradingview_signal()
+    assert strategy.exits == []
@@ -0,0 +1,22 @@
+import pytest
+from utils.status_publisher import update_notice, parse_update_notice
+
+
+def test_notice_names_keys_and_counts_pushed_entries():
+    notice = update_notice({"NIFTY:trading_status": None, "NIFTY:logs": 3, "heartbeat": None})
+    assert notice == "NIFTY:trading_status NIFTY:logs#3 heartbeat"
+
+
+@pytest.mark.parametrize("changes", [
+    {},
+    {"execution_status": None},
+    {"NIFTY:action_history": 1, "NIFTY:latest_action": None, "BANKNIFTY:logs": 250},
+])
+def test_parse_is_the_inverse_of_update_notice(changes):
+    assert parse_update_notice(update_notice(changes)) == changes
+    assert parse_update_notice(update_notice(changes).encode()) == changes
+
+
+def test_malformed_counts_parse_as_unknown():
+    assert parse_update_notice(b"NIFTY:logs# NIFTY:logs2#x  heartbeat") == {
+        "NIFTY:logs": None, "NIFTY:logs2": None, "heartbeat": None}
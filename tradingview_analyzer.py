@@ -1,14 +1,16 @@
 import logging 
 import subprocess
-import threading
 import sys
 from pathlib import Path
+from utils.job_queue import JobQueue
 
 logger  = logging.getLogger("analyzer")
 
 
 class TradingViewAnalyzer:
-    def __init__(self):
+    def __init__(self, jobs=None):
+        # Vision analyses run on this bounded pool (one per ticker at a time), not a thread per alert
+        self.jobs = jobs or JobQueue(name="vision", workers=1)
         self.rsi_oversold = 30
         self.rsi_overbought = 70
 
@@ -23,14 +25,9 @@ class TradingViewAnalyzer:
         ticker = data.get("ticker", "UNKNOWN")
         momentum = data.get("momentum", "NONE")
 
-        thread = threading.Thread(
-            target=self._run_vision_script, 
-            args=(ticker, momentum), 
-            daemon=True
-        )
-        thread.start()
+        job_id = self.jobs.submit(ticker, self._run_vision_script, ticker, momentum)
 
-        return {"message": f"Vision analysis started for {ticker}"}
+        return {"message": f"Vision analysis queued for {ticker}", "job_id": job_id}
 
     def _run_vision_script(self, ticker, momentum):
         try:    
@@ -38,10 +35,11 @@ class TradingViewAnalyzer:
          
             script_path = base_dir / "browseruse" / "gpt_vision_analyzer.py"
             
-            subprocess.run([sys.executable, str(script_path), ticker, momentum], check=True)
+            subprocess.run([sys.executable, str(script_path), ticker, momentum], check=True, timeout=200)
             logger.info(f"✅ Vision script finished for {ticker}")
         except Exception as e:
             logger.error(f"❌ Error running vision script: {e}")
+            raise
             
 
     def analyze(self,data:dict)-> dict:
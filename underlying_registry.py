@@ -0,0 +1,154 @@
+"""
+Per-underlying instrument metadata (index token, exchanges, lot size, strike step, freeze limit)
+built from the Kite instruments dump plus data/underlyings.json.
+"""
+import csv
+import json
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger("root")
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+INSTRUMENTS_CSV = DATA_DIR / "kiteInstruments.csv"
+OVERRIDES_FILE = DATA_DIR / "underlyings.json"
+
+
+class Underlying:
+    """Resolved settings for one underlying"""
+    def __init__(self, symbol, index_token, index_exchange, options_exchange, lot_size, strike_step, freeze_limit,
+                 index_tradingsymbol=None):
+        self.symbol = symbol
+        self.index_token = int(index_token)
+        self.index_tradingsymbol = index_tradingsymbol or symbol
+        self.index_exchange = index_exchange
+        self.options_exchange = options_exchange
+        self.options_segment = f"{options_exchange}-OPT"
+        self.lot_size = int(lot_size)
+        self.strike_step = strike_step
+        self.freeze_limit = int(freeze_limit)
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return f"Underlying({self.to_dict()})"
+
+
+def _strike_step(strikes):
+    """Most common gap between adjacent listed strikes"""
+    strikes = sorted(set(strikes))
+    gaps = Counter(round(b - a, 2) for a, b in zip(strikes, strikes[1:]) if b > a)
+    if not gaps:
+        return None
+    step = gaps.most_common(1)[0][0]
+    return int(step) if float(step).is_integer() else step
+
+
+def _scan_instruments(path, overrides):
+    """
+    Derive index token, lot size and strike step per underlying from the dump.
+    Lot size and strike step come from the nearest listed expiry.
+    """
+    derived = {sym: {} for sym in overrides}
+    index_names = {
+        (o.get("index_exchange"), o.get("index_tradingsymbol")): sym
+        for sym, o in overrides.items()
+    }
+    nearest = {}   # symbol -> (expiry, lot_size, [strikes])
+
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            segment = row.get("segment")
+            if segment == "INDICES":
+                sym = index_names.get((row.get("exchange"), row.get("tradingsymbol")))
+                if sym:
+                    derived[sym]["index_token"] = int(row["instrument_token"])
+                continue
+
+            sym = row.get("name")
+            if sym not in overrides or row.get("instrument_type") not in ("CE", "PE"):
+                continue
+            if segment != f"{overrides[sym].get('options_exchange')}-OPT":
+                continue
+            expiry = row.get("expiry")
+            if not expiry:
+                continue
+            best = nearest.get(sym)
+            if best is None or expiry < best[0]:
+                nearest[sym] = best = (expiry, int(float(row["lot_size"])), [])
+            if expiry == best[0]:
+                best[2].append(float(row["strike"]))
+
+    for sym, (_, lot_size, strikes) in nearest.items():
+        derived[sym]["lot_size"] = lot_size
+        step = _strike_step(strikes)
+        if step:
+            derived[sym]["strike_step"] = step
+    return derived
+
+
+class UnderlyingRegistry:
+    """
+    Registry of tradable underlyings. Values explicitly set in the override file win,
+    then values derived from the instruments dump, then the override file's 'defaults'.
+    """
+    def __init__(self, instruments_csv=INSTRUMENTS_CSV, overrides_file=OVERRIDES_FILE):
+        with open(overrides_file, "r", encoding="utf-8") as f:
+            self.overrides = json.load(f)
+
+        derived = {}
+        if Path(instruments_csv).exists():
+            try:
+                derived = _scan_instruments(instruments_csv, self.overrides)
+            except Exception as e:
+                logger.error(f"Could not read instruments dump {instruments_csv}: {e}")
+        else:
+            logger.warning(f"Instruments dump {instruments_csv} not found, using defaults from {overrides_file}")
+
+        self.underlyings = {}
+        for sym, override in self.overrides.items():
+            settings = dict(override.get("defaults", {}))
+            settings.update(derived.get(sym, {}))
+            settings.update({k: v for k, v in override.items() if k != "defaults"})
+            try:
+                self.underlyings[sym] = Underlying(
+                    symbol=sym,
+                    index_token=settings["index_token"],
+                    index_exchange=settings["index_exchange"],
+                    options_exchange=settings["options_exchange"],
+                    lot_size=settings["lot_size"],
+                    strike_step=settings["strike_step"],
+                    freeze_limit=settings["freeze_limit"],
+                    index_tradingsymbol=settings.get("index_tradingsymbol"),
+                )
+            except KeyError as e:
+                logger.error(f"Underlying {sym} is missing setting {e}; skipped")
+
+    def get(self, symbol):
+        try:
+            return self.underlyings[symbol.upper()]
+        except KeyError:
+            raise KeyError(f"Unknown underlying '{symbol}'. Add it to {OVERRIDES_FILE}")
+
+    def symbols(self):
+        return list(self.underlyings)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry, built on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = UnderlyingRegistry()
+        return _registry
+
+
+def get_underlying(symbol):
+    return get_registry().get(symbol)
@@ -0,0 +1,112 @@
+"""
+Atomic session checkpoints of strategy and straddle updater state for warm restarts
+"""
+import os
+import json
+import threading
+import logging
+from datetime import datetime
+from utils.clock import get_clock
+
+logger = logging.getLogger("root")
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "checkpoints")
+CHECKPOINT_KEY = "strategy:checkpoint:"
+
+
+def encode_history(history):
+    """[(datetime, price), ...] -> [["HH:MM", price], ...] for the current session"""
+    return [[ts.strftime("%H:%M"), round(price, 4)] for ts, price in list(history)]
+
+
+def decode_history(rows, day):
+    """Inverse of encode_history for the checkpoint's trading day"""
+    return [
+        (datetime.combine(day, datetime.strptime(hhmm, "%H:%M").time()), price)
+        for hhmm, price in rows
+    ]
+
+
+class StrategyCheckpointer:
+    """
+    Writes compact JSON checkpoints to local disk and Redis.
+
+    save() only takes the latest state and wakes a background writer, which
+    writes a temp file, fsyncs it and renames it over the previous
+    checkpoint, so a crash never leaves a half-written file behind.
+    """
+    def __init__(self, name, redis_client=None, directory=CHECKPOINT_DIR):
+        self.name = name
+        self.redis_client = redis_client
+        self.path = os.path.join(directory, f"{name}.json")
+        self.redis_key = CHECKPOINT_KEY + name
+        self._latest = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def save(self, state):
+        """Queue a checkpoint; only the most recent one pending is written"""
+        state = dict(state, instance=self.name, saved_at=get_clock().time())
+        with self._lock:
+            self._latest = state
+        self._wake.set()
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                state, self._latest = self._latest, None
+            if state is not None:
+                self._write(state)
+
+    def _write(self, state):
+        payload = json.dumps(state, separators=(",", ":"), default=str)
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"[{self.name}] Checkpoint write failed: {e}")
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(self.redis_key, payload)
+            except Exception as e:
+                logger.error(f"[{self.name}] Checkpoint Redis write failed: {e}")
+
+    def load(self, expiry):
+        """
+        Return the newest checkpoint for today's session and this expiry, preferring
+        whichever of disk and Redis was saved last, or None.
+        """
+        candidates = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                candidates.append(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"[{self.name}] Ignoring unreadable checkpoint {self.path}: {e}")
+
+        if self.redis_client is not None:
+            try:
+                raw = self.redis_client.get(self.redis_key)
+                if raw:
+                    candidates.append(json.loads(raw))
+            except Exception as e:
+                logger.warning(f"[{self.name}] Could not read checkpoint from Redis: {e}")
+
+        today = get_clock().now().date().isoformat()
+        valid = [
+            c for c in candidates
+            if c.get("date") == today and c.get("instance") == self.name and c.get("expiry") == expiry
+        ]
+        if not valid:
+            return None
+        return max(valid, key=lambda c: c.get("saved_at", 0))
@@ -0,0 +1,140 @@
+"""
+Clock service for the strategy runtime: wall-clock time in production, virtual
+time for replays and soak tests
+"""
+import time
+import threading
+from datetime import datetime
+
+
+class RealClock:
+    """Wall-clock time; thin wrapper over datetime/time/threading"""
+
+    def now(self):
+        return datetime.now()
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def sleep_until(self, when):
+        self.sleep((when - self.now()).total_seconds())
+
+    def wait(self, event, timeout=None):
+        """event.wait(timeout) measured on this clock"""
+        return event.wait(timeout)
+
+    def register(self, thread):
+        """Declare a thread that will use this clock; call before thread.start()"""
+        return thread
+
+
+class SimulatedClock:
+    """
+    Virtual time that only moves when every thread using it is blocked in
+    sleep()/wait(); it then jumps straight to the earliest pending deadline.
+
+    A thread joins the simulation when it is registered (before start) or on
+    its first sleep()/wait(), and leaves when it exits. Work that finishes
+    between deadlines therefore takes no virtual time, and a full session of
+    minute loops replays in seconds. With auto_advance=False time only moves
+    through advance()/set().
+    """
+    POLL_SECS = 0.005   # real time between checks for events set outside the clock
+
+    def __init__(self, start=None, auto_advance=True):
+        start = start or datetime.now()
+        self._now = start.timestamp() if isinstance(start, datetime) else float(start)
+        self.auto_advance = auto_advance
+        self._cond = threading.Condition()
+        self._participants = set()
+        self._sleepers = {}   # thread -> (deadline, event)
+
+    def now(self):
+        return datetime.fromtimestamp(self._now)
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def register(self, thread):
+        with self._cond:
+            self._participants.add(thread)
+        return thread
+
+    def advance(self, seconds):
+        self.set(self._now + seconds)
+
+    def set(self, when):
+        when = when.timestamp() if isinstance(when, datetime) else float(when)
+        with self._cond:
+            if when > self._now:
+                self._now = when
+            self._cond.notify_all()
+
+    def sleep(self, seconds):
+        self._block(self._now + max(seconds, 0), None)
+
+    def sleep_until(self, when):
+        self._block(when.timestamp(), None)
+
+    def wait(self, event, timeout=None):
+        if event.is_set():
+            return True
+        deadline = float("inf") if timeout is None else self._now + timeout
+        return self._block(deadline, event)
+
+    def _block(self, deadline, event):
+        me = threading.current_thread()
+        with self._cond:
+            self._participants.add(me)
+            self._sleepers[me] = (deadline, event)
+            try:
+                while True:
+                    if event is not None and event.is_set():
+                        return True
+                    if self._now >= deadline:
+                        return False
+                    self._maybe_advance()
+                    if self._now >= deadline:
+                        continue
+                    self._cond.wait(self.POLL_SECS)
+            finally:
+                del self._sleepers[me]
+
+    def _maybe_advance(self):
+        """Jump to the earliest deadline once every live participant is blocked"""
+        if not self.auto_advance:
+            return
+        self._participants = {t for t in self._participants if t.ident is None or t.is_alive()}
+        if len(self._sleepers) < len(self._participants):
+            return
+        if any(event is not None and event.is_set() for _, event in self._sleepers.values()):
+            return   # that thread is about to wake up on its own
+        deadline = min(d for d, _ in self._sleepers.values())
+        if deadline != float("inf") and deadline > self._now:
+            self._now = deadline
+            self._cond.notify_all()
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    """Process-wide clock used by components that are not handed one explicitly"""
+    return _clock
+
+
+def set_clock(clock):
+    """Install a clock (e.g. SimulatedClock) before the strategy components are created"""
+    global _clock
+    _clock = clock
+    return clock
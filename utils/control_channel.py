@@ -0,0 +1,134 @@
+"""
+Push-based control plane: the backend appends commands (start, stop, exit_all,
+config_changed, tv_signal) to a Redis stream per strategy instance, and the
+orchestrator reads them with blocking XREADGROUP and acknowledges each one.
+"""
+import json
+import time
+import logging
+import redis
+
+logger = logging.getLogger("root")
+
+CONTROL_GROUP = "orchestrator"
+INSTANCES_KEY = "strategy:instances"   # hash: instance name -> symbol
+STREAM_MAXLEN = 1000
+CONTROL_MAX_AGE = 300   # seconds; older commands are acknowledged but not executed
+
+
+def control_stream(instance):
+    return f"strategy:control:{instance}"
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def register_instances(redis_client, instances):
+    """Publish the instances hosted by this process ({name: symbol}) so the backend can address them"""
+    pipe = redis_client.pipeline()
+    pipe.delete(INSTANCES_KEY)
+    if instances:
+        pipe.hset(INSTANCES_KEY, mapping=instances)
+    pipe.execute()
+
+
+def registered_instances(redis_client):
+    return parse_instances(redis_client.hgetall(INSTANCES_KEY))
+
+
+def parse_instances(raw):
+    """{name: symbol} from the HGETALL reply of INSTANCES_KEY"""
+    return {_text(k): _text(v) for k, v in raw.items()}
+
+
+def resolve_targets(redis_client, instance=None, symbol=None):
+    """
+    Instances a command is addressed to: the named instance, else every
+    registered instance trading 'symbol' (all instances if symbol is None).
+    Before any orchestrator has registered, instances are assumed to be named
+    after their symbol, as run_nifty.py/run_sensex.py do.
+    """
+    if instance:
+        return [instance]
+    registered = registered_instances(redis_client)
+    if symbol is None:
+        return list(registered)
+    return [name for name, sym in registered.items() if sym == symbol] or [symbol]
+
+
+def publish_control(redis_client, instances, action, **fields):
+    """Append one command to each instance's control stream; returns the entry ids"""
+    event = {"action": action, "timestamp": time.time(), **fields}
+    data = json.dumps(event)
+    pipe = redis_client.pipeline(transaction=False)
+    for name in instances:
+        pipe.xadd(control_stream(name), {"data": data}, maxlen=STREAM_MAXLEN, approximate=True)
+    return pipe.execute()
+
+
+class ControlListener:
+    """
+    Blocking reader of the control streams of the given instances.
+
+    handler(instance, event) is called for every command in stream order and
+    the entry is acknowledged afterwards, whether or not the handler raised,
+    so one bad command cannot wedge the channel. The consumer name is stable:
+    on startup the entries a previous run read but never acknowledged are
+    handled first, then new ones. Commands older than max_age are skipped.
+    """
+    def __init__(self, redis_client, instances, handler, consumer=CONTROL_GROUP,
+                 block_ms=1000, max_age=CONTROL_MAX_AGE):
+        self.redis_client = redis_client
+        self.streams = {control_stream(name): name for name in instances}
+        self.handler = handler
+        self.consumer = consumer
+        self.block_ms = block_ms
+        self.max_age = max_age
+
+    def _ensure_groups(self):
+        for stream in self.streams:
+            try:
+                # From the start of the stream, so commands sent before the first run are seen
+                self.redis_client.xgroup_create(stream, CONTROL_GROUP, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def _dispatch(self, stream, entry_id, fields):
+        instance = self.streams[stream]
+        try:
+            event = json.loads(fields.get(b"data") or fields.get("data") or "{}")
+            age = time.time() - event.get("timestamp", 0)
+            if age > self.max_age:
+                logger.warning(f"[{instance}] Ignoring stale control command {event.get('action')} ({age:.0f}s old)")
+            else:
+                self.handler(instance, event)
+        except Exception as e:
+            logger.error(f"[{instance}] Control command {_text(entry_id)} failed: {e}")
+        finally:
+            self.redis_client.xack(stream, CONTROL_GROUP, entry_id)
+
+    def run(self, stop_event):
+        self._ensure_groups()
+        backlog = True   # first drain entries delivered to this consumer but never acknowledged
+        while not stop_event.is_set():
+            try:
+                start_id = "0" if backlog else ">"
+                reply = self.redis_client.xreadgroup(
+                    CONTROL_GROUP, self.consumer, {s: start_id for s in self.streams},
+                    count=100, block=None if backlog else self.block_ms)
+                if backlog and not any(entries for _, entries in reply or []):
+                    backlog = False
+                    continue
+                for stream, entries in reply or []:
+                    for entry_id, fields in entries:
+                        self._dispatch(_text(stream), entry_id, fields)
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.error(f"Control channel connection error: {e}")
+                stop_event.wait(1)
+            except redis.ResponseError as e:
+                # e.g. NOGROUP after the stream was deleted by clear_redis.py
+                logger.error(f"Control channel error: {e}")
+                self._ensure_groups()
+                stop_event.wait(1)
@@ -0,0 +1,144 @@
+"""
+Bounded background job pool for slow work triggered by HTTP requests (e.g.
+TradingView webhook analysis), so the request only enqueues and returns a job id.
+"""
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger("root")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on a fixed number of worker threads.
+
+    Every job has a key (e.g. the ticker) and at most per_key jobs with the
+    same key run at once; a queued job whose key is at its limit is skipped,
+    not blocking jobs for other keys behind it. Submitting beyond max_pending
+    queued jobs raises QueueFull. Records of finished jobs are kept for
+    polling, the most recent 'keep' of them.
+    """
+    def __init__(self, name="jobs", workers=2, max_pending=50, per_key=1, keep=500):
+        self.name = name
+        self.max_pending = max_pending
+        self.per_key = per_key
+        self.keep = keep
+        self._cond = threading.Condition()
+        self._pending = []                 # queued job records, oldest first
+        self._running = {}                 # key -> number of running jobs
+        self._jobs = OrderedDict()         # job id -> record, in submission order
+        self._finished = 0
+        self._closed = False
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, func, *args, **kwargs):
+        """Queue func(*args, **kwargs); returns the job id"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "key": key,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._cond:
+            if len(self._pending) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise QueueFull(f"{self.name}: {len(self._pending)} jobs already queued")
+            job["call"] = (func, args, kwargs)
+            self._pending.append(job)
+            self._jobs[job["id"]] = job
+            self.stats["submitted"] += 1
+            self._cond.notify()
+        return job["id"]
+
+    def get(self, job_id):
+        """Public fields of a job, None if unknown or already forgotten"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            record = {k: v for k, v in job.items() if k != "call"}
+            if job["status"] == "queued":
+                record["position"] = self._pending.index(job)
+            return record
+
+    def metrics(self):
+        with self._cond:
+            waits = [time.time() - job["submitted_at"] for job in self._pending]
+            return {
+                "workers": len(self._threads),
+                "queued": len(self._pending),
+                "max_pending": self.max_pending,
+                "running": sum(self._running.values()),
+                "running_by_key": dict(self._running),
+                "oldest_queued_secs": max(waits) if waits else 0.0,
+                **self.stats,
+            }
+
+    def _next(self):
+        with self._cond:
+            while not self._closed:
+                for i, job in enumerate(self._pending):
+                    if self._running.get(job["key"], 0) < self.per_key:
+                        del self._pending[i]
+                        self._running[job["key"]] = self._running.get(job["key"], 0) + 1
+                        job["status"] = "running"
+                        job["started_at"] = time.time()
+                        return job
+                self._cond.wait()
+            return None
+
+    def _done(self, job, result=None, error=None):
+        with self._cond:
+            job["status"] = "failed" if error is not None else "done"
+            job["result"], job["error"] = result, error
+            job["finished_at"] = time.time()
+            job.pop("call", None)
+            self.stats["failed" if error is not None else "completed"] += 1
+            self._running[job["key"]] -= 1
+            if not self._running[job["key"]]:
+                del self._running[job["key"]]
+            self._finished += 1
+            # Forget the oldest finished jobs; queued and running ones are always kept
+            while self._finished > self.keep:
+                old_id = next(i for i, old in self._jobs.items() if old["status"] in ("done", "failed"))
+                del self._jobs[old_id]
+                self._finished -= 1
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            func, args, kwargs = job["call"]
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"{self.name}: job {job['id']} ({job['key']}) failed: {e}")
+                self._done(job, error=str(e))
+            else:
+                self._done(job, result=result)
+
+    def close(self):
+        """Stop the workers once their current job is done; queued jobs are dropped"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
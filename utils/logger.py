@@ -1,9 +1,50 @@
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+import time
+from logging.handlers import QueueHandler, RotatingFileHandler
 
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+THROTTLE = {"throttle": True}   # extra= for chatty INFO monitoring lines, see ThrottleFilter
+
+
+class _BatchFlush:
+    """
+    Mixin for StreamHandler subclasses: emit_batch() writes a batch of records
+    and flushes the stream once instead of after every record.
+    """
+    _deferred = False
+
+    def flush(self):
+        if not self._deferred:
+            super().flush()
+
+    def emit_batch(self, records):
+        self.acquire()
+        try:
+            self._deferred = True
+            try:
+                for record in records:
+                    self.handle(record)
+            finally:
+                self._deferred = False
+            self.flush()
+        finally:
+            self.release()
+
+
+class BatchedStreamHandler(_BatchFlush, logging.StreamHandler):
+    pass
+
+
+class BatchedFileHandler(_BatchFlush, logging.FileHandler):
+    pass
+
+
+class BatchedRotatingFileHandler(_BatchFlush, RotatingFileHandler):
+    pass
 
 
 def setup_logger(name: str,
@@ -29,7 +70,7 @@ def setup_logger(name: str,
     # Prevent duplicate handlers if setup repeated
     if not logger.handlers:
         # Console handler
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = BatchedStreamHandler(sys.stdout)
         console_handler.setLevel(level)
         console_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
         console_handler.setFormatter(console_formatter)
@@ -38,9 +79,9 @@ def setup_logger(name: str,
         # File handler (optional)
         if log_file:
             if rotate:
-                file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+                file_handler = BatchedRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
             else:
-                file_handler = logging.FileHandler(log_file)
+                file_handler = BatchedFileHandler(log_file)
             file_handler.setLevel(level)
             file_formatter = logging.Formatter(LOG_FORMAT, DATE_FORMAT)
             file_handler.setFormatter(file_formatter)
@@ -57,3 +98,164 @@ def get_logger(name: str = __name__, **kwargs) -> logging.Logger:
         logger = get_logger(__name__, log_file='app.log', rotate=True)
     """
     return setup_logger(name, **kwargs)
+
+
+class ThrottleFilter(logging.Filter):
+    """
+    Per call site token bucket for chatty records: those at or below 'level'
+    and monitoring lines logged with extra=THROTTLE.
+
+    Each logging call site (logger name, file, line) may emit 'rate' records
+    per second with bursts of 'burst'; beyond that only every 'sample'-th
+    record gets through (0 drops them all). The next record that passes
+    carries the count of what was suppressed in its 'suppressed' attribute,
+    which the async logging queue appends to the message. Only DEBUG is
+    throttled by default, so order and trade records are never dropped.
+    """
+    def __init__(self, rate=5.0, burst=20, level=logging.DEBUG, sample=0):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.level = level
+        self.sample = sample
+        self._buckets = {}   # call site -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno > self.level and not getattr(record, "throttle", False):
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                bucket = self._buckets[site] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                if not (self.sample and (bucket[2] + 1) % self.sample == 0):
+                    bucket[2] += 1
+                    self.suppressed += 1
+                    return False
+            else:
+                bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # prepare() works on a copy, so other handlers of the record never see the note
+        record = super().prepare(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            record.msg = record.message = f"{record.message} [{suppressed} similar suppressed]"
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingLogListener:
+    """
+    Background writer for records queued by a QueueHandler. It drains up to
+    max_batch records at a time and hands each handler the whole batch:
+    handlers with emit_batch() (batched file/stream handlers, RedisLogHandler)
+    write it in one go, others get handle() per record.
+    """
+    _STOP = object()
+
+    def __init__(self, log_queue, handlers, max_batch=500):
+        self.queue = log_queue
+        self.handlers = list(handlers)
+        self.max_batch = max_batch
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is self._STOP:
+                batch.pop()
+                stopping = True
+            self._dispatch(batch)
+
+    def _dispatch(self, records):
+        for handler in self.handlers:
+            selected = [rec for rec in records if rec.levelno >= handler.level]
+            if not selected:
+                continue
+            try:
+                if hasattr(handler, "emit_batch"):
+                    handler.emit_batch(selected)
+                else:
+                    for record in selected:
+                        handler.handle(record)
+            except Exception:
+                handler.handleError(selected[-1])
+
+    def stop(self, timeout=5):
+        # Blocking put: the stop marker must not be dropped when the queue is full
+        self.queue.put(self._STOP)
+        self._thread.join(timeout)
+
+
+_listeners = {}
+
+
+def start_async_logging(name: str = "root",
+                        queue_size: int = 10000,
+                        throttle: logging.Filter = None) -> BatchingLogListener:
+    """
+    Move the handlers of logger 'name' behind an in-memory queue so logging
+    calls only enqueue the record. Call after all handlers have been added.
+    'throttle' (e.g. ThrottleFilter()) is applied before enqueueing.
+    """
+    logger = logging.getLogger(name)
+    if name in _listeners:
+        return _listeners[name]
+    handlers = list(logger.handlers)
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    if throttle is not None:
+        queue_handler.addFilter(throttle)
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+
+    listener = _listeners[name] = BatchingLogListener(log_queue, handlers)
+    listener.start()
+    return listener
+
+
+def stop_async_logging(name: str = "root"):
+    """Flush queued records and put the original handlers back on the logger"""
+    listener = _listeners.pop(name, None)
+    if listener is None:
+        return
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DroppingQueueHandler):
+            logger.removeHandler(handler)
+    listener.stop()
+    for handler in listener.handlers:
+        logger.addHandler(handler)
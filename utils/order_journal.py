@@ -0,0 +1,270 @@
+"""
+Append-only journal of order intents, broker order IDs, slices, status changes and fills
+"""
+import os
+import json
+import threading
+import logging
+from collections import deque
+from utils.clock import get_clock
+
+logger = logging.getLogger("root")
+
+JOURNAL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "journal")
+
+
+def journal_path(instance, day=None, journal_dir=JOURNAL_DIR):
+    """Return the journal file for a strategy instance and trading day"""
+    day = day or get_clock().now().date()
+    return os.path.join(journal_dir, f"{instance}_{day:%Y%m%d}.jsonl")
+
+
+def apply_fill(positions_dict, closed_pnls_list, tradingsymbol, transaction_type, quantity, price):
+    """
+    Apply a fill to a { tradingsymbol: {'quantity', 'avg_price'} } ledger.
+    Realized PnL of any closed quantity is appended to closed_pnls_list.
+    Returns the new (quantity, avg_price) for the symbol.
+    """
+    pos = positions_dict.get(tradingsymbol, {'quantity': 0, 'avg_price': 0.0})
+    qty, avg = pos['quantity'], pos['avg_price']
+
+    if transaction_type == "BUY":
+        if qty >= 0:
+            new_qty = qty + quantity
+            new_avg = ((qty * avg) + (quantity * price)) / new_qty
+        else:
+            cover_qty = min(quantity, -qty)
+            pnl = (avg - price) * cover_qty
+            closed_pnls_list.append(pnl)
+
+            if quantity > -qty:
+                new_qty = quantity + qty      # qty is negative
+                new_avg = price               # new long basis = this price
+            else:
+                new_qty = qty + quantity
+                new_avg = avg
+
+    else:  # SELL
+        if qty <= 0:
+            new_qty = qty - quantity      # more negative
+            total_shorts = -qty + quantity
+            new_avg = ((-qty * avg) + (quantity * price)) / total_shorts
+        else:
+            # unwinding long
+            close_qty = min(quantity, qty)
+            pnl = (price - avg) * close_qty
+            closed_pnls_list.append(pnl)
+
+            if quantity > qty:
+                # flipped from long to net short
+                new_qty = qty - quantity      # negative
+                new_avg = price               # new short basis = this price
+            else:
+                # still long
+                new_qty = qty - quantity
+                new_avg = avg
+
+    if new_qty == 0:
+        positions_dict.pop(tradingsymbol, None)
+    else:
+        positions_dict[tradingsymbol] = {
+            'quantity': new_qty,
+            'avg_price': new_avg
+        }
+
+    return new_qty, new_avg
+
+
+class OrderJournal:
+    """
+    Append-only JSON-lines journal written by KiteTrader.
+
+    append() only serialises the record and queues it; a background thread writes
+    queued records and fsyncs them in batches every flush_interval seconds, so the
+    order path never waits on disk.
+    """
+    def __init__(self, path, flush_interval=0.2):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending = deque()
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Continue the sequence from an existing journal for the same day
+        if os.path.exists(path):
+            self._seq = JournalReader(path).last_seq
+
+        self._fh = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, event, **fields):
+        """Queue a journal record and return its sequence number"""
+        # Numbered and queued together, so the file is always in seq order
+        with self._seq_lock:
+            self._seq += 1
+            seq = self._seq
+            record = {"seq": seq, "ts": get_clock().time(), "ev": event}
+            record.update(fields)
+            self._pending.append(json.dumps(record, separators=(",", ":"), default=str))
+        return seq
+
+    @property
+    def last_seq(self):
+        """Sequence number of the last record appended, written yet or not"""
+        with self._seq_lock:
+            return self._seq
+
+    def flush(self):
+        """Write and fsync every queued record"""
+        with self._write_lock:
+            if not self._pending or self._fh.closed:
+                return
+            lines = []
+            while self._pending:
+                lines.append(self._pending.popleft())
+            try:
+                self._fh.write("\n".join(lines) + "\n")
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+            except Exception as e:
+                logger.error(f"Order journal write failed for {self.path}: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background writer after a final flush"""
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self.flush()
+        with self._write_lock:
+            self._fh.close()
+
+
+class JournalReader:
+    """
+    Indexed reader over a journal file.
+
+    Records are indexed by broker order ID, intent ID and tradingsymbol so the
+    strategy ledger and the set of order IDs placed by this script can be
+    rebuilt without touching the broker.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        self.orders = {}        # order_id -> {intent_id, symbol, side, quantity, strategy, status, fills}
+        self.intents = {}       # intent_id -> intent record + order_ids
+        self.by_symbol = {}     # tradingsymbol -> [records]
+        self.corrections = {}   # order_id -> latest fill_correction from the reconciler
+        self.failed_orders = {} # seq -> order record whose placement raised, until matched to a broker order
+        self.last_seq = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write is skipped
+                    logger.warning(f"Skipping unreadable journal line in {self.path}")
+                    continue
+                self._index(rec)
+
+    def _index(self, rec):
+        self.records.append(rec)
+        self.last_seq = max(self.last_seq, rec.get("seq", 0))
+        ev = rec.get("ev")
+        sym = rec.get("symbol")
+        if sym:
+            self.by_symbol.setdefault(sym, []).append(rec)
+
+        if ev == "intent":
+            self.intents[rec["intent_id"]] = dict(rec, order_ids=[])
+        elif ev == "order":
+            order_id = rec.get("order_id")
+            if order_id is None:
+                self.failed_orders[rec["seq"]] = rec
+                return
+            self.failed_orders.pop(rec.get("attempt_seq"), None)
+            self.orders[order_id] = {
+                "intent_id": rec.get("intent_id"),
+                "symbol": sym,
+                "side": rec.get("side"),
+                "quantity": rec.get("quantity"),
+                "strategy": rec.get("strategy"),
+                "status": "OPEN",
+                "fills": [],
+            }
+            intent = self.intents.get(rec.get("intent_id"))
+            if intent is not None:
+                intent["order_ids"].append(order_id)
+        elif ev == "status":
+            order = self.orders.get(rec.get("order_id"))
+            if order is not None:
+                order["status"] = rec.get("status")
+        elif ev == "fill":
+            order = self.orders.get(rec.get("order_id"))
+            if order is not None:
+                order["fills"].append(rec)
+                order["status"] = "COMPLETE"
+        elif ev == "fill_correction":
+            self.corrections[rec["order_id"]] = rec
+            order = self.orders.get(rec["order_id"])
+            if order is not None:
+                order["status"] = rec.get("status", order["status"])
+
+    def own_order_ids(self, strategy=None):
+        """Broker order IDs placed by this script, optionally for one strategy"""
+        return {
+            oid for oid, o in self.orders.items()
+            if strategy is None or o.get("strategy") == strategy
+        }
+
+    def rebuild_ledger(self):
+        """
+        Replay fills and ledger resets into per-strategy positions.
+        A fill_correction replaces the journaled fill of its order in place; for an
+        order that never recorded a fill it is applied where the correction was made.
+        Returns {strategy: {'positions': {...}, 'closed_pnls': [...]}, 'day_pnl': float}
+        """
+        ledger = {
+            "BATMAN": {"positions": {}, "closed_pnls": []},
+            "DEBIT_SPREAD": {"positions": {}, "closed_pnls": []},
+        }
+        day_pnl = 0.0
+        applied = set()
+        for rec in self.records:
+            ev = rec.get("ev")
+            if ev in ("fill", "fill_correction"):
+                order_id = rec.get("order_id")
+                if order_id in applied:
+                    continue
+                fill = self.corrections.get(order_id, rec)
+                if ev == "fill_correction" and fill is not rec:
+                    # an older correction superseded by a later one for the same order
+                    continue
+                if order_id is not None:
+                    applied.add(order_id)
+                if fill["quantity"] <= 0:
+                    continue
+                book = ledger.setdefault(fill["strategy"], {"positions": {}, "closed_pnls": []})
+                apply_fill(book["positions"], book["closed_pnls"],
+                           fill["symbol"], fill["side"], fill["quantity"], fill["price"])
+            elif ev == "ledger_reset":
+                book = ledger.setdefault(rec["strategy"], {"positions": {}, "closed_pnls": []})
+                book["positions"].clear()
+                book["closed_pnls"].clear()
+                day_pnl = rec.get("day_pnl", day_pnl)
+        ledger["day_pnl"] = day_pnl
+        return ledger
@@ -0,0 +1,97 @@
+"""
+Process-wide Redis client factory: one bounded connection pool per Redis
+server, with socket timeouts and keepalive so a hung connection cannot block a
+trading thread forever.
+
+Settings come from the environment:
+    REDIS_HOST, REDIS_PORT, REDIS_DB       TCP server (default localhost:6379/0)
+    REDIS_SOCKET                           unix socket path; preferred for same-host Redis
+    REDIS_SOCKET_TIMEOUT                   seconds per command (default 5)
+    REDIS_CONNECT_TIMEOUT                  seconds to connect (default 2)
+    REDIS_MAX_CONNECTIONS                  pool size (default 64)
+"""
+import os
+import socket
+import time
+import threading
+import redis
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+REDIS_SOCKET = os.getenv("REDIS_SOCKET")
+SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+POOL_TIMEOUT = 5              # seconds to wait for a free pooled connection
+HEALTH_CHECK_INTERVAL = 30    # PING connections idle for longer than this before reuse
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _keepalive_options():
+    # Probe an idle TCP connection after 30s, every 10s, give up after 3 misses
+    options = {}
+    for name, value in (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3)):
+        if hasattr(socket, name):
+            options[getattr(socket, name)] = value
+    return options
+
+
+def _build_pool(host, port, db, unix_socket):
+    common = dict(
+        db=db,
+        socket_timeout=SOCKET_TIMEOUT,
+        socket_connect_timeout=CONNECT_TIMEOUT,
+        health_check_interval=HEALTH_CHECK_INTERVAL,
+        max_connections=MAX_CONNECTIONS,
+        timeout=POOL_TIMEOUT,
+    )
+    if unix_socket:
+        return redis.BlockingConnectionPool(
+            connection_class=redis.UnixDomainSocketConnection, path=unix_socket, **common)
+    return redis.BlockingConnectionPool(
+        host=host, port=port, socket_keepalive=True,
+        socket_keepalive_options=_keepalive_options(), **common)
+
+
+def get_redis(host=None, port=None, db=None, unix_socket=None):
+    """
+    Shared client for a Redis server; the environment defaults when called
+    without arguments. Clients are thread-safe and share one pool per server.
+    """
+    if host is None and port is None and unix_socket is None:
+        unix_socket = REDIS_SOCKET
+    key = (unix_socket,) if unix_socket else (host or REDIS_HOST, port or REDIS_PORT)
+    key += (REDIS_DB if db is None else db,)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if unix_socket:
+                pool = _build_pool(None, None, key[1], unix_socket)
+            else:
+                pool = _build_pool(key[0], key[1], key[2], None)
+            client = _clients[key] = redis.Redis(connection_pool=pool)
+        return client
+
+
+def pool_stats(client=None):
+    """Connection counts of a client's pool (the default client if none given)"""
+    pool = (client or get_redis()).connection_pool
+    created = len(getattr(pool, "_connections", ()))
+    idle = sum(1 for conn in getattr(getattr(pool, "pool", None), "queue", ()) if conn is not None)
+    return {
+        "max_connections": pool.max_connections,
+        "created": created,
+        "idle": idle,
+        "in_use": created - idle,
+    }
+
+
+def ping(client=None):
+    """Round-trip latency to Redis in milliseconds; raises if Redis is unreachable"""
+    client = client or get_redis()
+    started = time.perf_counter()
+    client.ping()
+    return (time.perf_counter() - started) * 1000
@@ -1,49 +1,201 @@
 """
 Redis-based configuration reader for strategy parameters
 """
-import redis
+from utils.redis_client import get_redis
 import json
+import time
+import logging
+import threading
 from typing import Any, Optional, Union
 import datetime
 
+logger = logging.getLogger("root")
+
+INPUT_PREFIX = "strategy:input:"
+CONFIG_VERSION_KEY = "strategy:config_version"
+CONFIG_CHANNEL = "strategy:config_changed"
+CONFIG_KEYS = [
+    'index', 'expiry', 'Quantity', 'QtyHedgeRatio','PivotRangeMinutes', 'ShiftThresholdPts',
+    'StraddleGapPct', 'HedgeGapPct', 'OrderBufferPct', 'FillTimeoutSec',
+    'RmsCap', 'TrailStopLossToggle', 'ConsoleVerbosity', 'StopLossBufferPct',
+    'SegregateTrades', 'TargetPnl', 'ExitPnl', 'RollingValue', 'BarSource',
+    'IntrabarStops', 'StopCheckIntervalSec'
+]
+
+
+def input_prefix(instance=None):
+    """Key prefix of the shared strategy inputs, or of one instance's own inputs"""
+    return f"strategy:{instance}:input:" if instance else INPUT_PREFIX
+
+
+def write_config(redis_client, key, value, instance=None):
+    """Store one strategy input, bump the config version and notify watching readers"""
+    pipe = redis_client.pipeline()
+    pipe.set(input_prefix(instance) + key, json.dumps(value))
+    pipe.incr(CONFIG_VERSION_KEY)
+    pipe.publish(CONFIG_CHANNEL, f"{instance}:{key}" if instance else key)
+    pipe.execute()
+
+
+def _decode(raw):
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw.decode('utf-8') if isinstance(raw, bytes) else raw
+
+
+def _convert(value, type):
+    if type is bool:
+        if isinstance(value, bool):
+            return value
+        return str(value).lower() in ('true', '1', 'yes', 'on')
+    elif type is int:
+        return int(value)
+    elif type is float:
+        return float(value)
+    elif type is datetime.date:
+        return datetime.datetime.strptime(str(value), "%Y-%m-%d").date()
+    elif type is datetime.time:
+        return datetime.datetime.strptime(str(value), "%H:%M").time()
+    else:
+        return str(value)
+
+
 class RedisConfigReader:
     """
-    Configuration reader that fetches strategy parameters from Redis
+    Configuration reader that fetches strategy parameters from Redis.
+
+    All inputs are loaded with one pipelined GET (version) + MGET into a local
+    snapshot, and reads are served from it. With watch=True a background
+    subscriber to the config channel reloads it as soon as write_config()
+    publishes. Either way it is also reloaded when older than
+    revalidate_secs, which catches inputs written without write_config()
+    (redis-cli, clear_redis.py, an older backend) that bump no version and
+    publish nothing. Callbacks registered with on_change(callback) get the
+    reloaded config, and 'generation' counts the loads that changed it.
+
+    Inputs set for a single instance (strategy:<instance>:input:*) are loaded
+    in the same MGET once get_instance_config(instance) has been asked for.
     """
-    def __init__(self, redis_host='localhost', redis_port=6379, redis_db=0):
-        self.r = redis.Redis(host=redis_host, port=redis_port, db=redis_db)
-        self.prefix = "strategy:input:"
-    
+    def __init__(self, redis_host=None, redis_port=None, redis_db=None, redis_client=None,
+                 watch=False, revalidate_secs=5.0):
+        self.r = redis_client or get_redis(redis_host, redis_port, redis_db)
+        self.prefix = INPUT_PREFIX
+        self.revalidate_secs = revalidate_secs
+        self.lock = threading.Lock()
+        self.listeners = []
+        self._snapshot = None
+        self._instances = []
+        self._layers = {}          # instance -> its own inputs
+        self._typed = (None, {})   # conversions cached for one snapshot
+        self._version = None
+        self._loaded = None        # (config, layers) of the last load, kept across invalidate()
+        self._generation = 0
+        self._checked = 0.0
+        if watch:
+            self.start_watch()
+
+    @property
+    def version(self):
+        """Config version the current snapshot was loaded at"""
+        self.snapshot()
+        return self._version
+
+    @property
+    def generation(self):
+        """Bumped whenever a reload finds different inputs, whether or not the version moved"""
+        self.snapshot()
+        return self._generation
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def _load(self):
+        with self.lock:
+            instances = list(self._instances)
+        prefixes = [self.prefix] + [input_prefix(name) for name in instances]
+        pipe = self.r.pipeline(transaction=False)
+        pipe.get(CONFIG_VERSION_KEY)
+        pipe.mget([prefix + key for prefix in prefixes for key in CONFIG_KEYS])
+        version, values = pipe.execute()
+        parsed = []
+        for i in range(len(prefixes)):
+            chunk = values[i * len(CONFIG_KEYS):(i + 1) * len(CONFIG_KEYS)]
+            parsed.append({key: _decode(raw) for key, raw in zip(CONFIG_KEYS, chunk) if raw})
+        config, layers = parsed[0], dict(zip(instances, parsed[1:]))
+        with self.lock:
+            loaded = (config, {name: layer for name, layer in layers.items() if layer})
+            changed = self._loaded is not None and loaded != self._loaded
+            if changed or self._loaded is None:
+                self._generation += 1
+            self._loaded = loaded
+            self._snapshot, self._typed = config, (config, {})
+            self._layers = layers
+            self._version = int(version or 0)
+            self._checked = time.monotonic()
+        if changed:
+            for callback in self.listeners:
+                try:
+                    callback(dict(config))
+                except Exception as e:
+                    logger.error(f"Config change listener error: {e}")
+        return config
+
+    def snapshot(self) -> dict:
+        """Current config, reloaded only when it may have changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self._load()
+        if time.monotonic() - self._checked >= self.revalidate_secs:
+            return self._load()
+        return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def start_watch(self):
+        """Subscribe to config change notifications on a daemon thread"""
+        threading.Thread(target=self._watch, name="config-watch", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CONFIG_CHANNEL)
+                # Changes made while not subscribed are picked up by the reload
+                self._load()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._load()
+            except Exception as e:
+                logger.error(f"Config watch error, resubscribing: {e}")
+                self.invalidate()
+                time.sleep(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
     def get(self, key: str, fallback: Optional[Any] = None, type: Union[type, None] = str) -> Any:
         """
-        Retrieve a value from Redis and convert to the requested type.
+        Retrieve a value and convert to the requested type.
         """
         try:
-            raw = self.r.get(self.prefix + key)
-            if raw is None:
+            if key not in CONFIG_KEYS:
+                raw = self.r.get(self.prefix + key)
+                return fallback if raw is None else _convert(_decode(raw), type)
+
+            snapshot = self.snapshot()
+            if key not in snapshot:
                 return fallback
-            
-            # Parse JSON value
-            try:
-                value = json.loads(raw)
-            except json.JSONDecodeError:
-                value = raw.decode('utf-8') if isinstance(raw, bytes) else raw
-            
-            # Convert to requested type
-            if type is bool:
-                if isinstance(value, bool):
-                    return value
-                return str(value).lower() in ('true', '1', 'yes', 'on')
-            elif type is int:
-                return int(value)
-            elif type is float:
-                return float(value)
-            elif type is datetime.date:
-                return datetime.datetime.strptime(str(value), "%Y-%m-%d").date()
-            elif type is datetime.time:
-                return datetime.datetime.strptime(str(value), "%H:%M").time()
-            else:
-                return str(value)
+            typed_for, typed = self._typed
+            if typed_for is not snapshot:   # reloaded meanwhile
+                return _convert(snapshot[key], type)
+            if (key, type) not in typed:
+                typed[(key, type)] = _convert(snapshot[key], type)
+            return typed[(key, type)]
                 
         except Exception as e:
             print(f"Error reading config key '{key}': {e}")
@@ -53,30 +205,25 @@ class RedisConfigReader:
         """
         Get all strategy configuration parameters
         """
-        config = {}
-        keys = [
-            'index', 'expiry', 'Quantity', 'QtyHedgeRatio','PivotRangeMinutes', 'ShiftThresholdPts',
-            'StraddleGapPct', 'HedgeGapPct', 'OrderBufferPct', 'FillTimeoutSec',
-            'RmsCap', 'TrailStopLossToggle', 'ConsoleVerbosity', 'StopLossBufferPct',
-            'SegregateTrades', 'TargetPnl', 'ExitPnl', 'RollingValue'
-        ]
-        
-        for key in keys:
-            raw = self.r.get(self.prefix + key)
-            if raw:
-                try:
-                    config[key] = json.loads(raw)
-                except json.JSONDecodeError:
-                    config[key] = raw.decode('utf-8') if isinstance(raw, bytes) else raw
-        
-        return config
+        return dict(self.snapshot())
+
+    def get_instance_config(self, instance) -> dict:
+        """
+        Inputs set for one instance only; they take precedence over the shared ones
+        """
+        with self.lock:
+            added = instance not in self._instances
+            if added:
+                self._instances.append(instance)
+        if added:
+            self._load()
+        self.snapshot()
+        with self.lock:
+            return dict(self._layers.get(instance, {}))
     
     def is_config_available(self) -> bool:
         """
         Check if configuration is available in Redis
         """
         essential_keys = ['index', 'Quantity']
-        for key in essential_keys:
-            if not self.r.exists(self.prefix + key):
-                return False
-        return True
+        return all(key in self.snapshot() for key in essential_keys)
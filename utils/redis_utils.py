@@ -1,48 +1,213 @@
 import logging
 import time
-import json
 import os
 import redis
+from utils.status_publisher import get_status_publisher, UPDATES_CHANNEL, update_notice
+from utils.redis_client import pool_stats
+from utils.serializer import dumps, loads
+
+def instance_key(name, instance=None):
+    """Key of a runtime item (trading_status, logs, ...), under strategy:<instance>: when given one"""
+    return f"strategy:{instance}:{name}" if instance else f"strategy:{name}"
+
+
+class InstanceRedis:
+    """
+    Redis client bound to a strategy instance. It behaves exactly like the
+    wrapped client; the status, action, heartbeat and log helpers in this
+    module write under strategy:<instance>:* when handed one.
+    """
+    def __init__(self, client, instance):
+        self.client = client
+        self.instance = instance
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def for_instance(redis_client, instance):
+    """Client whose status writes are namespaced to 'instance' (the shared keys if None)"""
+    base = base_client(redis_client)
+    return InstanceRedis(base, instance) if instance else base
+
+
+def base_client(redis_client):
+    return redis_client.client if isinstance(redis_client, InstanceRedis) else redis_client
+
+
+def _key(redis_client, name):
+    instance = redis_client.instance if isinstance(redis_client, InstanceRedis) else None
+    return instance_key(name, instance)
+
+
+def instance_thread_name(instance, role):
+    """Thread name that ties the thread's log records to a strategy instance"""
+    return f"{instance}:{role}"
+
+
+def thread_instance(thread_name):
+    """Inverse of instance_thread_name; None for threads not owned by an instance"""
+    instance, sep, _ = (thread_name or "").partition(":")
+    return instance if sep else None
+
+
+def encode_fields(fields, key=None):
+    """Encode each value of a hash mapping with the codec of 'key'"""
+    return {field: dumps(value, key) for field, value in fields.items()}
+
+
+def decode_hash(raw):
+    """Inverse of encode_fields for an HGETALL reply"""
+    decoded = {}
+    for field, value in raw.items():
+        field = field.decode('utf-8') if isinstance(field, bytes) else field
+        try:
+            decoded[field] = loads(value)
+        except (ValueError, TypeError):
+            decoded[field] = value.decode('utf-8') if isinstance(value, bytes) else value
+    return decoded
+
+
+def hset_fields(redis_client, key, fields):
+    """HSET encoded fields; replaces a pre-hash JSON string stored under the same key"""
+    try:
+        redis_client.hset(key, mapping=encode_fields(fields, key))
+    except redis.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+        redis_client.delete(key)
+        redis_client.hset(key, mapping=encode_fields(fields, key))
+
+
+LOG_MAXLEN = 1000      # entries kept per log stream (approximately)
+ACTION_MAXLEN = 500    # entries kept per action history stream (approximately)
+
+
+def append_entry(redis_client, key, value, maxlen):
+    """XADD one encoded entry to a capped stream; replaces a list written under the same key by an older version"""
+    try:
+        return redis_client.xadd(key, {"data": dumps(value, key)}, maxlen=maxlen, approximate=True)
+    except redis.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+        redis_client.delete(key)
+        return redis_client.xadd(key, {"data": dumps(value, key)}, maxlen=maxlen, approximate=True)
+
+
+def decode_entries(raw):
+    """Values of XRANGE/XREVRANGE entries, each with its stream id as "id"; undecodable entries are skipped"""
+    entries = []
+    for entry_id, fields in raw:
+        try:
+            value = loads(fields.get(b"data") or fields.get("data"))
+        except (ValueError, TypeError):
+            continue
+        if isinstance(value, dict):
+            value["id"] = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+        entries.append(value)
+    return entries
+
+
+def read_entries(redis_client, key, since=None, limit=50):
+    """
+    (entries newest first, cursor) of a log or action stream: the latest
+    'limit' entries, or with since=<cursor> only the oldest 'limit' entries
+    added after it. Pass the returned cursor as 'since' on the next call.
+    """
+    try:
+        if since:
+            raw = redis_client.xrange(key, min=f"({since}", max="+", count=limit)
+            raw.reverse()
+        else:
+            raw = redis_client.xrevrange(key, max="+", min="-", count=limit)
+    except redis.ResponseError:
+        # List written by an older version; it has no ids to resume from
+        entries = []
+        for item in redis_client.lrange(key, 0, limit - 1):
+            try:
+                entries.append(loads(item))
+            except (ValueError, TypeError):
+                continue
+        return entries, None
+    entries = decode_entries(raw)
+    if raw:
+        newest = raw[0][0]
+        since = newest.decode() if isinstance(newest, bytes) else newest
+    return entries, since
+
+
+def read_trading_status(redis_client, instance=None):
+    """All trading status fields as a dict, empty if nothing has been published"""
+    key = instance_key("trading_status", instance)
+    try:
+        return decode_hash(redis_client.hgetall(key))
+    except redis.ResponseError:
+        raw = redis_client.get(key)   # JSON blob written by an older version
+        return loads(raw) if raw else {}
+
 
 class RedisLogHandler(logging.Handler):
-    def __init__(self, redis_client, key='strategy:logs'):
+    """
+    Appends records to the shared strategy:logs stream and, for records logged
+    from an instance's threads (see instance_thread_name), to strategy:<instance>:logs.
+    """
+    def __init__(self, redis_client, key='strategy:logs', maxlen=LOG_MAXLEN):
         super().__init__()
         self.redis_client = redis_client
         self.key = key
+        self.maxlen = maxlen
         
+    def _entry(self, record):
+        return dumps({
+            'timestamp': record.created,
+            'level': record.levelname,
+            'message': self.format(record),
+            'logger': record.name
+        }, self.key)
+
     def emit(self, record):
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        """XADD a batch of records and publish an update notice, in one round trip"""
         try:
-            log_entry = {
-                'timestamp': time.time(),
-                'level': record.levelname,
-                'message': self.format(record),
-                'logger': record.name
-            }
-            self.redis_client.lpush(self.key, json.dumps(log_entry))
-            self.redis_client.ltrim(self.key, 0, 99)
+            streams = {}
+            for record in records[-self.maxlen:]:
+                entry = self._entry(record)
+                streams.setdefault(self.key, []).append(entry)
+                instance = thread_instance(record.threadName)
+                if instance:
+                    streams.setdefault(instance_key("logs", instance), []).append(entry)
+            pipe = self.redis_client.pipeline(transaction=False)
+            keys = []
+            for key, entries in streams.items():
+                for entry in entries:
+                    pipe.xadd(key, {"data": entry}, maxlen=self.maxlen, approximate=True)
+                    keys.append(key)
+            pipe.publish(UPDATES_CHANNEL, update_notice({key: len(entries) for key, entries in streams.items()}))
+            results = pipe.execute(raise_on_error=False)
+            # A list written by an older version still holds the key; the next batch recreates it as a stream
+            for key in {key for key, result in zip(keys, results)
+                        if isinstance(result, Exception) and "WRONGTYPE" in str(result)}:
+                self.redis_client.delete(key)
         except Exception:
             pass
 
-def check_control_signal(redis_client):
-    """Check Redis for control signals from the backend"""
-    try:
-        control_signal = redis_client.get("strategy:control")
-        if control_signal:
-            control_data = json.loads(control_signal)
-            return control_data.get("action"), control_data
-    except Exception:
-        pass
-    return None, None
-
-def send_heartbeat(redis_client):
+def send_heartbeat(redis_client, status="alive", **fields):
     """Send heartbeat to Redis to indicate strategy is running"""
     try:
         heartbeat_data = {
             "timestamp": time.time(),
-            "status": "alive",
-            "process_id": os.getpid() if 'os' in globals() else None
+            "status": status,
+            "process_id": os.getpid() if 'os' in globals() else None,
+            "redis_pool": pool_stats(redis_client),
+            **fields
         }
-        redis_client.set("strategy:heartbeat", json.dumps(heartbeat_data))
+        key = _key(redis_client, "heartbeat")
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.set(key, dumps(heartbeat_data, key))
+        pipe.publish(UPDATES_CHANNEL, update_notice({key: None}))
+        pipe.execute()
     except Exception:
         pass
 
@@ -53,19 +218,18 @@ def update_strategy_status(redis_client, status, message):
         "message": message,
         "timestamp": time.time()
     }
-    redis_client.set("strategy:execution_status", json.dumps(status_data))
+    key = _key(redis_client, "execution_status")
+    publisher = get_status_publisher(base_client(redis_client))
+    if publisher is not None:
+        publisher.set(key, status_data)
+        return
+    redis_client.set(key, dumps(status_data, key))
+    redis_client.publish(UPDATES_CHANNEL, update_notice({key: None}))
 
 
 def update_trading_status(redis_client, symbol, straddle_price=None, vwap=None, pnl_batman=None, pnl_spread=None, positions_data=None, exit_pnl=None):
-    """Incrementally update trading status for frontend display"""
+    """Update only the given trading status fields (one HSET, no read-modify-write)"""
     existing_status = {}
-    try:
-        status_json = redis_client.get("strategy:trading_status")
-        if status_json:
-            existing_status = json.loads(status_json)
-    except Exception:
-        pass
-
     existing_status["timestamp"] = time.time()
     existing_status["symbol"] = symbol
     existing_status["last_update"] = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -83,31 +247,33 @@ def update_trading_status(redis_client, symbol, straddle_price=None, vwap=None,
     if positions_data is not None:
         existing_status["positions_data"] = positions_data
 
-    redis_client.set("strategy:trading_status", json.dumps(existing_status))
+    key = _key(redis_client, "trading_status")
+    publisher = get_status_publisher(base_client(redis_client))
+    if publisher is not None:
+        publisher.hset(key, existing_status)
+        return
+    hset_fields(redis_client, key, existing_status)
+    redis_client.publish(UPDATES_CHANNEL, update_notice({key: None}))
 
 
 def update_strategy_action(redis_client, action, details=None):
     """Update strategy action in Redis for frontend monitoring"""
+    latest_key = _key(redis_client, "latest_action")
+    history_key = _key(redis_client, "action_history")
+    action_data = {
+        "timestamp": time.time(),
+        "action": action,
+        "details": details or {}
+    }
     try:
+        publisher = get_status_publisher(base_client(redis_client))
+        if publisher is not None:
+            publisher.set(latest_key, action_data)
+            publisher.append(history_key, action_data, maxlen=ACTION_MAXLEN)
+            return
 
-        action_data = {
-            "timestamp": time.time(),
-            "action": action,
-            "details": details or {}
-        }
-
-        redis_client.set("strategy:latest_action", json.dumps(action_data))
-        redis_client.lpush("strategy:action_history", json.dumps(action_data))
-        redis_client.ltrim("strategy:action_history", 0, 49)
-
-    except Exception as e:
-        action_data = {
-            "timestamp": time.time(),
-            "action": action,
-            "details": details or {}
-        }
-        redis_client.set("strategy:latest_action", json.dumps(action_data))
-        redis_client.lpush("strategy:action_history", json.dumps(action_data))
-        redis_client.ltrim("strategy:action_history", 0, 49)
-    except Exception as e:
-        pass
\ No newline at end of file
+        redis_client.set(latest_key, dumps(action_data, latest_key))
+        append_entry(redis_client, history_key, action_data, ACTION_MAXLEN)
+        redis_client.publish(UPDATES_CHANNEL, update_notice({latest_key: None, history_key: 1}))
+    except Exception:
+        pass
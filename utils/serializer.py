@@ -0,0 +1,77 @@
+"""
+Encoding of values written to Redis by the strategy and read back by the backend.
+
+High-frequency keys (status, trading status, actions, heartbeats, logs) are
+stored as msgpack when it is installed; everything else, and every key when
+msgpack is missing, is stored as compact JSON (through orjson when installed).
+Binary payloads carry a version tag, so readers decode whatever a key holds
+regardless of their own settings and old plain-JSON values stay readable.
+
+REDIS_CODEC=json forces JSON for all keys (e.g. to inspect keys with
+redis-cli); REDIS_CODEC=msgpack uses msgpack for all keys written through dumps().
+"""
+import os
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TAG = b"\x00"                  # never the first byte of a JSON document
+MSGPACK_TAG = TAG + b"m1"      # codec 'm', format version 1
+HOT_KEYS = {"execution_status", "trading_status", "latest_action", "action_history", "heartbeat", "logs"}
+CODEC = os.getenv("REDIS_CODEC", "auto")
+
+
+def codec_for(key):
+    """Codec new values of 'key' are written with: 'msgpack' or 'json'"""
+    if msgpack is None or CODEC == "json":
+        return "json"
+    if CODEC == "msgpack" or (key or "").rsplit(":", 1)[-1] in HOT_KEYS:
+        return "msgpack"
+    return "json"
+
+
+def _json_dumps(value):
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass   # types orjson refuses (e.g. some numpy scalars) still go through json
+    return json.dumps(value, separators=(",", ":"))
+
+
+def dumps(value, key=None):
+    """Encode a value for 'key'"""
+    if codec_for(key) == "msgpack":
+        try:
+            return MSGPACK_TAG + msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):   # e.g. integers beyond 64 bits
+            pass
+    return _json_dumps(value)
+
+
+def loads(raw):
+    """Decode a value written by dumps() or as plain JSON; raises ValueError if it is neither"""
+    if isinstance(raw, (bytes, bytearray)) and raw[:1] == TAG:
+        tag = bytes(raw[:3])
+        if tag != MSGPACK_TAG:
+            raise ValueError(f"Unknown payload tag {tag!r}")
+        if msgpack is None:
+            raise ValueError("msgpack payload but msgpack is not installed")
+        try:
+            return msgpack.unpackb(raw[3:], raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack payload: {e}")
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except ValueError:
+            pass   # e.g. NaN written by json.dumps
+    return json.loads(raw)
@@ -0,0 +1,197 @@
+"""
+Background publisher for dashboard status keys, so trading threads never wait on Redis
+"""
+import time
+import threading
+import logging
+from collections import deque
+from utils.serializer import dumps
+
+logger = logging.getLogger("root")
+
+UPDATES_CHANNEL = "strategy:updates"   # dashboard change notifications, see utils/update_stream.py
+
+
+def update_notice(changes):
+    """
+    Message announcing changed keys ({key: items pushed, or None}): the key
+    names separated by spaces, 'key#n' for n entries pushed onto a list.
+    """
+    return " ".join(f"{key}#{count}" if count else key for key, count in changes.items())
+
+
+def parse_update_notice(message):
+    """Inverse of update_notice"""
+    if isinstance(message, bytes):
+        message = message.decode("utf-8")
+    changes = {}
+    for token in message.split():
+        key, _, count = token.partition("#")
+        changes[key] = int(count) if count.isdigit() else None
+    return changes
+
+
+class StatusPublisher:
+    """
+    Coalescing writer for status keys.
+
+    Producers only append to a deque (atomic in CPython, no lock taken). A
+    worker drains it at most max_rate times per second, keeps only the latest
+    value per key and the latest value per field for hashes such as
+    trading_status, and writes everything in one non-transactional pipeline.
+    Stream appends (logs, action history) are never coalesced: every entry is
+    XADDed, in order, in the same pipeline, which also publishes one update
+    notice naming every key written. If Redis is slow or down, pending state
+    is kept (still coalesced; at most maxlen entries per stream) and retried
+    on the next flush, so memory stays bounded.
+    """
+    def __init__(self, redis_client, max_rate=10.0):
+        self.redis_client = redis_client
+        self.min_interval = 1.0 / max_rate
+        self._queue = deque()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+
+        self._sets = {}        # key -> serialized value
+        self._hashes = {}      # key -> {field: serialized value}
+        self._appends = {}     # key -> (deque of serialized entries, oldest first; maxlen)
+
+        self.stats = {"enqueued": 0, "flushes": 0, "commands": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="status-publisher", daemon=True)
+        self._thread.start()
+
+    # Values are serialized by the caller so later mutation of live dicts
+    # (e.g. positions) cannot race with the worker.
+    def set(self, key, value):
+        self._enqueue(("set", key, dumps(value, key)))
+
+    def hset(self, key, fields):
+        """HSET some fields of a hash; each value is encoded separately"""
+        self._enqueue(("hset", key, {field: dumps(value, key) for field, value in fields.items()}))
+
+    def append(self, key, value, maxlen):
+        """XADD onto a stream capped at about maxlen entries"""
+        self._enqueue(("append", key, dumps(value, key), maxlen))
+
+    def _enqueue(self, op):
+        self._queue.append(op)
+        self._wake.set()
+
+    def _drain(self):
+        while True:
+            try:
+                op = self._queue.popleft()
+            except IndexError:
+                return
+            self.stats["enqueued"] += 1
+            kind, key = op[0], op[1]
+            if kind == "set":
+                self._sets[key] = op[2]
+            elif kind == "hset":
+                self._hashes.setdefault(key, {}).update(op[2])
+            elif kind == "append":
+                items, _ = self._appends.get(key, (None, None))
+                if items is None:
+                    items = deque(maxlen=op[3])
+                items.append(op[2])
+                self._appends[key] = (items, op[3])
+
+    def flush(self):
+        """Write all pending state now; returns False if Redis rejected the batch"""
+        with self._flush_lock:
+            self._drain()
+            if not (self._sets or self._hashes or self._appends):
+                return True
+            pipe = self.redis_client.pipeline(transaction=False)
+            ops = []   # (kind, key) of each command, to match the results
+            for key, value in self._sets.items():
+                pipe.set(key, value)
+                ops.append(("set", key))
+            for key, fields in self._hashes.items():
+                pipe.hset(key, mapping=fields)
+                ops.append(("hset", key))
+            for key, (items, maxlen) in self._appends.items():
+                for item in items:
+                    pipe.xadd(key, {"data": item}, maxlen=maxlen, approximate=True)
+                    ops.append(("append", key))
+            changes = dict.fromkeys(self._sets)
+            changes.update(dict.fromkeys(self._hashes))
+            changes.update({key: len(items) for key, (items, _) in self._appends.items()})
+            pipe.publish(UPDATES_CHANNEL, update_notice(changes))
+            try:
+                results = pipe.execute(raise_on_error=False)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.debug(f"Status flush failed, will retry: {e}")
+                return False
+
+            retry_hashes, retry_appends, errors = {}, {}, []
+            for (kind, key), result in zip(ops, results):
+                if not isinstance(result, Exception):
+                    continue
+                if "WRONGTYPE" in str(result) and kind == "hset":
+                    retry_hashes[key] = self._hashes[key]
+                elif "WRONGTYPE" in str(result) and kind == "append":
+                    retry_appends[key] = self._appends[key]
+                else:
+                    errors.append(result)
+            # A value of an older version (JSON string, list) still holds the key; replace it on the next flush
+            for key in list(retry_hashes) + list(retry_appends):
+                self.redis_client.delete(key)
+            if errors:
+                self.stats["errors"] += 1
+                logger.debug(f"Status flush had errors: {errors[:3]}")
+
+            self.stats["flushes"] += 1
+            self.stats["commands"] += len(results)
+            self._sets.clear()
+            self._hashes = retry_hashes
+            self._appends = retry_appends
+            if retry_hashes or retry_appends:
+                self._wake.set()
+            return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            started = time.monotonic()
+            if not self.flush():
+                self._stop.wait(1.0)
+                self._wake.set()
+                continue
+            # Bound the flush rate; updates arriving meanwhile are coalesced
+            remaining = self.min_interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=2)
+        self.flush()
+
+
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def start_status_publisher(redis_client, max_rate=10.0):
+    """Route status updates written with this client through a background publisher"""
+    with _publishers_lock:
+        publisher = _publishers.get(id(redis_client))
+        if publisher is None:
+            publisher = _publishers[id(redis_client)] = StatusPublisher(redis_client, max_rate=max_rate)
+        return publisher
+
+
+def get_status_publisher(redis_client):
+    return _publishers.get(id(redis_client))
+
+
+def stop_status_publisher(redis_client):
+    with _publishers_lock:
+        publisher = _publishers.pop(id(redis_client), None)
+    if publisher is not None:
+        publisher.close()
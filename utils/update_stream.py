@@ -0,0 +1,155 @@
+"""
+Live dashboard updates: one Redis subscription to the update notices published
+with every status, trading status, action, heartbeat and log write, shared by
+all connected dashboard streams.
+"""
+import queue
+import time
+import threading
+import logging
+from utils.redis_utils import decode_hash, decode_entries
+from utils.serializer import loads
+from utils.status_publisher import UPDATES_CHANNEL, parse_update_notice
+
+logger = logging.getLogger("root")
+
+RESYNC = "resync"   # sent to a subscriber that missed updates; it should re-read everything
+STREAM_READ_MAX = 1000   # entries read from one stream per batch of notices
+
+
+def parse_key(key):
+    """(instance, name) of a strategy:[<instance>:]<name> key; instance is None for the shared keys"""
+    parts = key.split(":")
+    if len(parts) == 2:
+        return None, parts[1]
+    if len(parts) == 3:
+        return parts[1], parts[2]
+    return None, None
+
+
+class UpdateHub:
+    """
+    Fans update notices out to subscribers as (kind, instance, payload) events.
+
+    For each batch of notices the hub reads the changed keys once, in one
+    pipeline, however many subscribers there are:
+        status          the execution_status value
+        trading_status  every trading status field
+        actions         the actions added since the last read, newest first
+        logs            the log entries added since the last read, newest first
+        heartbeat       the heartbeat value
+    Each subscriber gets a bounded queue; one that falls behind has its backlog
+    replaced with RESYNC instead of slowing down the others.
+    """
+    def __init__(self, redis_client, max_backlog=200):
+        self.redis_client = redis_client
+        self.max_backlog = max_backlog
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._cursors = {}   # stream key -> id of the newest entry read
+
+    def subscribe(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="update-hub", daemon=True)
+                self._thread.start()
+            updates = queue.Queue(maxsize=self.max_backlog)
+            self._subscribers.add(updates)
+            return updates
+
+    def unsubscribe(self, updates):
+        with self._lock:
+            self._subscribers.discard(updates)
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for updates in subscribers:
+            try:
+                updates.put_nowait(event)
+            except queue.Full:
+                try:
+                    while True:
+                        updates.get_nowait()
+                except queue.Empty:
+                    pass
+                updates.put_nowait(RESYNC)
+
+    def _read(self, changes):
+        """Events for a batch of changed keys ({key: items pushed or None})"""
+        wanted = []
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key, count in changes.items():
+            instance, name = parse_key(key)
+            if name in ("execution_status", "heartbeat"):
+                pipe.get(key)
+            elif name == "trading_status":
+                pipe.hgetall(key)
+            elif name in ("action_history", "logs") and count:
+                cursor = self._cursors.get(key)
+                if cursor:
+                    pipe.xrange(key, min=f"({cursor}", max="+", count=STREAM_READ_MAX)
+                else:
+                    pipe.xrevrange(key, max="+", min="-", count=count)
+            else:
+                continue   # latest_action is the newest action_history entry
+            wanted.append((key, instance, name))
+        if not wanted:
+            return []
+
+        events = []
+        for (key, instance, name), raw in zip(wanted, pipe.execute(raise_on_error=False)):
+            if isinstance(raw, Exception) or not raw:
+                continue
+            try:
+                if name == "trading_status":
+                    payload = decode_hash(raw)
+                elif name in ("action_history", "logs"):
+                    if key in self._cursors:
+                        raw.reverse()   # XRANGE is oldest first
+                    newest = raw[0][0]
+                    self._cursors[key] = newest.decode() if isinstance(newest, bytes) else newest
+                    payload = decode_entries(raw)
+                    if not payload:
+                        continue
+                else:
+                    payload = loads(raw)
+            except ValueError:
+                continue
+            kind = {"execution_status": "status", "action_history": "actions"}.get(name, name)
+            events.append((kind, instance, payload))
+        return events
+
+    def _run(self):
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(UPDATES_CHANNEL)
+                # Anything written while not subscribed was missed
+                self._broadcast(RESYNC)
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    # Notices that arrived meanwhile are read together
+                    changes = parse_update_notice(message["data"])
+                    while True:
+                        message = pubsub.get_message(timeout=0)
+                        if message is None:
+                            break
+                        for key, count in parse_update_notice(message["data"]).items():
+                            if count:
+                                changes[key] = (changes.get(key) or 0) + count
+                            else:
+                                changes.setdefault(key, None)
+                    for event in self._read(changes):
+                        self._broadcast(event)
+            except Exception as e:
+                logger.error(f"Update stream error, resubscribing: {e}")
+                time.sleep(1)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
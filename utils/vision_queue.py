@@ -0,0 +1,73 @@
+"""
+Redis queue between the backend and browseruse/vision_worker.py: the backend
+pushes chart analysis jobs and waits for each result on a per-job list.
+"""
+import json
+import time
+import uuid
+
+VISION_QUEUE = "vision:jobs"
+VISION_WORKERS = "vision:workers"   # hash: worker id -> last heartbeat (epoch seconds)
+WORKER_TTL = 30                     # seconds without a heartbeat before a worker counts as gone
+RESULT_TTL = 600                    # seconds a result waits for its reader
+POLL_SECS = 2                       # BLPOP timeout; well below the client's socket timeout
+
+
+def result_key(job_id):
+    return f"vision:result:{job_id}"
+
+
+def live_workers(redis_client):
+    """Ids of the workers that sent a heartbeat within WORKER_TTL"""
+    now = time.time()
+    return [worker.decode() if isinstance(worker, bytes) else worker
+            for worker, beat in redis_client.hgetall(VISION_WORKERS).items()
+            if now - float(beat) < WORKER_TTL]
+
+
+def worker_heartbeat(redis_client, worker_id):
+    redis_client.hset(VISION_WORKERS, worker_id, time.time())
+
+
+def worker_gone(redis_client, worker_id):
+    redis_client.hdel(VISION_WORKERS, worker_id)
+
+
+def submit_analysis(redis_client, timeout, **params):
+    """Queue an analysis (rsi_momentum, ticker, interval, intent); returns the job id"""
+    job = {"id": uuid.uuid4().hex, "deadline": time.time() + timeout, **params}
+    redis_client.rpush(VISION_QUEUE, json.dumps(job))
+    return job["id"]
+
+
+def wait_result(redis_client, job_id, timeout):
+    """The analysis of a submitted job; raises TimeoutError, or RuntimeError if the worker failed"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        reply = redis_client.blpop(result_key(job_id), timeout=POLL_SECS)
+        if reply is None:
+            continue
+        outcome = json.loads(reply[1])
+        if outcome.get("error"):
+            raise RuntimeError(outcome["error"])
+        return outcome["result"]
+    raise TimeoutError(f"Analysis timeout (>{timeout}s)")
+
+
+def take_job(redis_client):
+    """Next queued job that has not yet passed its deadline, or None after POLL_SECS without one"""
+    reply = redis_client.blpop(VISION_QUEUE, timeout=POLL_SECS)
+    if reply is None:
+        return None
+    job = json.loads(reply[1])
+    if job.get("deadline", 0) < time.time():
+        return None   # the backend stopped waiting for it
+    return job
+
+
+def post_result(redis_client, job_id, result=None, error=None):
+    key = result_key(job_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.rpush(key, json.dumps({"result": result, "error": error}, default=str))
+    pipe.expire(key, RESULT_TTL)
+    pipe.execute()